@@ -0,0 +1,531 @@
+import os
+import hmac
+import gzip
+import json
+import time
+import zlib
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from scheduler import MonitorScheduler
+from service_monitor import ServiceMonitor, ServiceStatus
+from service_registry import ServiceEntry
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+INGEST_PATH = '/ingest'
+# Как часто агент отправляет накопленные изменения, секунды
+DEFAULT_PUSH_INTERVAL = 5.0
+# Пустой пакет-пульс, если изменений не было столько секунд
+DEFAULT_HEARTBEAT_INTERVAL = 30.0
+# Полная синхронизация состояния (свежие времена ответа, восстановление после сбоев)
+DEFAULT_FULL_SYNC_INTERVAL = 300.0
+# Сколько одинаковых результатов подряд отправлять после смены состояния:
+# центральному боту нужны повторы, чтобы подтвердить падение (ALERT_FAILURE_THRESHOLD)
+DEFAULT_CONFIRM_CHECKS = 3
+# Хост считается пропавшим, если от него нет пакетов столько секунд
+DEFAULT_STALE_SECONDS = 90.0
+# Тело больше этого размера сжимается gzip
+COMPRESS_THRESHOLD = 4096
+MAX_BODY = 8 * 1024 * 1024
+MAX_RETRY_DELAY = 60.0
+
+# Строка пакета: [имя, тип, статус, время ответа, ошибка, время проверки, uptime]
+Row = list
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Некорректное значение {name}, используем {default}")
+        return default
+
+
+def status_row(service: ServiceEntry, status) -> Row:
+    """Компактное представление результата проверки для пакета агента"""
+    checked_at = status.last_check.timestamp() if status.last_check else time.time()
+    response_time = round(status.response_time, 4) if status.response_time is not None else None
+    return [service.name, service.type, status.status, response_time,
+            status.error_message, round(checked_at, 1), status.uptime]
+
+
+class StatusAgent:
+    """Агент: отправка результатов локальных проверок центральному боту
+
+    Подписывается на результаты MonitorScheduler (в event loop монитора) и
+    раз в push_interval секунд отправляет одним пакетом только изменения:
+    сервисы, у которых сменились статус или ошибка, плюс confirm_checks
+    повторов нового состояния для подтверждения падений на стороне бота.
+    Стабильные сервисы в пакеты не попадают; их свежее состояние приходит
+    с полной синхронизацией раз в full_sync_interval секунд. Пакет, прием
+    которого не подтвержден, повторяется без изменений (тот же seq и тело):
+    бот мог его уже применить, и повтор с тем же seq будет отброшен.
+    Изменения, пришедшие за это время, уходят следующим пакетом.
+
+    url - http(s)://хост:порт/ingest или unix:///путь/к/сокету.
+    """
+
+    def __init__(self, url: str, token: str, host: Optional[str] = None,
+                 push_interval: Optional[float] = None,
+                 heartbeat_interval: Optional[float] = None,
+                 full_sync_interval: Optional[float] = None,
+                 confirm_checks: Optional[int] = None):
+        self.url = url
+        self.token = token
+        self.host = host or socket.gethostname()
+        self.push_interval = push_interval or _env_float('AGENT_PUSH_INTERVAL', DEFAULT_PUSH_INTERVAL)
+        self.heartbeat_interval = heartbeat_interval or _env_float(
+            'AGENT_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL)
+        self.full_sync_interval = full_sync_interval or _env_float(
+            'AGENT_FULL_SYNC_INTERVAL', DEFAULT_FULL_SYNC_INTERVAL)
+        self.confirm_checks = confirm_checks or int(_env_float('AGENT_CONFIRM_CHECKS', DEFAULT_CONFIRM_CHECKS))
+        # Идентификатор запуска: после перезапуска агента бот запрашивает полную синхронизацию
+        self.run_id = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.latest: Dict[str, Row] = {}
+        self.pending: Dict[str, Row] = {}
+        self.removed: Dict[str, None] = {}
+        # Имя -> ((статус, ошибка), сколько раз подряд)
+        self._streaks: Dict[str, Tuple[Tuple[str, Optional[str]], int]] = {}
+        self._need_full = True
+        # Отправленный, но не подтвержденный пакет: (пакет, тело, заголовки, время сборки)
+        self._inflight: Optional[Tuple[Dict, bytes, Dict[str, str], float]] = None
+        self._last_push = 0.0
+        self._last_full = 0.0
+        self.sent_batches = 0
+        self.sent_rows = 0
+        self.sent_bytes = 0
+
+    def on_result(self, service: ServiceEntry, status):
+        """Результат проверки (подписчик MonitorScheduler)"""
+        row = status_row(service, status)
+        self.latest[service.name] = row
+        self.removed.pop(service.name, None)
+        key = (status.status, status.error_message)
+        previous, count = self._streaks.get(service.name, (None, 0))
+        count = count + 1 if previous == key else 1
+        self._streaks[service.name] = (key, count)
+        if count <= self.confirm_checks:
+            self.pending[service.name] = row
+
+    def on_remove(self, name: str):
+        """Сервис убран из расписания агента"""
+        self.latest.pop(name, None)
+        self.pending.pop(name, None)
+        self._streaks.pop(name, None)
+        self.removed[name] = None
+
+    def _client(self) -> Tuple['httpx.AsyncClient', str]:
+        """HTTP клиент и адрес приема: по TCP или через Unix сокет"""
+        # Пакет httpx импортируется при первой отправке: его загрузка не задерживает запуск агента
+        import httpx
+        if self.url.startswith('unix://'):
+            transport = httpx.AsyncHTTPTransport(uds=self.url[len('unix://'):])
+            return httpx.AsyncClient(transport=transport, timeout=10), f"http://localhost{INGEST_PATH}"
+        return httpx.AsyncClient(timeout=10), self.url
+
+    def build_payload(self, now: float) -> Optional[Dict]:
+        """Пакет для отправки или None, если отправлять нечего"""
+        full = self._need_full or now - self._last_full >= self.full_sync_interval
+        if full:
+            rows = list(self.latest.values())
+        elif self.pending or self.removed or now - self._last_push >= self.heartbeat_interval:
+            rows = list(self.pending.values())
+        else:
+            return None
+        return {
+            'v': PROTOCOL_VERSION,
+            'host': self.host,
+            'run': self.run_id,
+            'seq': self.seq + 1,
+            'full': full,
+            'services': rows,
+            # В полной синхронизации — какие строки являются новыми результатами проверок
+            'fresh': list(self.pending) if full else [],
+            # В полной синхронизации бот удаляет отсутствующие сервисы сам, список для учета подтверждения
+            'removed': list(self.removed),
+        }
+
+    async def push(self, client: 'httpx.AsyncClient', url: str) -> bool:
+        """Отправка одного пакета; True, если пакет принят или отправлять нечего
+
+        Новый пакет собирается только после подтверждения предыдущего.
+        """
+        if self._inflight is None:
+            now = time.time()
+            payload = self.build_payload(now)
+            if payload is None:
+                return True
+            body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            headers = {'Authorization': f"Bearer {self.token}", 'Content-Type': 'application/json'}
+            if len(body) > COMPRESS_THRESHOLD:
+                body = gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+            self._inflight = (payload, body, headers, now)
+        payload, body, headers, now = self._inflight
+        response = await client.post(url, content=body, headers=headers)
+        response.raise_for_status()
+        answer = response.json()
+        self._inflight = None
+
+        self.seq = payload['seq']
+        self._last_push = time.time()
+        sent = {row[0]: row for row in payload['services']}
+        # Снимаются только отправленные строки: пришедшие во время запроса результаты остаются
+        for name, row in sent.items():
+            if self.pending.get(name) is row:
+                del self.pending[name]
+        for name in payload['removed']:
+            self.removed.pop(name, None)
+        if payload['full']:
+            self._last_full = now
+        # Бот не знает этот запуск агента (например, перезапустился сам) — нужна полная синхронизация
+        self._need_full = bool(answer.get('full'))
+        self.sent_batches += 1
+        self.sent_rows += len(sent)
+        self.sent_bytes += len(body)
+        return True
+
+    async def run(self):
+        """Цикл отправки в event loop монитора"""
+        client, url = self._client()
+        delay = self.push_interval
+        logger.info(f"Агент {self.host} отправляет состояние в {self.url} каждые {self.push_interval:.0f}s")
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    await self.push(client, url)
+                    delay = self.push_interval
+                except Exception as e:
+                    delay = min(MAX_RETRY_DELAY, max(delay * 2, self.push_interval))
+                    logger.warning(f"Не удалось отправить состояние ({len(self.pending)} изменений): {e}; "
+                                   f"повтор через {delay:.0f}s")
+        finally:
+            await client.aclose()
+
+
+class HostState:
+    """Состояние одного хоста-агента в сводке парка"""
+
+    __slots__ = ('host', 'run_id', 'seq', 'need_full', 'last_seen', 'services', 'statuses')
+
+    def __init__(self, host: str):
+        self.host = host
+        self.run_id = ''
+        self.seq = 0
+        # Был пропуск пакетов или неизвестный запуск агента: ждем полную синхронизацию
+        self.need_full = True
+        self.last_seen = 0.0
+        self.services: Dict[str, ServiceEntry] = {}
+        self.statuses: Dict[str, object] = {}
+
+
+class FleetView:
+    """Сводка состояния сервисов на хостах-агентах
+
+    Сервисы хоста хранятся под именем "сервис@хост", поэтому история,
+    хранилище, метрики и оповещения бота работают с ними как с локальными.
+    Подписчики (add_listener) получают (ServiceEntry, ServiceStatus) по
+    каждой строке разностного пакета и по изменившимся строкам полной
+    синхронизации; add_remove_listener — имена удаленных сервисов.
+    """
+
+    def __init__(self, stale_seconds: Optional[float] = None):
+        self.stale_seconds = stale_seconds or _env_float('AGENT_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+        self.hosts: Dict[str, HostState] = {}
+        self.listeners: List[Callable[[ServiceEntry, object], None]] = []
+        self.remove_listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[ServiceEntry, object], None]):
+        self.listeners.append(callback)
+
+    def add_remove_listener(self, callback: Callable[[str], None]):
+        self.remove_listeners.append(callback)
+
+    def apply(self, payload: Dict) -> Dict:
+        """Применение пакета агента, возвращает ответ агенту"""
+        if payload.get('v') != PROTOCOL_VERSION:
+            raise ValueError(f"неподдерживаемая версия протокола {payload.get('v')}")
+        host = str(payload.get('host') or '')
+        if not host:
+            raise ValueError("не указан host")
+        run_id = str(payload.get('run') or '')
+        seq = int(payload.get('seq') or 0)
+        full = bool(payload.get('full'))
+        # Пакет разбирается до изменения состояния хоста: некорректный пакет
+        # отклоняется целиком и не сдвигает seq, поэтому исправленный повтор применится
+        rows = self._parse_rows(host, payload.get('services') or [])
+        fresh = {str(name) for name in payload.get('fresh') or []}
+        removed = [str(name) for name in payload.get('removed') or []]
+
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(host)
+            logger.info(f"Подключен агент {host}")
+        state.last_seen = time.time()
+        if state.run_id == run_id and seq <= state.seq:
+            # Повтор уже примененного пакета (ответ до агента не дошел): агент
+            # повторяет пакет без изменений, поэтому применять его второй раз нельзя
+            return {'ok': True, 'full': state.need_full}
+        # Неизвестный запуск агента или пропуск пакета: изменения применяются,
+        # но для согласованного состояния нужна полная синхронизация
+        gap = state.run_id != run_id or seq != state.seq + 1
+        if full:
+            self._apply_rows(state, rows, fresh)
+            present = {name for name, _, _ in rows}
+            self._remove(state, [name for name in state.services if name not in present])
+            state.need_full = False
+        else:
+            self._apply_rows(state, rows)
+            self._remove(state, removed)
+            state.need_full = state.need_full or gap
+        state.run_id = run_id
+        state.seq = seq
+        return {'ok': True, 'full': state.need_full}
+
+    @staticmethod
+    def _parse_rows(host: str, rows: List[Row]) -> List[Tuple[str, str, ServiceStatus]]:
+        """Разбор строк пакета в (имя, тип, статус); ValueError для некорректной строки"""
+        parsed = []
+        for row in rows:
+            try:
+                name, service_type, status, response_time, error_message, checked_at, uptime = row[:7]
+                name = str(name)
+                parsed.append((name, str(service_type), ServiceStatus(
+                    name=f"{name}@{host}",
+                    status=str(status),
+                    response_time=float(response_time) if response_time is not None else None,
+                    error_message=str(error_message) if error_message is not None else None,
+                    last_check=datetime.fromtimestamp(float(checked_at)) if checked_at else datetime.now(),
+                    uptime=float(uptime) if uptime is not None else None
+                )))
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                raise ValueError(f"некорректная строка {row!r}: {e}")
+        return parsed
+
+    def _apply_rows(self, state: HostState, rows: List[Tuple[str, str, ServiceStatus]],
+                    fresh: Optional[set] = None):
+        """fresh - имена строк, являющихся новыми проверками (None - все строки)"""
+        for name, service_type, current in rows:
+            service = state.services.get(name)
+            if service is None or service.type != service_type:
+                service = state.services[name] = ServiceEntry(
+                    current.name, service_type, name, source='agent', labels={'host': state.host})
+            previous = state.statuses.get(name)
+            state.statuses[name] = current
+            # Повтор известного состояния из полной синхронизации не считается новой проверкой
+            if fresh is None or name in fresh or previous is None or (
+                    previous.status, previous.error_message) != (current.status, current.error_message):
+                self._notify(service, current)
+
+    def _remove(self, state: HostState, names: List[str]):
+        for name in names:
+            service = state.services.pop(str(name), None)
+            state.statuses.pop(str(name), None)
+            if service is None:
+                continue
+            for listener in list(self.remove_listeners):
+                try:
+                    listener(service.name)
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика удаления сервиса {service.name}: {e}")
+
+    def _notify(self, service: ServiceEntry, status):
+        for listener in list(self.listeners):
+            try:
+                listener(service, status)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика результата {service.name}: {e}")
+
+    def summary(self) -> List[Dict]:
+        """Сводка по хостам для /fleet"""
+        now = time.time()
+        result = []
+        for host, state in sorted(self.hosts.items()):
+            statuses = list(state.statuses.values())
+            result.append({
+                'host': host,
+                'age': now - state.last_seen,
+                'stale': now - state.last_seen > self.stale_seconds,
+                'services': len(statuses),
+                'healthy': sum(1 for s in statuses if s.status == 'healthy'),
+                'problems': sorted((s for s in statuses if s.status != 'healthy'), key=lambda s: s.name),
+            })
+        return result
+
+    def statuses(self, host: str) -> List:
+        """Последние статусы сервисов хоста"""
+        state = self.hosts.get(host)
+        return sorted(state.statuses.values(), key=lambda s: s.name) if state else []
+
+
+class PayloadTooLarge(ValueError):
+    """Пакет агента больше MAX_BODY после распаковки"""
+
+
+def gunzip_limited(data: bytes, limit: int) -> bytes:
+    """Распаковка gzip не больше limit байт (защита от «zip-бомб»)"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    result = decompressor.decompress(data, limit)
+    if decompressor.unconsumed_tail or (not decompressor.eof and len(result) == limit):
+        raise PayloadTooLarge(f"распакованный пакет больше {limit} байт")
+    if not decompressor.eof:
+        raise ValueError("неполный gzip поток")
+    return result
+
+
+class IngestServer:
+    """Прием пакетов агентов: POST /ingest по TCP или Unix сокету (на asyncio)
+
+    Запрос должен содержать заголовок Authorization: Bearer <AGENT_TOKEN>;
+    токен проверяется до чтения тела. Тело (и распакованный gzip) ограничено MAX_BODY.
+    """
+
+    def __init__(self, fleet: FleetView, token: str, host: str = '127.0.0.1',
+                 port: Optional[int] = None, path: Optional[str] = None):
+        self.fleet = fleet
+        self.token = token
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if self.path:
+            self._server = await asyncio.start_unix_server(self._handle, self.path)
+            logger.info(f"Прием состояния агентов через {self.path}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info(f"Прием состояния агентов на http://{self.host}:{self.port}{INGEST_PATH}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # ValueError — строка запроса или заголовка длиннее лимита StreamReader
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Обработка одного запроса; True, если соединение можно использовать дальше"""
+        request_line = await asyncio.wait_for(reader.readline(), timeout=60)
+        if not request_line:
+            return False
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=10)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        parts = request_line.decode('latin-1').split()
+
+        # Путь, метод и токен проверяются до чтения тела: без токена бот не буферизует
+        # тело запроса. Непрочитанное тело остается в сокете, поэтому соединение закрывается
+        if len(parts) < 2 or parts[1].split('?')[0] != INGEST_PATH:
+            await self._respond(writer, '404 Not Found', {'error': 'not found'}, close=True)
+            return False
+        if parts[0] != 'POST':
+            await self._respond(writer, '405 Method Not Allowed', {'error': 'method not allowed'}, close=True)
+            return False
+        if not hmac.compare_digest(headers.get('authorization', '').encode('latin-1'),
+                                   f"Bearer {self.token}".encode('utf-8')):
+            await self._respond(writer, '401 Unauthorized', {'error': 'unauthorized'}, close=True)
+            return False
+        raw_length = headers.get('content-length', '0')
+        if not raw_length.isdigit():
+            await self._respond(writer, '400 Bad Request', {'error': 'invalid Content-Length'}, close=True)
+            return False
+        length = int(raw_length)
+        if length > MAX_BODY:
+            await self._respond(writer, '413 Payload Too Large', {'error': 'too large'}, close=True)
+            return False
+        body = await asyncio.wait_for(reader.readexactly(length), timeout=30) if length else b''
+
+        try:
+            if headers.get('content-encoding') == 'gzip':
+                body = gunzip_limited(body, MAX_BODY)
+            answer = self.fleet.apply(json.loads(body))
+        except PayloadTooLarge as e:
+            logger.warning(f"Слишком большой пакет агента: {e}")
+            await self._respond(writer, '413 Payload Too Large', {'error': str(e)}, close=True)
+            return False
+        except Exception as e:
+            logger.warning(f"Некорректный пакет агента: {e}")
+            await self._respond(writer, '400 Bad Request', {'error': str(e)})
+        else:
+            await self._respond(writer, '200 OK', answer)
+        return headers.get('connection', '').lower() != 'close'
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: str, data: Dict, close: bool = False):
+        body = json.dumps(data).encode('utf-8')
+        head = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        if close:
+            head += "Connection: close\r\n"
+        writer.write((head + "\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+
+def ingest_server_from_env(fleet: FleetView) -> Optional[IngestServer]:
+    """Сервер приема пакетов агентов, если задан AGENT_INGEST_PORT или AGENT_INGEST_SOCKET"""
+    port = os.getenv('AGENT_INGEST_PORT', '')
+    path = os.getenv('AGENT_INGEST_SOCKET', '')
+    if not port and not path:
+        return None
+    token = os.getenv('AGENT_TOKEN', '')
+    if not token:
+        logger.error("Прием состояния агентов отключен: не задан AGENT_TOKEN")
+        return None
+    try:
+        return IngestServer(fleet, token, os.getenv('AGENT_INGEST_HOST', '127.0.0.1'),
+                            int(port) if port else None, path or None)
+    except ValueError:
+        logger.warning(f"Некорректный AGENT_INGEST_PORT={port}, прием состояния агентов отключен")
+        return None
+
+
+def run_agent():
+    """Режим агента: локальные плановые проверки и отправка изменений центральному боту"""
+    load_dotenv()
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    url = os.getenv('AGENT_URL', '')
+    token = os.getenv('AGENT_TOKEN', '')
+    if not url or not token:
+        raise SystemExit("Для режима агента нужны AGENT_URL и AGENT_TOKEN")
+
+    monitor = ServiceMonitor()
+    scheduler = MonitorScheduler(monitor)
+    agent = StatusAgent(url, token, os.getenv('AGENT_HOST') or None)
+    scheduler.add_listener(agent.on_result)
+    scheduler.add_remove_listener(agent.on_remove)
+
+    async def main():
+        scheduler.start()
+        await agent.run()
+
+    monitor.monitor_loop.run_sync(main())
+
+
+if __name__ == '__main__':
+    run_agent()
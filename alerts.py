@@ -0,0 +1,223 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сколько неудачных проверок подряд нужно для оповещения о падении
+DEFAULT_FAILURE_THRESHOLD = 3
+# Сколько успешных проверок подряд нужно для оповещения о восстановлении
+DEFAULT_RECOVERY_THRESHOLD = 2
+# Окно последних проверок для обнаружения «моргания» и число смен состояния в нем
+FLAP_WINDOW = 20
+DEFAULT_FLAP_THRESHOLD = 6
+# Сколько секунд копить события перед отправкой одного сгруппированного сообщения
+DEFAULT_GROUP_WINDOW = 10.0
+# Максимальный размер одного сообщения Telegram
+MAX_ALERT_SIZE = 4000
+
+
+def parse_chat_ids(raw: str) -> List[int]:
+    """Список чатов из строки вида "123,-100456" """
+    chat_ids = []
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            chat_ids.append(int(item))
+        except ValueError:
+            logger.warning(f"Некорректный ID чата для оповещений: {item}")
+    return chat_ids
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Некорректное значение {name}, используем {default}")
+        return default
+
+
+class ServiceAlertState:
+    """Состояние оповещений одного сервиса"""
+
+    __slots__ = ('confirmed', 'failures', 'successes', 'recent', 'flapping', 'down_since', 'error')
+
+    def __init__(self, confirmed: Optional[str] = None):
+        # Подтвержденное состояние, о котором уже сообщено: healthy / unhealthy / None
+        self.confirmed = confirmed
+        self.failures = 0
+        self.successes = 0
+        self.recent: Deque[bool] = deque(maxlen=FLAP_WINDOW)
+        self.flapping = False
+        self.down_since: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def changes(self) -> int:
+        """Число смен состояния в окне последних проверок"""
+        values = list(self.recent)
+        return sum(1 for a, b in zip(values, values[1:]) if a != b)
+
+
+class AlertManager:
+    """Оповещения о смене состояния сервисов
+
+    - падение подтверждается после failure_threshold неудачных проверок подряд,
+      восстановление — после recovery_threshold успешных;
+    - сервис, который часто меняет состояние (flap_threshold смен за последние
+      FLAP_WINDOW проверок), помечается как нестабильный: отдельные оповещения
+      о нем подавляются до стабилизации;
+    - события за group_window секунд отправляются одним сообщением.
+
+    Результаты подаются через on_result (в event loop монитора), отправка
+    выполняется функцией send(текст).
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]],
+                 failure_threshold: Optional[int] = None,
+                 recovery_threshold: Optional[int] = None,
+                 flap_threshold: Optional[int] = None,
+                 group_window: Optional[float] = None):
+        self.send = send
+        self.failure_threshold = failure_threshold or _env_int(
+            'ALERT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)
+        self.recovery_threshold = recovery_threshold or _env_int(
+            'ALERT_RECOVERY_THRESHOLD', DEFAULT_RECOVERY_THRESHOLD)
+        self.flap_threshold = flap_threshold or _env_int('ALERT_FLAP_THRESHOLD', DEFAULT_FLAP_THRESHOLD)
+        if group_window is None:
+            try:
+                group_window = float(os.getenv('ALERT_GROUP_WINDOW', DEFAULT_GROUP_WINDOW))
+            except ValueError:
+                group_window = DEFAULT_GROUP_WINDOW
+        self.group_window = group_window
+        self.states: Dict[str, ServiceAlertState] = {}
+        # Накопленные события: (вид, имя сервиса, подробности)
+        self.pending: List[Tuple[str, str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def seed(self, states: Dict[str, str]):
+        """Начальные подтвержденные состояния (например, из хранилища), чтобы
+        после перезапуска не оповещать повторно об уже известных падениях"""
+        for name, status in states.items():
+            if name not in self.states and status in ('healthy', 'unhealthy'):
+                self.states[name] = ServiceAlertState(status)
+
+    def remove(self, name: str):
+        self.states.pop(name, None)
+
+    def on_result(self, service, status):
+        """Учет результата проверки сервиса (ServiceEntry) со статусом ServiceStatus"""
+        name = service.name
+        state = self.states.get(name)
+        if state is None:
+            state = self.states[name] = ServiceAlertState()
+        healthy = status.status == 'healthy'
+        state.recent.append(healthy)
+        if healthy:
+            state.successes += 1
+            state.failures = 0
+        else:
+            state.failures += 1
+            state.successes = 0
+            state.error = status.error_message
+
+        changes = state.changes()
+        if not state.flapping and changes >= self.flap_threshold:
+            state.flapping = True
+            self._queue('flapping', name, f"{changes} смен состояния за {len(state.recent)} проверок")
+            return
+        if state.flapping:
+            # Гистерезис: нестабильность снимается, когда смен стало вдвое меньше порога
+            if changes > self.flap_threshold // 2:
+                return
+            state.flapping = False
+            self._queue('stable', name, "сейчас " + ("работает" if healthy else "недоступен"))
+            state.confirmed = 'healthy' if healthy else 'unhealthy'
+            state.down_since = None if healthy else time.time()
+            return
+
+        if state.confirmed != 'unhealthy' and state.failures >= self.failure_threshold:
+            state.confirmed = 'unhealthy'
+            state.down_since = time.time()
+            self._queue('down', name, state.error or status.status)
+        elif state.confirmed == 'unhealthy' and state.successes >= self.recovery_threshold:
+            state.confirmed = 'healthy'
+            details = ''
+            if state.down_since is not None:
+                details = f"простой {_format_duration(time.time() - state.down_since)}"
+            state.down_since = None
+            self._queue('up', name, details)
+        elif state.confirmed is None and healthy:
+            # Первое состояние после запуска: о работающем сервисе не сообщаем
+            state.confirmed = 'healthy'
+
+    def _queue(self, kind: str, name: str, details: str):
+        self.pending.append((kind, name, details))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.group_window)
+        await self.flush()
+
+    async def flush(self):
+        """Отправка накопленных событий одним сообщением (или несколькими, если не помещаются)"""
+        events, self.pending = self.pending, []
+        if not events:
+            return
+        for text in _split_message(format_alert(events)):
+            try:
+                await self.send(text)
+            except Exception as e:
+                logger.error(f"Не удалось отправить оповещение: {e}")
+
+
+ALERT_SECTIONS = [
+    ('down', "🚨 Недоступны"),
+    ('up', "✅ Восстановлены"),
+    ('flapping', "🔁 Нестабильны (оповещения приостановлены)"),
+    ('stable', "〰️ Стабилизировались"),
+]
+
+
+def format_alert(events: List[Tuple[str, str, str]]) -> str:
+    """Одно сообщение по событиям, сгруппированным по виду"""
+    # Для каждого сервиса остается последнее событие каждого вида
+    latest: Dict[Tuple[str, str], str] = {}
+    for kind, name, details in events:
+        latest[(kind, name)] = details
+    blocks = []
+    for kind, title in ALERT_SECTIONS:
+        items = [(name, details) for (k, name), details in latest.items() if k == kind]
+        if not items:
+            continue
+        lines = [f"{title} ({len(items)}):"]
+        for name, details in items:
+            lines.append(f"• {name}" + (f" - {details}" if details else ""))
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def _split_message(text: str) -> List[str]:
+    parts = []
+    current = ''
+    for line in text.split("\n"):
+        if current and len(current) + len(line) + 1 > MAX_ALERT_SIZE:
+            parts.append(current)
+            current = ''
+        current = f"{current}\n{line}" if current else line[:MAX_ALERT_SIZE]
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} с"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} мин"
+    return f"{seconds // 3600:.0f} ч {seconds % 3600 // 60:.0f} мин"
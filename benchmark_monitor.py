@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный бенчмарк цикла проверок на синтетическом парке сервисов
+
+Не требует Docker и systemd: HTTP сервисы обслуживаются локальными
+заглушками (быстрая, медленная, 5xx, зависающая), Docker клиент, systemctl
+и таблица процессов psutil подменяются фейковыми бэкендами. Для каждого
+размера парка измеряются время check_all_services, число обращений к
+бэкендам и пиковая память; отчет можно сохранить в JSON и сравнить с
+предыдущим запуском.
+
+Примеры:
+    python benchmark_monitor.py
+    python benchmark_monitor.py --sizes 10,100 --output baseline.json
+    python benchmark_monitor.py --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import stat
+import asyncio
+import argparse
+import platform
+import logging
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from statistics import median
+from typing import Dict, List, Optional
+
+# Фейковые бэкенды подключаются до импорта монитора: без подписки на события Docker
+# и периодического обнаружения контейнеров (парк задается целиком),
+# с коротким дедлайном цикла (зависающие HTTP сервисы ограничены им)
+os.environ['DOCKER_EVENTS_ENABLED'] = 'false'
+os.environ['DOCKER_DISCOVERY_INTERVAL'] = '0'
+os.environ.setdefault('CHECK_DEADLINE_SECONDS', '3')
+
+import docker
+import psutil
+
+import perf
+import service_monitor
+from check_engine import DEADLINE_EXCEEDED_MESSAGE
+from service_registry import ServiceEntry
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+# Доли типов сервисов в парке
+FLEET_MIX = [('docker', 0.5), ('http', 0.25), ('systemd', 0.15), ('process', 0.1)]
+# Поведение HTTP заглушек по кругу: на 20 сервисов 14 быстрых, 3 медленных, 2 с 5xx, 1 зависающий
+HTTP_PATTERN = ['fast'] * 14 + ['slow'] * 3 + ['error'] * 2 + ['hang']
+SLOW_RESPONSE_DELAY = 0.2
+# Задержка ответа фейкового Docker API, секунды
+DOCKER_API_LATENCY = 0.01
+# Процессы, не относящиеся к проверяемым сервисам
+BACKGROUND_PROCESSES = 300
+# Допустимое ухудшение метрик при сравнении с базовым отчетом
+DEFAULT_THRESHOLD = 0.2
+
+FAKE_SYSTEMCTL = '''#!{python}
+import sys
+units = sys.argv[sys.argv.index('--') + 1:]
+with open({calls!r}, 'a') as f:
+    f.write('1')
+blocks = []
+for unit in units:
+    if 'missing' in unit:
+        blocks.append(f"Id={{unit}}\\nLoadState=not-found\\nActiveState=inactive\\nSubState=dead\\n"
+                      f"ActiveEnterTimestampMonotonic=0")
+    elif 'failed' in unit:
+        blocks.append(f"Id={{unit}}\\nLoadState=loaded\\nActiveState=failed\\nSubState=failed\\n"
+                      f"ActiveEnterTimestampMonotonic=0")
+    else:
+        blocks.append(f"Id={{unit}}\\nLoadState=loaded\\nActiveState=active\\nSubState=running\\n"
+                      f"ActiveEnterTimestampMonotonic=1000000")
+print("\\n\\n".join(blocks))
+'''
+
+
+class StubHttpServers:
+    """Локальные HTTP заглушки в отдельном потоке: fast, slow, error и hang"""
+
+    KINDS = ('fast', 'slow', 'error', 'hang')
+
+    def __init__(self):
+        self.ports: Dict[str, int] = {}
+        self.requests: Counter = Counter()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._servers = []
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='http-stubs', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        for kind in self.KINDS:
+            server = self.loop.run_until_complete(asyncio.start_server(
+                lambda reader, writer, kind=kind: self._handle(kind, reader, writer),
+                '127.0.0.1', 0, backlog=4096
+            ))
+            self._servers.append(server)
+            self.ports[kind] = server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    async def _handle(self, kind: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.requests[kind] += 1
+                if kind == 'hang':
+                    # Соединение держится открытым без ответа до закрытия клиентом
+                    await reader.read()
+                    break
+                if kind == 'slow':
+                    await asyncio.sleep(SLOW_RESPONSE_DELAY)
+                status = '500 Internal Server Error' if kind == 'error' else '200 OK'
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 2\r\n"
+                             f"Connection: keep-alive\r\n\r\nok".encode('latin-1'))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def url(self, kind: str, index: int) -> str:
+        return f"http://127.0.0.1:{self.ports[kind]}/svc/{index}"
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+class FakeDockerAPI:
+    """Низкоуровневый API фейкового Docker клиента (то, что использует DockerSnapshot)"""
+
+    def __init__(self, containers: List[Dict], calls: Counter):
+        self._containers = containers
+        self._calls = calls
+
+    def containers(self, all: bool = False) -> List[Dict]:
+        self._calls['docker.containers'] += 1
+        time.sleep(DOCKER_API_LATENCY)
+        return [dict(c) for c in self._containers if all or c['State'] == 'running']
+
+    def images(self) -> List[Dict]:
+        self._calls['docker.images'] += 1
+        time.sleep(DOCKER_API_LATENCY)
+        return [{'Id': 'sha256:bench', 'RepoTags': ['bench/app:latest']}]
+
+
+class FakeDockerClient:
+    """Фейковый docker.DockerClient с заданным набором контейнеров"""
+
+    def __init__(self, names: List[str], extra: int, calls: Counter):
+        containers = []
+        for i, name in enumerate(names + [f"unmonitored-{i}" for i in range(extra)]):
+            running = i % 10 != 9
+            containers.append({
+                'Id': f"{i:064x}",
+                'Names': [f"/{name}"],
+                'Image': 'bench/app:latest',
+                'ImageID': 'sha256:bench',
+                'State': 'running' if running else 'exited',
+                'Status': 'Up 2 hours (healthy)' if running else 'Exited (1) 5 minutes ago',
+                'Labels': {'com.docker.compose.project': 'bench'},
+            })
+        self.api = FakeDockerAPI(containers, calls)
+
+    def events(self, *args, **kwargs):
+        raise RuntimeError("события Docker в бенчмарке не используются")
+
+
+class FakeProcess:
+    __slots__ = ('info',)
+
+    def __init__(self, info: Dict):
+        self.info = info
+
+
+def fake_process_iter(names: List[str], calls: Counter):
+    """Замена psutil.process_iter: проверяемые процессы и фоновые"""
+    processes = [
+        {'pid': 1000 + i, 'name': name, 'cmdline': [f"/usr/bin/{name}", '--serve'], 'create_time': 1_700_000_000.0}
+        for i, name in enumerate(names)
+    ] + [
+        {'pid': 100 + i, 'name': f"kworker/{i}", 'cmdline': [], 'create_time': 1_600_000_000.0}
+        for i in range(BACKGROUND_PROCESSES)
+    ]
+
+    def process_iter(attrs=None):
+        calls['psutil.process_iter'] += 1
+        for info in processes:
+            yield FakeProcess(dict(info))
+    return process_iter
+
+
+def build_fleet(size: int, stubs: StubHttpServers) -> Dict:
+    """Синтетический парк: конфигурация сервисов и данные для фейковых бэкендов"""
+    counts = {service_type: int(size * share) for service_type, share in FLEET_MIX}
+    counts['docker'] += size - sum(counts.values())
+    services = []
+    expected: Counter = Counter()
+    docker_names = []
+    process_names = []
+    for i in range(counts['docker']):
+        name = f"bench-{i}"
+        docker_names.append(name)
+        services.append(ServiceEntry(name, 'docker', name))
+    for i in range(counts['http']):
+        kind = HTTP_PATTERN[i % len(HTTP_PATTERN)]
+        expected[kind] += 1
+        services.append(ServiceEntry(f"http-{kind}-{i}", 'http', stubs.url(kind, i)))
+    for i in range(counts['systemd']):
+        suffix = '-missing' if i % 20 == 19 else '-failed' if i % 20 == 18 else ''
+        services.append(ServiceEntry(f"unit-{i}{suffix}", 'systemd', f"systemd:unit-{i}{suffix}"))
+    for i in range(counts['process']):
+        # Каждый десятый процесс не запущен; имя не должно совпадать с запущенными по подстроке
+        name = f"ghost-{i}" if i % 10 == 9 else f"worker-{i}"
+        if not name.startswith('ghost'):
+            process_names.append(name)
+        services.append(ServiceEntry(name, 'process', f"process:{name}"))
+    return {
+        'services': services,
+        'counts': counts,
+        'http_kinds': dict(expected),
+        'docker_names': docker_names,
+        'process_names': process_names,
+    }
+
+
+def install_fake_systemctl(directory: str) -> str:
+    """Фейковый systemctl в PATH; возвращает файл со счетчиком вызовов"""
+    calls_path = os.path.join(directory, 'systemctl.calls')
+    script_path = os.path.join(directory, 'systemctl')
+    with open(script_path, 'w') as f:
+        f.write(FAKE_SYSTEMCTL.format(python=sys.executable, calls=calls_path))
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IEXEC)
+    os.environ['PATH'] = directory + os.pathsep + os.environ.get('PATH', '')
+    return calls_path
+
+
+def read_counter_file(path: str) -> int:
+    try:
+        with open(path) as f:
+            return len(f.read())
+    except FileNotFoundError:
+        return 0
+
+
+def run_cycle(monitor: service_monitor.ServiceMonitor) -> Dict:
+    """Один цикл check_all_services: общее время и время до последнего не зависшего результата"""
+    settled = [0.0]
+    started = time.perf_counter()
+
+    def on_result(index, status):
+        if status.error_message != DEADLINE_EXCEEDED_MESSAGE:
+            settled[0] = time.perf_counter() - started
+
+    results = monitor.monitor_loop.run_sync(monitor.check_all_services_async(on_result=on_result))
+    wall = time.perf_counter() - started
+    return {'wall': wall, 'settled': settled[0], 'results': results}
+
+
+def benchmark_size(size: int, cycles: int, stubs: StubHttpServers, systemctl_calls: str) -> Dict:
+    """Замеры для парка из size сервисов"""
+    fleet = build_fleet(size, stubs)
+    calls: Counter = Counter()
+    docker_client = FakeDockerClient(fleet['docker_names'], extra=len(fleet['docker_names']) // 5, calls=calls)
+    docker.from_env = lambda: docker_client
+    psutil.process_iter = fake_process_iter(fleet['process_names'], calls)
+
+    monitor = service_monitor.ServiceMonitor()
+    # Обнаружение контейнеров завершается до подмены списка сервисов синтетическим парком
+    monitor.wait_backends()
+    monitor.registry.set_source('docker', [])
+    monitor.registry.set_source('env', fleet['services'])
+    try:
+        # Прогрев: пул HTTP соединений, потоки пула проверок
+        warmup = run_cycle(monitor)
+        calls.clear()
+        stubs.requests.clear()
+        systemctl_before = read_counter_file(systemctl_calls)
+        perf.SPANS.reset()
+
+        timings = [run_cycle(monitor) for _ in range(cycles)]
+        spans = dict(perf.SPANS.top(limit=100))
+        backend_calls = dict(calls)
+        backend_calls['systemctl'] = read_counter_file(systemctl_calls) - systemctl_before
+        backend_calls['http.requests'] = sum(stubs.requests.values())
+
+        # Память измеряется отдельным циклом: tracemalloc замедляет выполнение
+        tracemalloc.start()
+        run_cycle(monitor)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        monitor.monitor_loop.run_sync(monitor.http_probe.aclose())
+        monitor.monitor_loop.stop()
+        monitor.executor.shutdown(wait=False)
+
+    statuses = Counter(status.status for status in timings[-1]['results'])
+    deadline = sum(1 for status in timings[-1]['results'] if status.error_message == DEADLINE_EXCEEDED_MESSAGE)
+    return {
+        'services': size,
+        'mix': fleet['counts'],
+        'http_kinds': fleet['http_kinds'],
+        'warmup': round(warmup['wall'], 4),
+        'wall': round(median(t['wall'] for t in timings), 4),
+        'settled': round(median(t['settled'] for t in timings), 4),
+        'peak_memory': peak,
+        'calls_per_cycle': {name: round(count / cycles, 2) for name, count in sorted(backend_calls.items())},
+        'check_p95': {
+            name.split('.', 1)[1]: round(stats['p95'] or 0.0, 5)
+            for name, stats in spans.items() if name.startswith('check.')
+        },
+        'statuses': dict(statuses),
+        'deadline_exceeded': deadline,
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"🧪 Бенчмарк цикла проверок (Python {report['python']}, циклов на размер: {report['cycles']}, "
+        f"дедлайн {report['deadline']:g} с)",
+        "=" * 100,
+        f"{'Сервисов':>9} {'Цикл, с':>9} {'Без завис., с':>14} {'Пик памяти':>12}  Обращений к бэкендам за цикл",
+    ]
+    for result in report['results']:
+        calls = ", ".join(f"{name}: {count:g}" for name, count in result['calls_per_cycle'].items())
+        lines.append(
+            f"{result['services']:>9} {result['wall']:>9.3f} {result['settled']:>14.3f} "
+            f"{result['peak_memory'] / 1024 / 1024:>9.1f} МБ  {calls}"
+        )
+    lines.append("")
+    lines.append("p95 одной проверки по типам, мс:")
+    for result in report['results']:
+        p95 = ", ".join(f"{t}: {v * 1000:.1f}" for t, v in sorted(result['check_p95'].items()))
+        statuses = ", ".join(f"{s}: {n}" for s, n in sorted(result['statuses'].items()))
+        lines.append(f"{result['services']:>9}  {p95}  |  {statuses}, по дедлайну: {result['deadline_exceeded']}")
+    return "\n".join(lines)
+
+
+# Метрики, по которым ищутся регрессии при сравнении
+COMPARED_METRICS = [('wall', 'цикл'), ('settled', 'без зависших'), ('peak_memory', 'пик памяти')]
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Сравнение с базовым отчетом; возвращает список регрессий"""
+    previous = {result['services']: result for result in baseline.get('results', [])}
+    regressions = []
+    print("\n📈 Сравнение с базовым отчетом:")
+    for result in current['results']:
+        base = previous.get(result['services'])
+        if base is None:
+            continue
+        parts = []
+        for key, title in COMPARED_METRICS:
+            before, after = base.get(key), result.get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            parts.append(f"{title} {change:+.1%}")
+            if change > threshold:
+                regressions.append(f"{result['services']} сервисов: {title} {before:g} -> {after:g} ({change:+.1%})")
+        for name, count in result['calls_per_cycle'].items():
+            before = base.get('calls_per_cycle', {}).get(name)
+            if before is not None and count > before:
+                parts.append(f"{name} {before:g} -> {count:g}")
+                regressions.append(f"{result['services']} сервисов: обращений {name} {before:g} -> {count:g}")
+        print(f"{result['services']:>9}: " + ", ".join(parts))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк цикла проверок на синтетическом парке сервисов")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="размеры парка через запятую (по умолчанию 10,100,1000,5000)")
+    parser.add_argument('--cycles', type=int, default=3, help="замеряемых циклов на размер")
+    parser.add_argument('--output', help="сохранить отчет в JSON")
+    parser.add_argument('--compare', help="сравнить с сохраненным отчетом")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое ухудшение при сравнении (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    stubs = StubHttpServers()
+    stubs.start()
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cycles': args.cycles,
+        'deadline': float(os.environ['CHECK_DEADLINE_SECONDS']),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': [],
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix='healthbot-bench-') as directory:
+            systemctl_calls = install_fake_systemctl(directory)
+            for size in sizes:
+                print(f"⏳ {size} сервисов...", flush=True)
+                report['results'].append(benchmark_size(size, args.cycles, stubs, systemctl_calls))
+    finally:
+        stubs.stop()
+
+    print()
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Отчет сохранен: {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        if regressions:
+            print("\n❌ Регрессии:")
+            for line in regressions:
+                print(f"• {line}")
+            return 1
+        print("\n✅ Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Лимиты параллельности по типам сервисов (переопределяются через CHECK_CONCURRENCY)
+DEFAULT_CONCURRENCY = {
+    'http': 50,
+    'docker': 8,
+    'systemd': 4,
+    'process': 4,
+}
+# Лимит для типов, которых нет в таблице
+DEFAULT_TYPE_CONCURRENCY = 4
+# Общий дедлайн на весь цикл проверок, секунды
+DEFAULT_DEADLINE = 60.0
+
+DEADLINE_EXCEEDED_MESSAGE = "Deadline exceeded"
+# Предыдущая проверка сервиса (в пуле потоков) еще не завершилась
+STILL_RUNNING_MESSAGE = "Previous check still running"
+
+
+def parse_concurrency_limits(raw: str) -> Dict[str, int]:
+    """Парсинг лимитов вида "http=32,docker=8" поверх значений по умолчанию"""
+    limits = dict(DEFAULT_CONCURRENCY)
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            service_type, value = item.split('=', 1)
+            limits[service_type.strip()] = max(1, int(value))
+        except ValueError:
+            logger.warning(f"Некорректный лимит параллельности: {item}")
+    return limits
+
+
+class CheckCycle:
+    """Контекст одного цикла проверок
+
+    Хранит снимки состояния бэкендов (Docker, процессы, systemd), которые
+    создаются один раз за цикл при первом обращении и разделяются всеми
+    проверками цикла. Безопасен для вызова из нескольких потоков.
+    """
+
+    def __init__(self, services: List[Any]):
+        self.services = services
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._snapshots: Dict[str, Any] = {}
+        self._errors: Dict[str, Exception] = {}
+
+    def snapshot(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Снимок бэкенда key; ошибка создания запоминается и пробрасывается всем проверкам"""
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self._errors:
+                raise self._errors[key]
+            if key not in self._snapshots:
+                try:
+                    self._snapshots[key] = factory()
+                except Exception as e:
+                    self._errors[key] = e
+                    raise
+            return self._snapshots[key]
+
+
+class CheckEngine:
+    """Параллельное выполнение проверок с лимитами по типам и общим дедлайном
+
+    Результаты возвращаются в порядке конфигурации. Проверка, не успевшая
+    завершиться до дедлайна, заменяется результатом fallback(service, сообщение).
+
+    Отмена по дедлайну прерывает только корутину: блокирующий вызов, запущенный
+    check_func в пуле потоков, продолжает выполняться, а слот семафора типа уже
+    освобожден. Поэтому check_func не должна запускать повторную проверку сервиса,
+    пока предыдущая не вернулась (ServiceMonitor возвращает для нее
+    STILL_RUNNING_MESSAGE), иначе зависший бэкенд постепенно займет весь пул.
+    """
+
+    def __init__(self,
+                 check_func: Callable[[Any], Awaitable[Any]],
+                 fallback: Callable[[Any, str], Any],
+                 limits: Optional[Dict[str, int]] = None,
+                 deadline: Optional[float] = None):
+        self.check_func = check_func
+        self.fallback = fallback
+        self.limits = limits if limits is not None else parse_concurrency_limits(
+            os.getenv('CHECK_CONCURRENCY', ''))
+        if deadline is None:
+            deadline = float(os.getenv('CHECK_DEADLINE_SECONDS', DEFAULT_DEADLINE))
+        self.deadline = deadline
+
+    async def run(self, services: List[Any], deadline: Optional[float] = None,
+                  check_func: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                  on_result: Optional[Callable[[int, Any], None]] = None) -> List[Any]:
+        """Запуск проверок всех сервисов
+        
+        on_result(индекс, результат) вызывается сразу после завершения каждой проверки.
+        """
+        if deadline is None:
+            deadline = self.deadline
+        if check_func is None:
+            check_func = self.check_func
+
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        results: List[Any] = [None] * len(services)
+
+        def semaphore_for(service_type: str) -> asyncio.Semaphore:
+            if service_type not in semaphores:
+                limit = self.limits.get(service_type, DEFAULT_TYPE_CONCURRENCY)
+                semaphores[service_type] = asyncio.Semaphore(limit)
+            return semaphores[service_type]
+
+        def notify(index: int):
+            if on_result is None:
+                return
+            try:
+                on_result(index, results[index])
+            except Exception as e:
+                logger.error(f"Ошибка обработчика результата {services[index].name}: {e}")
+
+        async def run_one(index: int, service):
+            async with semaphore_for(service.type):
+                try:
+                    results[index] = await check_func(service)
+                except Exception as e:
+                    logger.error(f"Ошибка проверки сервиса {service.name}: {e}")
+                    results[index] = self.fallback(service, str(e))
+            notify(index)
+
+        tasks = [asyncio.create_task(run_one(i, s)) for i, s in enumerate(services)]
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        if pending:
+            logger.warning(f"Дедлайн {deadline}s истек, не завершено проверок: {len(pending)}")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for i, service in enumerate(services):
+            if results[i] is None:
+                results[i] = self.fallback(service, DEADLINE_EXCEEDED_MESSAGE)
+                notify(i)
+
+        return results
@@ -0,0 +1,324 @@
+import os
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Set
+
+import perf
+
+logger = logging.getLogger(__name__)
+
+# Статус здоровья из строки вида "Up 5 minutes (healthy)"
+HEALTH_RE = re.compile(r'\((healthy|unhealthy|health: starting)\)')
+# Метка docker compose с именем проекта
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+# Период сверки обнаруженных контейнеров с Docker по умолчанию, секунды
+DEFAULT_DISCOVERY_INTERVAL = 60.0
+# Символы ID контейнера: запрос только из них может быть префиксом ID
+HEX_DIGITS = frozenset('0123456789abcdef')
+
+
+@dataclass
+class ContainerInfo:
+    """Состояние контейнера из списка Docker API"""
+    id: str
+    name: str
+    image: str
+    image_id: str = ''
+    state: str = 'unknown'
+    health: str = 'unknown'
+    labels: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_api(cls, data: Dict) -> 'ContainerInfo':
+        """Создание из элемента ответа GET /containers/json"""
+        names = data.get('Names') or []
+        name = names[0].lstrip('/') if names else data.get('Id', '')[:12]
+        health = 'unknown'
+        match = HEALTH_RE.search(data.get('Status') or '')
+        if match:
+            health = match.group(1).replace('health: ', '')
+        return cls(
+            id=data.get('Id', ''),
+            name=name,
+            image=data.get('Image') or '',
+            image_id=data.get('ImageID') or '',
+            state=data.get('State') or 'unknown',
+            health=health,
+            labels=data.get('Labels') or {}
+        )
+
+
+class DockerSnapshot:
+    """Снимок всех контейнеров за один вызов Docker API
+
+    Снимок делается один раз за цикл проверок и отвечает на все docker-проверки
+    этого цикла: точное совпадение по имени/ID ищется по индексу, уникальный
+    префикс ID (короткий ID) и частичное совпадение (по имени, образу и префиксу
+    тега) — по предвычисленным строкам в памяти, с кэшированием результата на запрос.
+    """
+
+    def __init__(self, containers: List[ContainerInfo], docker_client=None):
+        self.containers = containers
+        self._docker_client = docker_client
+        self._by_name = {c.name: c for c in containers}
+        self._by_id = {c.id: c for c in containers}
+        self._search_keys = [(c.name.lower(), c.image.lower()) for c in containers]
+        self._tags: Optional[List[List[str]]] = None
+        self._matches: Dict[str, Optional[ContainerInfo]] = {}
+
+    @classmethod
+    @perf.timed('docker.containers')
+    def take(cls, docker_client) -> 'DockerSnapshot':
+        """Снимок состояния всех контейнеров (включая остановленные)"""
+        # Низкоуровневый вызов: containers.list() делает по inspect на контейнер
+        raw = docker_client.api.containers(all=True)
+        return cls([ContainerInfo.from_api(item) for item in raw], docker_client)
+
+    def running(self) -> List[ContainerInfo]:
+        """Запущенные контейнеры"""
+        return [c for c in self.containers if c.state == 'running']
+
+    def _image_tags(self) -> List[List[str]]:
+        """Теги образов контейнеров, запрашиваются одним вызовом при первой необходимости"""
+        if self._tags is None:
+            tags_by_image: Dict[str, List[str]] = {}
+            if self._docker_client is not None:
+                try:
+                    with perf.span('docker.images'):
+                        images = self._docker_client.api.images()
+                    for image in images:
+                        tags_by_image[image.get('Id', '')] = [
+                            tag.lower() for tag in image.get('RepoTags') or []
+                        ]
+                except Exception as e:
+                    logger.warning(f"Не удалось получить теги образов: {e}")
+            self._tags = [tags_by_image.get(c.image_id, []) for c in self.containers]
+        return self._tags
+
+    def _find_by_id_prefix(self, query: str) -> Optional[ContainerInfo]:
+        """Контейнер с уникальным префиксом ID (например, короткий ID из 12 символов)"""
+        if not query or any(ch not in HEX_DIGITS for ch in query):
+            return None
+        found = [c for c in self.containers if c.id.startswith(query)]
+        return found[0] if len(found) == 1 else None
+
+    def find(self, query: str) -> Optional[ContainerInfo]:
+        """Поиск контейнера по имени, ID (или его уникальному префиксу), образу или префиксу тега"""
+        container = self._by_name.get(query) or self._by_id.get(query)
+        if container:
+            return container
+
+        if query in self._matches:
+            return self._matches[query]
+
+        query_lower = query.lower()
+        found = self._find_by_id_prefix(query_lower)
+        if found:
+            self._matches[query] = found
+            return found
+        for index, (name, image) in enumerate(self._search_keys):
+            if query_lower in name or query_lower in image:
+                found = self.containers[index]
+                break
+        else:
+            for index, tags in enumerate(self._image_tags()):
+                if any(tag.startswith(query_lower) for tag in tags):
+                    found = self.containers[index]
+                    break
+
+        self._matches[query] = found
+        return found
+
+
+class DockerEventWatcher:
+    """Отслеживание состояния контейнеров по потоку событий Docker API
+
+    В фоновом потоке держит таблицу контейнеров, обновляемую событиями
+    create/start/die/pause/unpause/health_status/destroy. Пока поток событий подключен
+    (live), docker-проверки отвечаются по этой таблице без опроса Docker.
+    При обрыве потока таблица перечитывается целиком и подписка
+    восстанавливается с экспоненциальной задержкой.
+    """
+
+    EVENTS = ('create', 'start', 'die', 'pause', 'unpause', 'health_status', 'destroy')
+    MAX_RECONNECT_DELAY = 60
+
+    def __init__(self, docker_client,
+                 on_event: Optional[Callable[[str, ContainerInfo], None]] = None):
+        self.docker_client = docker_client
+        self.on_event = on_event
+        self.live = False
+        self._containers: Dict[str, ContainerInfo] = {}
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DockerSnapshot] = None
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Запуск фонового потока"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='docker-events', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового потока"""
+        self._stop.set()
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+    def snapshot(self) -> DockerSnapshot:
+        """Снимок по текущей таблице; пересоздается только после изменений"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = DockerSnapshot(list(self._containers.values()), self.docker_client)
+            return self._snapshot
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                # since с запасом: события, пришедшие во время снимка, будут применены повторно
+                since = int(time.time())
+                snapshot = DockerSnapshot.take(self.docker_client)
+                with self._lock:
+                    self._containers = {c.id: c for c in snapshot.containers}
+                    self._snapshot = None
+                self._stream = self.docker_client.events(
+                    decode=True,
+                    filters={'type': 'container'},
+                    since=since
+                )
+                self.live = True
+                logger.info(f"Подписка на события Docker активна, контейнеров: {len(snapshot.containers)}")
+                for event in self._stream:
+                    self._apply(event)
+                    delay = 1
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Поток событий Docker прерван: {e}")
+            finally:
+                self.live = False
+                self._stream = None
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _apply(self, event: Dict):
+        """Применение события к таблице контейнеров"""
+        action = (event.get('Action') or event.get('status') or '')
+        action, _, value = action.partition(':')
+        if action not in self.EVENTS:
+            return
+
+        actor = event.get('Actor') or {}
+        container_id = actor.get('ID') or event.get('id') or ''
+        attributes = dict(actor.get('Attributes') or {})
+        name = attributes.pop('name', '') or container_id[:12]
+        image = attributes.pop('image', '')
+
+        with self._lock:
+            container = self._containers.get(container_id)
+            if action == 'destroy':
+                self._containers.pop(container_id, None)
+            else:
+                if container is None:
+                    container = ContainerInfo(
+                        id=container_id, name=name, image=image,
+                        state='created', labels=attributes
+                    )
+                if action == 'start':
+                    container = replace(container, state='running', health='unknown')
+                elif action == 'die':
+                    container = replace(container, state='exited')
+                elif action == 'pause':
+                    container = replace(container, state='paused')
+                elif action == 'unpause':
+                    container = replace(container, state='running')
+                elif action == 'health_status':
+                    container = replace(container, health=value.strip())
+                self._containers[container_id] = container
+            self._snapshot = None
+
+        if container is None:
+            container = ContainerInfo(id=container_id, name=name, image=image, state='removed')
+        if self.on_event:
+            try:
+                self.on_event(action, container)
+            except Exception as e:
+                logger.error(f"Ошибка обработки события Docker {action} для {name}: {e}")
+
+
+class DiscoveryFilter:
+    """Какие контейнеры добавлять в мониторинг автоматически
+
+    labels - метки контейнера: "key=value" требует значение, "key" - только наличие;
+    projects - имена проектов docker compose. Пустой фильтр пропускает все контейнеры.
+    """
+
+    def __init__(self, labels: Optional[Dict[str, Optional[str]]] = None, projects: Optional[Set[str]] = None):
+        self.labels = labels or {}
+        self.projects = projects or set()
+
+    @classmethod
+    def from_env(cls) -> 'DiscoveryFilter':
+        """Фильтр из DOCKER_DISCOVERY_LABELS и DOCKER_DISCOVERY_PROJECTS"""
+        labels: Dict[str, Optional[str]] = {}
+        for item in os.getenv('DOCKER_DISCOVERY_LABELS', '').split(','):
+            key, has_value, value = item.strip().partition('=')
+            if key:
+                labels[key.strip()] = value.strip() if has_value else None
+        projects = {p.strip() for p in os.getenv('DOCKER_DISCOVERY_PROJECTS', '').split(',') if p.strip()}
+        return cls(labels, projects)
+
+    def matches(self, container: ContainerInfo) -> bool:
+        if self.projects and container.labels.get(COMPOSE_PROJECT_LABEL) not in self.projects:
+            return False
+        for key, value in self.labels.items():
+            if key not in container.labels or (value is not None and container.labels[key] != value):
+                return False
+        return True
+
+    def __str__(self) -> str:
+        parts = [key if value is None else f"{key}={value}" for key, value in self.labels.items()]
+        if self.projects:
+            parts.append(f"проекты {', '.join(sorted(self.projects))}")
+        return "; ".join(parts) or "все контейнеры"
+
+
+class DockerDiscovery:
+    """Периодическая сверка обнаруженных контейнеров
+
+    События Docker добавляют и удаляют контейнеры сразу, но события,
+    пропущенные при обрыве подписки или отключенной подписке, подхватываются
+    только сверкой: раз в interval секунд вызывается refresh().
+    """
+
+    def __init__(self, refresh: Callable[[], None], interval: float = DEFAULT_DISCOVERY_INTERVAL):
+        self.refresh = refresh
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='docker-discovery', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обнаружения Docker контейнеров: {e}")
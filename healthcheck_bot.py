@@ -1,10 +1,26 @@
+import io
 import os
+import time
+import asyncio
 import logging
+from datetime import datetime
+from typing import Dict, Optional
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 from dotenv import load_dotenv
-from service_monitor import ServiceMonitor
+from service_monitor import ServiceMonitor, ServiceStatus
+from service_registry import ServiceEntry
 from logs_module import LogsModule
+from status_cache import StatusCache, format_age
+from scheduler import MonitorScheduler
+from history import HistoryStore
+from status_store import StatusStore
+from alerts import AlertManager, parse_chat_ids
+from log_reader import parse_duration
+from agent import FleetView, ingest_server_from_env
+import metrics
+import perf
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -16,19 +32,212 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Целевое время от запуска процесса до готовности отвечать на команды, мс
+DEFAULT_STARTUP_TARGET_MS = 2000
+
+# Окна статистики /history и сколько сервисов показывать в общем списке
+HISTORY_WINDOWS = [("1 ч", 3600), ("24 ч", 86400), ("Вся история", None)]
+HISTORY_LIST_WINDOW = 86400
+HISTORY_LIST_LIMIT = 20
+# Длительность /profile по умолчанию, секунды
+PROFILE_DEFAULT_SECONDS = 10
+# Период /uptime по умолчанию, секунды
+UPTIME_DEFAULT_PERIOD = 86400
+# Как часто обновлять сообщение с промежуточными результатами /status, секунды
+STATUS_PROGRESS_INTERVAL = 2.0
+
 class HealthCheckBot:
     def __init__(self):
+        self.startup_seconds: Optional[float] = None
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
         if not self.token:
             raise ValueError("TELEGRAM_BOT_TOKEN не найден в переменных окружения")
         
-        self.application = Application.builder().token(self.token).build()
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         self.service_monitor = ServiceMonitor()
         self.logs_module = LogsModule()
-        self.last_statuses = []
+        # Последний результат /status: общий для всех чатов, одновременные запросы объединяются
+        self.status_cache = StatusCache(
+            lambda on_result: self.service_monitor.run_cycle(on_result=on_result)
+        )
+        
+        # Фоновые плановые проверки в потоке монитора (MONITOR_ENABLED=false отключает)
+        self.scheduler = MonitorScheduler(self.service_monitor)
+        self.scheduler.add_listener(self._on_scheduled_result)
+        # История результатов плановых проверок (пишется и читается в потоке монитора)
+        self.history = HistoryStore()
+        self.scheduler.add_remove_listener(self.history.remove)
+        self.scheduler.add_remove_listener(metrics.REGISTRY.remove_service)
+        self.monitoring_enabled = os.getenv('MONITOR_ENABLED', 'true').lower() == 'true'
+        self._previous_states: Dict[str, str] = {}
+        self.store = self._init_store()
+        
+        # Оповещения о смене состояния сервисов в чаты ALERT_CHAT_IDS
+        self.alert_chat_ids = parse_chat_ids(os.getenv('ALERT_CHAT_IDS', ''))
+        self.alerts: Optional[AlertManager] = None
+        self._bot_loop: Optional[asyncio.AbstractEventLoop] = None
+        if self.alert_chat_ids:
+            self.alerts = AlertManager(self._dispatch_alert)
+            self.scheduler.add_listener(self.alerts.on_result)
+            self.scheduler.add_remove_listener(self.alerts.remove)
+        
+        # Сводка парка: состояние сервисов, присланное агентами с других хостов
+        # (AGENT_INGEST_PORT или AGENT_INGEST_SOCKET). Пакеты принимаются в потоке
+        # монитора, поэтому результаты агентов идут по тем же путям, что и локальные
+        self.fleet = FleetView()
+        self.ingest_server = ingest_server_from_env(self.fleet)
+        if self.ingest_server is not None:
+            self.fleet.add_listener(self._on_scheduled_result)
+            self.fleet.add_listener(metrics.observe_remote)
+            self.fleet.add_remove_listener(self.history.remove)
+            self.fleet.add_remove_listener(metrics.REGISTRY.remove_service)
+            if self.alerts is not None:
+                self.fleet.add_listener(self.alerts.on_result)
+                self.fleet.add_remove_listener(self.alerts.remove)
+        if self.alerts is not None and not self.monitoring_enabled and self.ingest_server is None:
+            logger.warning("ALERT_CHAT_IDS задан, но фоновый мониторинг отключен: оповещений не будет")
+        
+        # Пользователи, которым доступны /perf и /profile
+        self.admin_ids = set(parse_chat_ids(os.getenv('ADMIN_IDS', '')))
+        self._profiling = False
+        
+        # HTTP эндпоинт /metrics в формате Prometheus (включается через METRICS_PORT)
+        self.metrics_server = metrics.metrics_server_from_env()
         
         self._setup_handlers()
     
+    def _init_store(self) -> Optional[StatusStore]:
+        """Хранилище результатов проверок (STORE_ENABLED=false отключает)"""
+        if os.getenv('STORE_ENABLED', 'true').lower() != 'true':
+            return None
+        path = os.getenv('STORE_PATH', 'data/healthcheck.db')
+        try:
+            return StatusStore(path)
+        except Exception as e:
+            logger.warning(f"Хранилище результатов {path} недоступно: {e}")
+            return None
+    
+    async def _load_last_states(self):
+        """Последнее сохраненное состояние сервисов, чтобы /status отвечал сразу после перезапуска"""
+        try:
+            states = await asyncio.to_thread(self.store.last_states)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить последнее состояние сервисов: {e}")
+            return
+        statuses = []
+        oldest = None
+        for service in self.service_monitor.services:
+            state = states.get(service.name)
+            if state is None:
+                continue
+            ts, status, response_time, error_message, uptime = state
+            statuses.append(ServiceStatus(
+                name=service.name,
+                status=status,
+                response_time=response_time,
+                error_message=error_message,
+                last_check=datetime.fromtimestamp(ts),
+                uptime=uptime
+            ))
+            oldest = ts if oldest is None else min(oldest, ts)
+        if statuses:
+            self.status_cache.put(statuses, age=max(0.0, time.time() - oldest))
+            logger.info(f"Загружено последнее состояние {len(statuses)} сервисов")
+        if self.alerts is not None:
+            # Об уже известных до перезапуска падениях повторно не оповещаем
+            self.alerts.seed({name: state[1] for name, state in states.items()})
+    
+    async def _post_init(self, application: Application):
+        """Запуск фонового мониторинга после инициализации бота"""
+        self._bot_loop = asyncio.get_running_loop()
+        if self.store is not None:
+            self.store.start()
+            await self._load_last_states()
+        # Docker и обнаружение контейнеров подключаются в фоне (ServiceMonitor.start_backends),
+        # первые проверки дождутся их сами
+        if self.monitoring_enabled:
+            loop = self.service_monitor.monitor_loop.start()
+            loop.call_soon_threadsafe(self.scheduler.start)
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Не удалось запустить эндпоинт метрик: {e}")
+                self.metrics_server = None
+        if self.ingest_server is not None:
+            try:
+                await self.service_monitor.monitor_loop.run(self.ingest_server.start())
+            except OSError as e:
+                logger.error(f"Не удалось запустить прием состояния агентов: {e}")
+                self.ingest_server = None
+        self._record_startup()
+    
+    def _record_startup(self):
+        """Время от запуска процесса до готовности отвечать на команды"""
+        try:
+            import psutil
+            started_at = psutil.Process().create_time()
+        except Exception:
+            return
+        self.startup_seconds = max(0.0, time.time() - started_at)
+        metrics.STARTUP_DURATION.set(value=self.startup_seconds)
+        try:
+            target = float(os.getenv('STARTUP_TARGET_MS', DEFAULT_STARTUP_TARGET_MS))
+        except ValueError:
+            target = DEFAULT_STARTUP_TARGET_MS
+        elapsed_ms = self.startup_seconds * 1000
+        if elapsed_ms > target:
+            logger.warning(f"Бот готов к командам за {elapsed_ms:.0f} мс, дольше цели {target:.0f} мс")
+        else:
+            logger.info(f"Бот готов к командам за {elapsed_ms:.0f} мс")
+    
+    async def _post_shutdown(self, application: Application):
+        """Остановка фонового мониторинга"""
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.ingest_server is not None:
+            await self.service_monitor.monitor_loop.run(self.ingest_server.stop())
+        loop = self.service_monitor.monitor_loop.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.scheduler.stop)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.stop)
+    
+    async def _dispatch_alert(self, text: str):
+        """Отправка оповещения из потока монитора через event loop бота"""
+        future = asyncio.run_coroutine_threadsafe(self._send_alert(text), self._bot_loop)
+        await asyncio.wrap_future(future)
+    
+    async def _send_alert(self, text: str):
+        """Отправка оповещения во все чаты ALERT_CHAT_IDS"""
+        for chat_id in self.alert_chat_ids:
+            for _ in range(3):
+                try:
+                    await self.application.bot.send_message(chat_id=chat_id, text=text)
+                    break
+                except RetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    logger.error(f"Не удалось отправить оповещение в чат {chat_id}: {e}")
+                    break
+    
+    def _on_scheduled_result(self, service: ServiceEntry, status: ServiceStatus):
+        """Результат плановой проверки (вызывается в потоке монитора)"""
+        self.history.record(service.name, status)
+        if self.store is not None:
+            self.store.record(service.name, status)
+        previous = self._previous_states.get(service.name)
+        self._previous_states[service.name] = status.status
+        if previous is not None and previous != status.status:
+            logger.warning(f"Сервис {service.name}: {previous} -> {status.status}"
+                           + (f" ({status.error_message})" if status.error_message else ""))
+    
     def _setup_handlers(self):
         """Настройка обработчиков команд"""
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -41,11 +250,34 @@ class HealthCheckBot:
         # Команды мониторинга
         self.application.add_handler(CommandHandler("status", self.status_command))
         self.application.add_handler(CommandHandler("services", self.services_command))
+        self.application.add_handler(CommandHandler("probes", self.probes_command))
+        self.application.add_handler(CommandHandler("history", self.history_command))
+        self.application.add_handler(CommandHandler("uptime", self.uptime_command))
+        self.application.add_handler(CommandHandler("fleet", self.fleet_command))
+        self.application.add_handler(CommandHandler("perf", self.perf_command))
+        self.application.add_handler(CommandHandler("profile", self.profile_command))
         
         # Команды логов
         self.application.add_handler(CommandHandler("logs", self.logs_module.logs_command))
+        self.application.add_handler(CommandHandler("grep", self.logs_module.grep_command))
+        self.application.add_handler(CommandHandler("follow", self.logs_module.follow_command))
+        self.application.add_handler(CommandHandler("unfollow", self.logs_module.unfollow_command))
         self.application.add_handler(CallbackQueryHandler(self.logs_module.handle_log_callback, pattern="^get_log:"))
         self.application.add_handler(CallbackQueryHandler(self.logs_module.handle_log_callback, pattern="^get_all_logs$"))
+        self.application.add_handler(CallbackQueryHandler(self.logs_module.handle_log_callback, pattern="^get_full_log:"))
+        
+        self._instrument_handlers()
+    
+    def _instrument_handlers(self):
+        """Учет времени выполнения и ошибок всех обработчиков для /metrics и /perf"""
+        for handlers in self.application.handlers.values():
+            for handler in handlers:
+                if isinstance(handler, CommandHandler):
+                    name = '/' + ','.join(sorted(handler.commands))
+                else:
+                    name = getattr(getattr(handler, 'pattern', None), 'pattern', None) or type(handler).__name__
+                callback = perf.timed(f"handler {name}")(handler.callback)
+                handler.callback = metrics.timed_handler(name, callback)
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -65,10 +297,20 @@ class HealthCheckBot:
 
 📊 Команды мониторинга:
 /status - Проверить статус всех сервисов
+/status fresh - Проверить заново, минуя кэш
 /services - Показать список мониторимых сервисов
+/probes - Статистика фоновых проверок
+/history [сервис] - Доступность и задержки по истории проверок
+/uptime <сервис> [период] - Uptime за период (например, 30d)
+/fleet [хост] - Сервисы на хостах с агентами
+/perf - Самые медленные операции (для администраторов)
+/profile [секунды] - Профиль бота файлом (для администраторов)
 
 📄 Команды логов:
 /logs - Получить логи Docker контейнеров
+/logs <контейнер> --since 15m - Записи лога за период
+/grep <контейнер> <regex> - Поиск по логу контейнера
+/follow <контейнер> - Следить за новыми строками лога
 
 Попробуйте команду /status для проверки сервисов!
         """
@@ -88,15 +330,30 @@ class HealthCheckBot:
 
 📊 Команды мониторинга:
 /status - Проверить статус всех сервисов
+/status fresh - Проверить заново, минуя кэш
 /services - Показать список мониторимых сервисов
+/probes - Статистика фоновых проверок
+/history [сервис] - Доступность и задержки по истории проверок
+/uptime <сервис> [период] - Uptime за период (например, 30d)
+/fleet [хост] - Сервисы на хостах с агентами
+/perf - Самые медленные операции (для администраторов)
+/profile [секунды] - Профиль бота файлом (для администраторов)
 
 📄 Команды логов:
 /logs - Получить логи Docker контейнеров
+/logs <контейнер> --since 15m - Записи лога за последние 15 минут
+/logs <контейнер> --between <от> <до> - Записи лога за период
+/grep <контейнер> [опции] <regex> - Поиск по логу контейнера
+  -m N - максимум совпадений, -C N - строк контекста
+  --bytes 100M - только последние N байт, --since 2h - только за последние 2 часа
+/follow <контейнер> [минуты] - Следить за новыми строками лога
+/unfollow - Остановить слежение
 
 💡 Примеры использования:
 /echo Привет, мир!
 /status - проверить все сервисы
-/logs - получить логи контейнеров"""
+/logs - получить логи контейнеров
+/grep chroma -C 2 --since 1h Traceback"""
         await update.message.reply_text(help_text)
     
     async def hello_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -142,27 +399,97 @@ class HealthCheckBot:
 📅 Версия: 1.1.0
 🔧 Функции: Мониторинг сервисов и логов
 
-💬 Всего команд: 9"""
+💬 Всего команд: 18"""
+        if self.startup_seconds is not None:
+            info_text += f"\n🚀 Запуск: {self.startup_seconds * 1000:.0f} мс"
         await update.message.reply_text(info_text)
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик команды /status"""
-        await update.message.reply_text("🔍 Проверяю статус сервисов...")
+        """Обработчик команды /status
+        
+        Результат берется из кэша, если он свежее STATUS_CACHE_TTL;
+        /status fresh запускает новый цикл проверок. Проверки выполняются
+        в потоке монитора, а сообщение-заглушка обновляется по мере
+        готовности результатов, так что бот не блокируется на время цикла.
+        """
+        fresh = bool(context.args) and context.args[0].lower() == 'fresh'
+        cache = self.status_cache
+        progress_message = None
+        partial: Dict[int, ServiceStatus] = {}
+        changed = asyncio.Event()
+        edit_lock = asyncio.Lock()
+        updater = None
+        stale = None
+        stale_text = ''
+        
+        def on_result(index: int, status: ServiceStatus):
+            partial[index] = status
+            changed.set()
+        
+        async def update_progress(total: int):
+            # Не чаще раза в STATUS_PROGRESS_INTERVAL, чтобы не упереться в лимиты Telegram
+            while True:
+                await changed.wait()
+                changed.clear()
+                if stale is not None:
+                    # Пока идет проверка, показываем последнее известное состояние
+                    text = stale_text + f"\n⏳ Проверено {len(partial)}/{total}..."
+                else:
+                    text = self.service_monitor.get_summary([partial[i] for i in sorted(partial)])
+                    text += f"\n⏳ Проверено {len(partial)}/{total}..."
+                async with edit_lock:
+                    try:
+                        await progress_message.edit_text(text)
+                    except Exception as e:
+                        logger.debug(f"Не удалось обновить прогресс /status: {e}")
+                await asyncio.sleep(STATUS_PROGRESS_INTERVAL)
+        
+        async def stop_progress():
+            # Ждем завершения текущего редактирования, чтобы оно не перезаписало итог
+            if updater is not None:
+                async with edit_lock:
+                    updater.cancel()
         
         try:
-            statuses = self.service_monitor.check_all_services()
-            self.last_statuses = statuses
+            if fresh or not cache.is_fresh():
+                stale = cache.value or None
+                if stale is not None:
+                    stale_text = self.service_monitor.get_summary(stale)
+                    stale_text += f"\n🕐 Последнее известное состояние: {format_age(cache.age)}"
+                    progress_message = await update.message.reply_text(stale_text + "\n🔍 Обновляю...")
+                else:
+                    progress_message = await update.message.reply_text("🔍 Проверяю статус сервисов...")
+                updater = asyncio.create_task(update_progress(len(self.service_monitor.services)))
+                try:
+                    statuses, age = await cache.get(fresh=fresh, on_result=on_result)
+                finally:
+                    await stop_progress()
+            else:
+                statuses, age = await cache.get()
             
             if not statuses:
-                await update.message.reply_text("⚠️ Нет настроенных сервисов для мониторинга.\nНастройте SERVICES_TO_MONITOR в .env файле")
+                await self._reply_or_edit(update, progress_message, "⚠️ Нет настроенных сервисов для мониторинга.\nНастройте SERVICES_TO_MONITOR в .env файле")
                 return
             
             summary = self.service_monitor.get_summary(statuses)
-            await update.message.reply_text(summary)
+            summary += f"\n🕐 Данные: {format_age(age)}"
+            if age >= 1:
+                summary += " (/status fresh - проверить заново)"
+            await self._reply_or_edit(update, progress_message, summary)
             
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса: {e}")
-            await update.message.reply_text(f"❌ Ошибка при проверке статуса: {str(e)}")
+            await self._reply_or_edit(update, progress_message, f"❌ Ошибка при проверке статуса: {str(e)}")
+    
+    async def _reply_or_edit(self, update: Update, message, text: str):
+        """Замена текста сообщения-заглушки или новый ответ, если заглушки нет"""
+        if message is not None:
+            try:
+                await message.edit_text(text)
+                return
+            except Exception as e:
+                logger.warning(f"Не удалось отредактировать сообщение: {e}")
+        await update.message.reply_text(text)
     
     async def services_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /services"""
@@ -174,10 +501,238 @@ class HealthCheckBot:
         
         services_text = "📋 Настроенные сервисы:\n\n"
         for service in services:
-            services_text += f"• **{service['name']}** ({service['type']}): {service['config']}\n"
+            services_text += f"• **{service.name}** ({service.type}): {service.config}"
+            services_text += " 🔎\n" if service.auto_discovered else "\n"
+        
+        last_discovery = self.service_monitor.last_discovery
+        if last_discovery is not None:
+            discovered_at, diff = last_discovery
+            services_text += (f"\n🔎 Обнаружено автоматически; последние изменения "
+                              f"{discovered_at.strftime('%H:%M:%S')}: {diff.summary()}\n")
         
         await update.message.reply_text(services_text)
     
+    async def fleet_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /fleet [хост] - сводка по хостам с агентами"""
+        if self.ingest_server is None:
+            await update.message.reply_text(
+                "🖥 Прием состояния агентов отключен (задайте AGENT_INGEST_PORT и AGENT_TOKEN)")
+            return
+        host = context.args[0] if context.args else None
+        text = await self.service_monitor.monitor_loop.call(self._format_fleet, host)
+        await update.message.reply_text(text)
+    
+    def _format_fleet(self, host: Optional[str]) -> str:
+        """Текст /fleet (выполняется в потоке монитора)"""
+        if host is not None:
+            statuses = self.fleet.statuses(host)
+            if not statuses:
+                return f"❓ Нет данных от хоста {host}"
+            lines = [f"🖥 {host}:", ""]
+            for status in statuses:
+                icon = {'healthy': '✅', 'unhealthy': '❌'}.get(status.status, '❓')
+                line = f"{icon} {status.name.rsplit('@', 1)[0]}"
+                if status.error_message:
+                    line += f" — {status.error_message}"
+                lines.append(line)
+            return "\n".join(lines)
+        
+        local = list(self.scheduler.latest.values())
+        lines = ["🖥 Сервисы по хостам:", ""]
+        lines.append(f"• локально: {sum(1 for s in local if s.status == 'healthy')}/{len(local)} в порядке")
+        hosts = self.fleet.summary()
+        for item in hosts:
+            mark = "⚠️ нет связи, " if item['stale'] else ""
+            lines.append(f"• {item['host']}: {item['healthy']}/{item['services']} в порядке "
+                         f"({mark}последний пакет: {format_age(item['age'])})")
+            for status in item['problems'][:5]:
+                lines.append(f"    ❌ {status.name.rsplit('@', 1)[0]}"
+                             + (f" — {status.error_message}" if status.error_message else ""))
+            if len(item['problems']) > 5:
+                lines.append(f"    … и еще {len(item['problems']) - 5}")
+        if not hosts:
+            lines.append("\nАгенты пока не подключались")
+        return "\n".join(lines)
+    
+    async def probes_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /probes - бюджет фоновых проверок"""
+        if not self.monitoring_enabled:
+            await update.message.reply_text("⏸ Фоновый мониторинг отключен (MONITOR_ENABLED=false)")
+            return
+        
+        stats = await self.service_monitor.monitor_loop.call(self.scheduler.stats)
+        minutes = stats['elapsed'] / 60
+        
+        text = "📡 Бюджет фоновых проверок:\n\n"
+        text += f"• Сервисов: {stats['services']}\n"
+        text += f"• Проверок за {minutes:.0f} мин: {stats['probes']}"
+        if stats['probes_by_type']:
+            by_type = ", ".join(f"{t}: {n}" for t, n in sorted(stats['probes_by_type'].items()))
+            text += f" ({by_type})"
+        text += "\n"
+        text += f"• Фактически: {stats['actual_per_minute']:.1f} проверок/мин\n"
+        text += f"• Сейчас запланировано: {stats['current_per_minute']:.1f} проверок/мин\n"
+        text += f"• При фиксированных интервалах: {stats['fixed_per_minute']:.1f} проверок/мин\n"
+        if stats['fixed_per_minute'] > 0:
+            saved = 1 - stats['current_per_minute'] / stats['fixed_per_minute']
+            text += f"• Экономия: {saved:.0%}\n"
+        
+        if stats['adaptive']:
+            text += f"\n⚡ Учащенные проверки: {stats['fast']}\n"
+            text += f"🐢 Реже базового интервала: {stats['backed_off']}\n"
+            if stats['flapping']:
+                text += "\n🔁 Чаще всего меняли состояние:\n"
+                for name, changes in stats['flapping']:
+                    text += f"• {name}: {changes}\n"
+        else:
+            text += "\nАдаптивные интервалы отключены (MONITOR_ADAPTIVE=false)\n"
+        
+        await update.message.reply_text(text)
+    
+    async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /history [сервис] - доступность и задержки по истории проверок"""
+        if not self.monitoring_enabled:
+            await update.message.reply_text("⏸ Фоновый мониторинг отключен (MONITOR_ENABLED=false), история не ведется")
+            return
+        
+        query = ' '.join(context.args) if context.args else ''
+        text = await self.service_monitor.monitor_loop.call(self._format_history, query)
+        await update.message.reply_text(text)
+    
+    def _format_history(self, query: str) -> str:
+        """Текст ответа /history (выполняется в потоке монитора)"""
+        if not query:
+            rows = []
+            for name, history in self.history.services.items():
+                availability = history.window(HISTORY_LIST_WINDOW)['availability']
+                if availability is not None:
+                    rows.append((availability, name))
+            if not rows:
+                return "📈 История пока пуста: фоновые проверки еще не выполнялись"
+            rows.sort()
+            text = "📈 Доступность за 24 ч (сначала худшие):\n\n"
+            for availability, name in rows[:HISTORY_LIST_LIMIT]:
+                text += f"• {name}: {availability:.2%}\n"
+            if len(rows) > HISTORY_LIST_LIMIT:
+                text += f"... и еще {len(rows) - HISTORY_LIST_LIMIT}\n"
+            text += "\nПодробнее: /history <сервис>"
+            return text
+        
+        names = self.history.find(query)
+        if not names:
+            return f"❌ Нет истории для сервиса: {query}"
+        if len(names) > 1:
+            return "🔎 Найдено несколько сервисов, уточните имя:\n" + "\n".join(f"• {n}" for n in names[:20])
+        
+        name = names[0]
+        history = self.history.get(name)
+        text = f"📈 История сервиса {name}\n\n"
+        for label, seconds in HISTORY_WINDOWS:
+            stats = history.window(seconds)
+            if not stats['samples']:
+                text += f"{label}: нет данных\n"
+                continue
+            text += f"{label}: доступность {stats['availability']:.2%} ({stats['samples']} проверок)"
+            if stats['p50'] is not None:
+                text += (f", p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s,"
+                         f" p99 {stats['p99']:.3f}s")
+            text += "\n"
+        marks = {'healthy': '🟢', 'unhealthy': '🔴', 'unknown': '⚪'}
+        text += "\nПоследние проверки: " + ''.join(marks[s] for s in history.last(20))
+        return text
+    
+    async def uptime_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /uptime <сервис> [период] - доступность по сохраненной истории"""
+        if self.store is None:
+            await update.message.reply_text("⏸ Хранилище результатов отключено (STORE_ENABLED=false)")
+            return
+        if not context.args:
+            await update.message.reply_text("Использование: /uptime <сервис> [период]\nПример: /uptime rag-service 30d")
+            return
+        
+        query = context.args[0]
+        try:
+            period = parse_duration(context.args[1]) if len(context.args) > 1 else UPTIME_DEFAULT_PERIOD
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}. Примеры: 2h, 7d, 30d")
+            return
+        
+        try:
+            names = await asyncio.to_thread(self.store.service_names)
+            if query not in names:
+                names = [name for name in names if query.lower() in name.lower()]
+                if not names:
+                    await update.message.reply_text(f"❌ Нет сохраненных данных для сервиса: {query}")
+                    return
+                if len(names) > 1:
+                    await update.message.reply_text(
+                        "🔎 Найдено несколько сервисов, уточните имя:\n" + "\n".join(f"• {n}" for n in names[:20])
+                    )
+                    return
+                query = names[0]
+            
+            result = await asyncio.to_thread(self.store.uptime, query, time.time() - period)
+        except Exception as e:
+            logger.error(f"Ошибка запроса uptime для {query}: {e}")
+            await update.message.reply_text(f"❌ Ошибка при запросе истории: {str(e)}")
+            return
+        
+        period_text = context.args[1] if len(context.args) > 1 else "24h"
+        if not result or not result['samples']:
+            await update.message.reply_text(f"📭 Нет данных по {query} за {period_text}")
+            return
+        text = f"⏱ Uptime {query} за {period_text}: {result['availability']:.3%}\n"
+        text += f"• Проверок: {result['samples']}\n"
+        if result['avg_response_time'] is not None:
+            text += f"• Время ответа: среднее {result['avg_response_time']:.3f}s, максимум {result['max_response_time']:.3f}s\n"
+        await update.message.reply_text(text)
+    
+    async def _require_admin(self, update: Update) -> bool:
+        """Проверка доступа к командам администратора (ADMIN_IDS)"""
+        if update.effective_user and update.effective_user.id in self.admin_ids:
+            return True
+        await update.message.reply_text("⛔ Команда доступна только администраторам (ADMIN_IDS)")
+        return False
+    
+    async def perf_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /perf [reset] - самые медленные операции"""
+        if not await self._require_admin(update):
+            return
+        if context.args and context.args[0] == 'reset':
+            perf.SPANS.reset()
+            await update.message.reply_text("⏱ Замеры сброшены")
+            return
+        await update.message.reply_text(perf.format_spans(perf.SPANS.top(), perf.SPANS.started_at))
+    
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /profile [секунды] - профиль всех потоков бота файлом"""
+        if not await self._require_admin(update):
+            return
+        try:
+            seconds = float(context.args[0]) if context.args else PROFILE_DEFAULT_SECONDS
+        except ValueError:
+            await update.message.reply_text("Использование: /profile [секунды]\nПример: /profile 30")
+            return
+        if not 0 < seconds <= perf.MAX_PROFILE_SECONDS:
+            await update.message.reply_text(f"❌ Длительность должна быть от 0 до {perf.MAX_PROFILE_SECONDS} секунд")
+            return
+        if self._profiling:
+            await update.message.reply_text("⏳ Профилирование уже идет")
+            return
+        
+        self._profiling = True
+        try:
+            await update.message.reply_text(f"🔬 Профилирую {seconds:g} с...")
+            report = await asyncio.to_thread(perf.profile, seconds)
+        finally:
+            self._profiling = False
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            document=io.BytesIO(report.encode('utf-8')),
+            filename=f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            caption=f"🔬 Профиль за {seconds:g} с"
+        )
+    
     def run(self):
         """Запуск бота"""
         logger.info("Запуск HealthCheck бота...")
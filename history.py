@@ -0,0 +1,143 @@
+import os
+import math
+import time
+import logging
+from array import array
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних результатов хранить на сервис (переопределяется через HISTORY_SIZE)
+DEFAULT_HISTORY_SIZE = 1440
+
+# Коды статусов в буфере
+STATUS_CODES = {'healthy': 1, 'unhealthy': 0, 'unknown': -1}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+def history_size() -> int:
+    try:
+        return max(16, int(os.getenv('HISTORY_SIZE', DEFAULT_HISTORY_SIZE)))
+    except ValueError:
+        logger.warning(f"Некорректный HISTORY_SIZE, используем {DEFAULT_HISTORY_SIZE}")
+        return DEFAULT_HISTORY_SIZE
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Перцентиль по методу ближайшего ранга для отсортированного списка"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class ServiceHistory:
+    """Кольцевой буфер результатов проверок одного сервиса
+
+    Хранит три параллельных массива фиксированного размера: время (uint32,
+    секунды epoch), код статуса (int8) и время ответа (float32, NaN если нет),
+    всего 9 байт на результат без отдельного объекта на каждую запись.
+    """
+
+    __slots__ = ('capacity', 'timestamps', 'codes', 'response_times', 'start', 'count')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('I', bytes(4 * capacity))
+        self.codes = array('b', bytes(capacity))
+        self.response_times = array('f', bytes(4 * capacity))
+        # Индекс самой старой записи и число записей
+        self.start = 0
+        self.count = 0
+
+    def append(self, timestamp: float, status: str, response_time: Optional[float]):
+        if self.count < self.capacity:
+            index = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[index] = int(timestamp)
+        self.codes[index] = STATUS_CODES.get(status, -1)
+        self.response_times[index] = response_time if response_time is not None else math.nan
+
+    def _index(self, position: int) -> int:
+        """Индекс в массивах для position-й записи от самой старой"""
+        return (self.start + position) % self.capacity
+
+    def _first_position(self, since: float) -> int:
+        """Позиция первой записи не раньше since (бинарный поиск по кольцу)"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[self._index(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(self, seconds: Optional[float] = None, now: Optional[float] = None) -> Dict:
+        """Доступность и перцентили времени ответа за последние seconds секунд (None — вся история)"""
+        first = 0
+        if seconds is not None:
+            first = self._first_position((now if now is not None else time.time()) - seconds)
+        total = healthy = 0
+        response_times = []
+        for position in range(first, self.count):
+            index = self._index(position)
+            total += 1
+            if self.codes[index] == 1:
+                healthy += 1
+            value = self.response_times[index]
+            if value == value:  # не NaN
+                response_times.append(value)
+        response_times.sort()
+        return {
+            'samples': total,
+            'availability': healthy / total if total else None,
+            'p50': percentile(response_times, 50),
+            'p95': percentile(response_times, 95),
+            'p99': percentile(response_times, 99),
+        }
+
+    def last(self, n: int) -> List[str]:
+        """Статусы последних n проверок, от старых к новым"""
+        return [STATUS_NAMES[self.codes[self._index(position)]]
+                for position in range(max(0, self.count - n), self.count)]
+
+    def last_timestamp(self) -> Optional[int]:
+        return self.timestamps[self._index(self.count - 1)] if self.count else None
+
+
+class HistoryStore:
+    """История проверок по сервисам с фиксированной памятью на сервис"""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or history_size()
+        self.services: Dict[str, ServiceHistory] = {}
+
+    def record(self, name: str, status, timestamp: Optional[float] = None):
+        """Запись результата проверки (ServiceStatus)"""
+        history = self.services.get(name)
+        if history is None:
+            history = self.services[name] = ServiceHistory(self.capacity)
+        # Время записи, а не last_check: записи в буфере остаются упорядоченными по времени
+        history.append(timestamp if timestamp is not None else time.time(),
+                       status.status, status.response_time)
+
+    def remove(self, name: str):
+        self.services.pop(name, None)
+
+    def get(self, name: str) -> Optional[ServiceHistory]:
+        return self.services.get(name)
+
+    def find(self, query: str) -> List[str]:
+        """Имена сервисов: точное совпадение или все, содержащие query"""
+        if query in self.services:
+            return [query]
+        query = query.lower()
+        return sorted(name for name in self.services if query in name.lower())
+
+    def memory_bytes(self) -> int:
+        """Объем памяти буферов"""
+        return len(self.services) * self.capacity * 9
@@ -0,0 +1,128 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+import perf
+
+logger = logging.getLogger(__name__)
+
+# Метод проверки: GET (потоковый, с ограничением чтения тела) или HEAD
+DEFAULT_METHOD = 'GET'
+# Сколько байт тела ответа читать при GET; маленькие ответы дочитываются целиком,
+# и соединение возвращается в пул, большие закрываются досрочно
+DEFAULT_MAX_BODY = 64 * 1024
+# Параметры пула соединений
+DEFAULT_MAX_CONNECTIONS = 200
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+# Сколько перенаправлений проходить; статус берется у конечного ответа.
+# 0 — не следовать перенаправлениям, сам ответ 3xx считается успешным
+DEFAULT_MAX_REDIRECTS = 10
+
+# Коды, которыми сервер сообщает, что HEAD не поддерживается
+HEAD_UNSUPPORTED_CODES = (405, 501)
+
+
+class HttpProbe:
+    """Асинхронный HTTP-пробер с пулом keep-alive соединений
+
+    Работает прямо в event loop: сотни URL проверяются одновременно без
+    отдельного потока на каждый запрос. Клиент привязан к event loop, в
+    котором был создан, поэтому для каждого loop создается свой; aclose()
+    закрывает их все.
+    """
+
+    def __init__(self,
+                 method: Optional[str] = None,
+                 max_body: Optional[int] = None,
+                 max_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None,
+                 max_redirects: Optional[int] = None):
+        self.method = (method or os.getenv('HTTP_PROBE_METHOD', DEFAULT_METHOD)).upper()
+        if self.method not in ('GET', 'HEAD'):
+            logger.warning(f"Неподдерживаемый HTTP_PROBE_METHOD={self.method}, используем GET")
+            self.method = 'GET'
+        self.max_body = max_body if max_body is not None else int(
+            os.getenv('HTTP_PROBE_MAX_BODY', DEFAULT_MAX_BODY))
+        self.max_connections = max_connections or int(
+            os.getenv('HTTP_PROBE_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS))
+        self.keepalive_expiry = keepalive_expiry if keepalive_expiry is not None else float(
+            os.getenv('HTTP_PROBE_KEEPALIVE', DEFAULT_KEEPALIVE_EXPIRY))
+        self.max_redirects = max_redirects if max_redirects is not None else int(
+            os.getenv('HTTP_PROBE_MAX_REDIRECTS', DEFAULT_MAX_REDIRECTS))
+
+        self._clients: Dict[asyncio.AbstractEventLoop, 'httpx.AsyncClient'] = {}
+        # URL, которые отвечают на HEAD кодом 405/501 — для них сразу используем GET
+        self._head_unsupported: Set[str] = set()
+
+    def _get_client(self) -> 'httpx.AsyncClient':
+        """Клиент для текущего event loop"""
+        # Пакет httpx импортируется при первой проверке: его загрузка не задерживает запуск
+        import httpx
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            self._drop_closed_loops()
+            client = httpx.AsyncClient(
+                verify=False,
+                follow_redirects=self.max_redirects > 0,
+                max_redirects=max(self.max_redirects, 0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+            )
+            self._clients[loop] = client
+        return client
+
+    def _drop_closed_loops(self):
+        """Удаление клиентов закрытых event loop: закрыть их корректно уже нельзя"""
+        for loop in [loop for loop in self._clients if loop.is_closed()]:
+            logger.warning("Event loop HTTP клиента закрыт до aclose(), клиент отброшен")
+            del self._clients[loop]
+
+    @perf.timed('http.probe')
+    async def probe(self, url: str, timeout: float = 10) -> Tuple[int, float]:
+        """Проверка URL, возвращает (HTTP код, время ответа в секундах)
+
+        Перенаправления проходятся до конечного ответа (не больше max_redirects),
+        время ответа измеряется до получения его заголовков. Исключения httpx
+        пробрасываются вызывающему коду.
+        """
+        client = self._get_client()
+        start_time = time.monotonic()
+
+        if self.method == 'HEAD' and url not in self._head_unsupported:
+            response = await client.head(url, timeout=timeout)
+            if response.status_code not in HEAD_UNSUPPORTED_CODES:
+                return response.status_code, time.monotonic() - start_time
+            self._head_unsupported.add(url)
+            start_time = time.monotonic()
+
+        async with client.stream('GET', url, timeout=timeout) as response:
+            response_time = time.monotonic() - start_time
+            if self.max_body > 0:
+                read = 0
+                async for chunk in response.aiter_raw():
+                    read += len(chunk)
+                    if read >= self.max_body:
+                        break
+            return response.status_code, response_time
+
+    async def aclose(self):
+        """Закрытие пулов соединений всех клиентов
+
+        Клиент другого работающего loop закрывается в его собственном loop.
+        """
+        self._drop_closed_loops()
+        current = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is current:
+                await client.aclose()
+            elif not loop.is_running():
+                logger.warning("Event loop HTTP клиента остановлен, клиент отброшен без закрытия")
+            else:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
@@ -0,0 +1,124 @@
+import os
+import zlib
+import logging
+import tempfile
+from typing import BinaryIO, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, по умолчанию используется gzip
+    zstandard = None
+
+# Блок чтения исходного файла
+EXPORT_BLOCK_SIZE = 1024 * 1024
+# Сколько держать в памяти до сброса части на диск: дальше часть пишется во
+# временный файл в tempfile.gettempdir() (TMPDIR, по умолчанию /tmp)
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+# Запас на заголовки и финальный сброс компрессора
+PART_OVERHEAD = 1024 * 1024
+
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+
+def export_compression() -> str:
+    """Алгоритм сжатия из LOG_EXPORT_COMPRESSION: gzip (по умолчанию), zstd или none"""
+    compression = os.getenv('LOG_EXPORT_COMPRESSION', 'gzip').lower()
+    if compression not in EXTENSIONS:
+        logger.warning(f"Неизвестный LOG_EXPORT_COMPRESSION={compression}, используем gzip")
+        return 'gzip'
+    if compression == 'zstd' and zstandard is None:
+        logger.warning("Пакет zstandard не установлен, используем gzip")
+        return 'gzip'
+    return compression
+
+
+class _Identity:
+    """Компрессор-заглушка для экспорта без сжатия"""
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self, mode=None) -> bytes:
+        return b''
+
+
+def _compressor(compression: str):
+    """Компрессор и режим flush(), выдающий все уже переданные ему данные без завершения потока"""
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31), zlib.Z_SYNC_FLUSH
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compressobj(), zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    return _Identity(), None
+
+
+class ExportPart:
+    """Часть экспорта: самостоятельно распаковываемый файл не больше лимита"""
+
+    def __init__(self, compression: str):
+        self.file: BinaryIO = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self.compressor, self.sync_mode = _compressor(compression)
+        self.size = 0
+        self.raw_size = 0
+
+    def write(self, data: bytes):
+        """Сжатие блока; компрессор сбрасывается после каждого блока, поэтому size
+        учитывает все записанные данные, а не только уже выданные компрессором"""
+        self.raw_size += len(data)
+        self._put(self.compressor.compress(data))
+        self._put(self.compressor.flush(self.sync_mode))
+
+    def finish(self):
+        self._put(self.compressor.flush())
+        self.file.seek(0)
+
+    def _put(self, data: bytes):
+        if data:
+            self.file.write(data)
+            self.size += len(data)
+
+    def close(self):
+        self.file.close()
+
+
+def export_range(path: str, start: int, end: Optional[int], part_limit: int,
+                 compression: str = 'gzip') -> List[ExportPart]:
+    """Потоковое сжатие диапазона файла [start, end) в части не больше part_limit байт
+
+    Данные читаются блоками прямо из исходного файла и сжимаются в буферы
+    SpooledTemporaryFile: до SPOOL_MAX_MEMORY часть держится в памяти, дальше
+    сбрасывается во временный файл в каталоге tempfile.gettempdir() (TMPDIR,
+    по умолчанию /tmp), который удаляется при close(). Возвращаются все части
+    сразу, поэтому на время отправки диск занимает весь сжатый результат.
+    Новая часть начинается, если следующий блок в худшем случае (несжимаемые
+    данные) не поместится в текущую.
+    """
+    parts: List[ExportPart] = []
+    part: Optional[ExportPart] = None
+    try:
+        with open(path, 'rb') as f:
+            if end is None:
+                end = f.seek(0, os.SEEK_END)
+            block_size = min(EXPORT_BLOCK_SIZE, max(1, part_limit - PART_OVERHEAD))
+            f.seek(start)
+            position = start
+            while position < end:
+                block = f.read(min(block_size, end - position))
+                if not block:
+                    break
+                position += len(block)
+                if part is not None and part.size + len(block) + PART_OVERHEAD > part_limit:
+                    part.finish()
+                    part = None
+                if part is None:
+                    part = ExportPart(compression)
+                    parts.append(part)
+                part.write(block)
+        if part is not None:
+            part.finish()
+    except Exception:
+        for item in parts:
+            item.close()
+        raise
+    return parts
@@ -0,0 +1,341 @@
+import os
+import time
+import ctypes
+import ctypes.util
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from telegram.error import BadRequest, RetryAfter
+
+from log_reader import decode_lines
+
+logger = logging.getLogger(__name__)
+
+# Интервал опроса файла, если inotify недоступен, и страховочный интервал при inotify
+FOLLOW_POLL_INTERVAL = 1.0
+FOLLOW_SAFETY_INTERVAL = 5.0
+# Не чаще одного редактирования сообщения в чате за столько секунд
+# (лимиты Telegram: ~1 сообщение в секунду на чат, 20 в минуту в группах)
+FOLLOW_EDIT_INTERVAL = 3.0
+# Автоматическая остановка слежения, минуты
+FOLLOW_DEFAULT_MINUTES = 10
+FOLLOW_MAX_MINUTES = 60
+# Размер текста одного сообщения; при переполнении начинается новое сообщение
+FOLLOW_MESSAGE_SIZE = 3500
+# Сколько байт новых данных читать за раз; при большем отставании хвост пропускается
+FOLLOW_MAX_READ = 256 * 1024
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+class _Inotify:
+    """Минимальная обертка над inotify(7) через ctypes, интегрированная с event loop"""
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, on_event: Callable[[], None]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+        self.loop = loop
+        self.on_event = on_event
+        loop.add_reader(self.fd, self._read)
+
+    def _read(self):
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        self.on_event()
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+
+
+class LogFollower:
+    """Общий читатель новых строк лог-файла для всех подписчиков
+
+    Ждет изменений через inotify (при недоступности — опросом), читает
+    дописанные данные и раздает целые строки подписчикам. Обнаруживает
+    усечение и замену файла. Останавливается, когда не остается подписчиков.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.subscribers: Set[Callable[[List[str]], None]] = set()
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._inotify: Optional[_Inotify] = None
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._partial = b''
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        self.subscribers.add(callback)
+        if self._task is None or self._task.done():
+            stat = os.stat(self.path)
+            self._offset, self._inode = stat.st_size, stat.st_ino
+            self._partial = b''
+            self._task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, callback: Callable[[List[str]], None]):
+        self.subscribers.discard(callback)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+
+    def _watch(self):
+        """Подписка на inotify для текущего файла (симлинк разыменовывается)"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        try:
+            self._inotify = _Inotify(os.path.realpath(self.path), asyncio.get_running_loop(),
+                                     self._changed.set)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify недоступен для {self.path}, используем опрос: {e}")
+
+    async def _run(self):
+        self._watch()
+        try:
+            while self.subscribers:
+                interval = FOLLOW_SAFETY_INTERVAL if self._inotify else FOLLOW_POLL_INTERVAL
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._changed.clear()
+                try:
+                    lines, replaced = await asyncio.to_thread(self._read_new)
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.error(f"Ошибка чтения {self.path}: {e}")
+                    continue
+                if replaced:
+                    # Файл заменен: переподписываемся на inotify нового файла
+                    self._watch()
+                if lines:
+                    for callback in list(self.subscribers):
+                        callback(lines)
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def _read_new(self) -> Tuple[List[str], bool]:
+        """Чтение дописанных данных (выполняется в отдельном потоке)
+
+        Возвращает новые строки и признак замены файла.
+        """
+        stat = os.stat(self.path)
+        lines: List[str] = []
+        replaced = stat.st_ino != self._inode
+        if replaced or stat.st_size < self._offset:
+            lines.append("--- лог усечен или заменен ---\n")
+            self._inode, self._offset, self._partial = stat.st_ino, 0, b''
+        if stat.st_size == self._offset:
+            return lines, replaced
+
+        with open(self.path, 'rb') as f:
+            if stat.st_size - self._offset > FOLLOW_MAX_READ:
+                skipped = stat.st_size - FOLLOW_MAX_READ - self._offset
+                lines.append(f"--- пропущено {skipped} байт ---\n")
+                self._offset, self._partial = stat.st_size - FOLLOW_MAX_READ, b''
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        self._offset += len(data)
+
+        data = self._partial + data
+        cut = data.rfind(b'\n') + 1
+        self._partial = data[cut:]
+        return lines + decode_lines(data[:cut]), replaced
+
+
+class FollowSession:
+    """Слежение за логом в одном чате
+
+    Новые строки копятся в буфере и не чаще раза в FOLLOW_EDIT_INTERVAL
+    дописываются в одно сообщение редактированием; при переполнении
+    сообщения начинается следующее. Сессия завершается по таймауту.
+    """
+
+    def __init__(self, bot, chat_id: int, container: str, follower: LogFollower, minutes: float):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.container = container
+        self.follower = follower
+        self.expires_at = time.monotonic() + minutes * 60
+        self.pending: List[str] = []
+        self.pending_size = 0
+        self.message_id: Optional[int] = None
+        self.text = ''
+        self.lines_total = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.on_finish: Optional[Callable[['FollowSession'], None]] = None
+
+    @property
+    def header(self) -> str:
+        return f"📡 {self.container}\n"
+
+    def start(self):
+        self.follower.subscribe(self._on_lines)
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def _on_lines(self, lines: List[str]):
+        self.pending.extend(lines)
+        self.pending_size += sum(len(line) for line in lines)
+        self.lines_total += len(lines)
+        # Буфер не больше двух сообщений: при всплеске показываем самые новые строки
+        skipped = 0
+        while self.pending_size > FOLLOW_MESSAGE_SIZE * 2 and len(self.pending) > 1:
+            self.pending_size -= len(self.pending.pop(0))
+            skipped += 1
+        if skipped:
+            marker = f"--- пропущено строк: {skipped} ---\n"
+            self.pending.insert(0, marker)
+            self.pending_size += len(marker)
+        self._wakeup.set()
+
+    async def _run(self):
+        reason = "⏹ Слежение остановлено по таймауту"
+        try:
+            while True:
+                remaining = self.expires_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._wakeup.clear()
+                try:
+                    await self._flush()
+                except Exception as e:
+                    # Например, сообщение удалено или нет связи с Telegram
+                    logger.error(f"Ошибка отправки строк слежения за {self.container}: {e}")
+                    reason = "⚠️ Слежение остановлено из-за ошибки"
+                    # Итог отправляется новым сообщением: текущее могло быть удалено
+                    self.message_id, self.text = None, ''
+                    break
+                # Ограничение частоты редактирований в чате
+                await asyncio.sleep(FOLLOW_EDIT_INTERVAL)
+        except asyncio.CancelledError:
+            reason = "⏹ Слежение остановлено"
+        finally:
+            self.follower.unsubscribe(self._on_lines)
+            if self.on_finish:
+                self.on_finish(self)
+        try:
+            await self._flush()
+            await self.bot.send_message(
+                chat_id=self.chat_id,
+                text=f"{reason}: {self.container} (получено строк: {self.lines_total})"
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось отправить завершение слежения за {self.container}: {e}")
+
+    async def _flush(self):
+        """Одно обращение к Telegram: дописывание строк в текущее сообщение или начало нового
+
+        Оставшиеся строки публикуются на следующей итерации, после паузы.
+        """
+        if not self.pending:
+            return
+        if self.text and len(self.text) + len(self.pending[0]) > FOLLOW_MESSAGE_SIZE:
+            # Текущее сообщение заполнено — следующее начнется с новых строк
+            self.message_id, self.text = None, ''
+        taken = []
+        chunk = ''
+        while self.pending and len(self.text) + len(chunk) + len(self.pending[0]) <= FOLLOW_MESSAGE_SIZE:
+            line = self.pending.pop(0)
+            taken.append(line)
+            chunk += line
+        if not chunk:
+            # Одна строка длиннее сообщения — обрезаем
+            line = self.pending.pop(0)
+            taken.append(line)
+            chunk = line[:FOLLOW_MESSAGE_SIZE]
+        self.pending_size -= sum(len(line) for line in taken)
+        try:
+            await self._publish(self.text + chunk)
+        except BaseException:
+            # Неотправленные строки (ошибка или отмена сессии) возвращаются в буфер
+            self.pending[:0] = taken
+            self.pending_size += sum(len(line) for line in taken)
+            raise
+        if self.pending:
+            self._wakeup.set()
+
+    async def _publish(self, text: str):
+        """Отправка или редактирование сообщения с учетом RetryAfter"""
+        while True:
+            try:
+                if self.message_id is None:
+                    message = await self.bot.send_message(chat_id=self.chat_id, text=self.header + text)
+                    self.message_id = message.message_id
+                else:
+                    await self.bot.edit_message_text(
+                        text=self.header + text,
+                        chat_id=self.chat_id,
+                        message_id=self.message_id
+                    )
+                self.text = text
+                return
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    self.text = text
+                    return
+                raise
+
+
+class FollowManager:
+    """Сессии слежения по чатам и общие читатели по файлам"""
+
+    def __init__(self):
+        self.followers: Dict[str, LogFollower] = {}
+        self.sessions: Dict[int, FollowSession] = {}
+
+    def start(self, bot, chat_id: int, container: str, log_file: str, minutes: float) -> FollowSession:
+        """Запуск слежения в чате; предыдущая сессия этого чата останавливается"""
+        self.stop(chat_id)
+        follower = self.followers.get(log_file)
+        if follower is None:
+            follower = self.followers[log_file] = LogFollower(log_file)
+        session = FollowSession(bot, chat_id, container, follower, minutes)
+        session.on_finish = self._on_finish
+        self.sessions[chat_id] = session
+        session.start()
+        return session
+
+    def stop(self, chat_id: int) -> bool:
+        session = self.sessions.pop(chat_id, None)
+        if session is None:
+            return False
+        session.stop()
+        return True
+
+    def _on_finish(self, session: FollowSession):
+        if self.sessions.get(session.chat_id) is session:
+            del self.sessions[session.chat_id]
+        if not session.follower.subscribers:
+            self.followers.pop(session.follower.path, None)
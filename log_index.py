@@ -0,0 +1,169 @@
+import os
+import json
+import bisect
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from log_reader import find_time_offset, first_timestamp_after
+
+logger = logging.getLogger(__name__)
+
+# Шаг разреженного индекса: одна запись на столько байт лога
+INDEX_INTERVAL = 1024 * 1024
+# Сколько байт начала файла используется как отпечаток для обнаружения ротации
+FINGERPRINT_SIZE = 1024
+INDEX_VERSION = 1
+
+
+def index_path_for(log_path: str) -> str:
+    """Путь к файлу индекса рядом с логом: /dir/.name.log.idx"""
+    directory, name = os.path.split(log_path)
+    return os.path.join(directory, f".{name}.idx")
+
+
+class LogIndex:
+    """Разреженный индекс меток времени лог-файла: время -> смещение
+
+    Записи добавляются инкрементально по мере роста файла (примерно одна на
+    INDEX_INTERVAL байт). Индекс перестраивается, если файл усечен, заменен
+    (другой inode, например после перенаправления симлинка) или изменилось
+    его начало. Индекс сохраняется рядом с логом и переживает перезапуск бота;
+    если директория недоступна для записи, индекс живет только в памяти.
+    """
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None):
+        self.log_path = log_path
+        self.index_path = index_path or index_path_for(log_path)
+        self.inode: Optional[int] = None
+        self.indexed_size = 0
+        self.fingerprint = ''
+        self.fingerprint_size = 0
+        # До какого смещения файл уже просмотрен: следующее обновление продолжает
+        # отсюда, даже если в просмотренной части не нашлось меток времени
+        self.scanned_to = 0
+        # Отсортированные по времени пары (смещение строки, метка времени)
+        self.offsets: List[int] = []
+        self.timestamps: List[float] = []
+        self._lock = threading.Lock()
+        self._save_failed = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return
+            self.inode = data['inode']
+            self.indexed_size = data['size']
+            self.fingerprint = data['fingerprint']
+            self.fingerprint_size = data['fingerprint_size']
+            self.offsets = [entry[0] for entry in data['entries']]
+            self.timestamps = [entry[1] for entry in data['entries']]
+            # Индексы, сохраненные до появления scanned_to, продолжают от последней записи
+            self.scanned_to = data.get(
+                'scanned_to', self.offsets[-1] + INDEX_INTERVAL if self.offsets else 0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить индекс {self.index_path}: {e}")
+
+    def _save(self):
+        data = {
+            'version': INDEX_VERSION,
+            'inode': self.inode,
+            'size': self.indexed_size,
+            'fingerprint': self.fingerprint,
+            'fingerprint_size': self.fingerprint_size,
+            'scanned_to': self.scanned_to,
+            'entries': list(zip(self.offsets, self.timestamps))
+        }
+        temp_path = f"{self.index_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+            self._save_failed = False
+        except OSError as e:
+            if not self._save_failed:
+                logger.warning(f"Не удалось сохранить индекс {self.index_path}: {e}")
+            self._save_failed = True
+
+    @staticmethod
+    def _fingerprint(f, size: int) -> str:
+        f.seek(0)
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+    def _reset(self, f, inode: int, size: int):
+        self.inode = inode
+        self.indexed_size = 0
+        self.fingerprint_size = min(FINGERPRINT_SIZE, size)
+        self.fingerprint = self._fingerprint(f, self.fingerprint_size)
+        self.scanned_to = 0
+        self.offsets = []
+        self.timestamps = []
+
+    def update(self) -> bool:
+        """Дополнение индекса новыми данными файла; True, если индекс изменился"""
+        with self._lock:
+            stat = os.stat(self.log_path)
+            with open(self.log_path, 'rb') as f:
+                size = stat.st_size
+                rotated = (
+                    stat.st_ino != self.inode
+                    or size < self.indexed_size
+                    or self._fingerprint(f, self.fingerprint_size) != self.fingerprint
+                )
+                if rotated:
+                    if self.inode is not None:
+                        logger.info(f"Лог {self.log_path} усечен или заменен, перестраиваем индекс")
+                    self._reset(f, stat.st_ino, size)
+                elif size == self.indexed_size:
+                    return False
+
+                if self.fingerprint_size < FINGERPRINT_SIZE and size > self.fingerprint_size:
+                    # Файл был короче отпечатка — расширяем отпечаток по мере роста
+                    self.fingerprint_size = min(FINGERPRINT_SIZE, size)
+                    self.fingerprint = self._fingerprint(f, self.fingerprint_size)
+
+                position = self.scanned_to
+                while position < size:
+                    offset, timestamp = first_timestamp_after(f, position, size)
+                    if timestamp is None:
+                        # До конца файла меток нет — повторно эту часть не просматриваем
+                        position = size
+                        break
+                    # Непоследовательные метки времени пропускаем, чтобы сохранить сортировку
+                    if not self.timestamps or timestamp >= self.timestamps[-1]:
+                        self.offsets.append(offset)
+                        self.timestamps.append(timestamp)
+                    position = offset + INDEX_INTERVAL
+
+                self.scanned_to = position
+                self.indexed_size = size
+            self._save()
+            return True
+
+    def lookup(self, since: float) -> int:
+        """Смещение первой строки с меткой времени >= since
+
+        По индексу выбирается интервал между соседними записями, внутри
+        которого выполняется бинарный поиск по файлу.
+        """
+        with self._lock:
+            index = bisect.bisect_left(self.timestamps, since)
+            low = self.offsets[index - 1] if index > 0 else 0
+            high = self.offsets[index] if index < len(self.offsets) else None
+        with open(self.log_path, 'rb') as f:
+            return find_time_offset(f, since, low, high)
+
+    def range(self, since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        """Диапазон смещений [начало, конец) для записей с since <= время < until"""
+        start = self.lookup(since) if since is not None else 0
+        if until is not None:
+            end = self.lookup(until)
+        else:
+            end = os.path.getsize(self.log_path)
+        return start, max(start, end)
@@ -0,0 +1,317 @@
+import io
+import os
+import re
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Deque, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Размер блока при чтении файла с конца
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def find_tail_offset(f: BinaryIO, max_lines: int, block_size: int = TAIL_BLOCK_SIZE) -> int:
+    """Смещение начала последних max_lines строк файла
+
+    Файл читается блоками от конца к началу, пока не найдено нужное число
+    переводов строки. Завершающий перевод строки в конце файла новую строку
+    не начинает.
+    """
+    size = f.seek(0, os.SEEK_END)
+    if size == 0 or max_lines <= 0:
+        return size
+
+    position = size
+    newlines = 0
+    skip_trailing = True
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size)
+
+        end = len(block)
+        if skip_trailing:
+            skip_trailing = False
+            if block.endswith(b'\n'):
+                end -= 1
+
+        index = block.rfind(b'\n', 0, end)
+        while index != -1:
+            newlines += 1
+            if newlines == max_lines:
+                return position + index + 1
+            index = block.rfind(b'\n', 0, index)
+
+    return 0
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """Декодирование байтов в строки с сохранением окончаний (как readlines)
+
+    Граница блока всегда проходит по байту \\n, который не встречается внутри
+    многобайтовых последовательностей UTF-8, поэтому символы не разрываются.
+    Строки разделяются только по \\n (\\r\\n приводится к \\n), одиночный \\r
+    остается внутри строки — так прогресс-бары не дробятся на сотни строк.
+    """
+    return io.StringIO(decode_text(data), newline='\n').readlines()
+
+
+def decode_text(data: bytes) -> str:
+    """Декодирование участка лога в текст с приведением \\r\\n к \\n"""
+    return data.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+
+
+def read_tail(path: str, max_lines: int) -> Tuple[int, List[str]]:
+    """Последние max_lines строк файла и смещение, с которого они начинаются
+
+    Память ограничена размером результата, а не размером файла.
+    """
+    with open(path, 'rb') as f:
+        offset = find_tail_offset(f, max_lines)
+        f.seek(offset)
+        return offset, decode_lines(f.read())
+
+
+# Метка времени в начале строки лога: ISO 8601 / RFC 3339 (в т.ч. с наносекундами docker --timestamps)
+TIMESTAMP_RE = re.compile(
+    r'(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:[.,](\d+))?\s?(Z|[+-]\d{2}:?\d{2})?'
+)
+# Сколько символов от начала строки просматривать в поисках метки времени
+TIMESTAMP_SCAN_CHARS = 80
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+# Размер блока при потоковом поиске
+GREP_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_duration(value: str) -> float:
+    """Длительность вида 30s, 15m, 2h, 1d, 1w в секундах"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhdw]?)', value.strip().lower())
+    if not match:
+        raise ValueError(f"Некорректная длительность: {value}")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+
+def parse_size(value: str) -> int:
+    """Размер вида 512K, 100M, 2G в байтах"""
+    match = re.fullmatch(r'(\d+)([bkmg]?)b?', value.strip().lower())
+    if not match:
+        raise ValueError(f"Некорректный размер: {value}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def parse_line_timestamp(line: str) -> Optional[float]:
+    """Метка времени строки лога в секундах epoch или None
+
+    Время без часового пояса считается локальным.
+    """
+    match = TIMESTAMP_RE.search(line, 0, TIMESTAMP_SCAN_CHARS)
+    if not match:
+        return None
+    date_part, time_part, fraction, tz = match.groups()
+    try:
+        dt = datetime.strptime(f"{date_part} {time_part}", '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+    if fraction:
+        dt = dt.replace(microsecond=int(fraction[:6].ljust(6, '0')))
+    if tz:
+        if tz == 'Z':
+            offset = timedelta(0)
+        else:
+            sign = -1 if tz[0] == '-' else 1
+            digits = tz[1:].replace(':', '')
+            offset = sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+        return dt.replace(tzinfo=timezone(offset)).timestamp()
+    return dt.timestamp()
+
+
+def next_line_offset(f: BinaryIO, offset: int) -> int:
+    """Смещение начала первой полной строки, начинающейся не раньше offset"""
+    if offset <= 0:
+        return 0
+    f.seek(offset - 1)
+    while True:
+        block = f.read(TAIL_BLOCK_SIZE)
+        if not block:
+            return f.tell()
+        index = block.find(b'\n')
+        if index != -1:
+            return f.tell() - len(block) + index + 1
+
+
+def first_timestamp_after(f: BinaryIO, offset: int, limit: int) -> Tuple[int, Optional[float]]:
+    """Первая строка с меткой времени, начинающаяся не раньше offset: (смещение строки, время)"""
+    position = next_line_offset(f, offset)
+    f.seek(position)
+    while position < limit:
+        line = f.readline()
+        if not line:
+            break
+        timestamp = parse_line_timestamp(line[:TIMESTAMP_SCAN_CHARS * 4].decode('utf-8', errors='ignore'))
+        if timestamp is not None:
+            return position, timestamp
+        position += len(line)
+    return limit, None
+
+
+def find_time_offset(f: BinaryIO, since: float, low: int = 0, high: Optional[int] = None) -> int:
+    """Смещение первой строки с меткой времени >= since (бинарный поиск по файлу)
+
+    Предполагается, что строки упорядочены по времени. Строки без метки
+    времени относятся к ближайшей предыдущей строке с меткой.
+    """
+    if high is None:
+        high = f.seek(0, os.SEEK_END)
+    limit = high
+    while low < high:
+        middle = (low + high) // 2
+        position, timestamp = first_timestamp_after(f, middle, high)
+        if timestamp is None or timestamp >= since:
+            high = middle
+        else:
+            low = position + 1
+    # Строки без метки в начале диапазона относятся к записи до since — пропускаем их
+    position, _ = first_timestamp_after(f, low, limit)
+    return position
+
+
+@dataclass
+class GrepResult:
+    """Результат поиска по логу"""
+    # Группы строк: совпадения вместе с контекстом, соседние группы объединены
+    blocks: List[List[str]] = field(default_factory=list)
+    matches: int = 0
+    scanned_bytes: int = 0
+    # Достигнут лимит совпадений
+    truncated: bool = False
+    # Поиск остановлен по бюджету времени
+    timed_out: bool = False
+
+
+class _GrepState:
+    """Состояние потокового поиска между блоками файла"""
+
+    def __init__(self, pattern: Pattern, max_matches: int, context: int):
+        self.pattern = pattern
+        self.max_matches = max_matches
+        self.context = context
+        self.result = GrepResult()
+        # Непоказанные строки перед текущей позицией (для контекста до совпадения)
+        self.recent: Deque[str] = deque(maxlen=context)
+        # Сколько строк пропущено после последней показанной
+        self.gap = 0
+        # Сколько строк контекста после совпадения еще нужно показать
+        self.after = 0
+
+    @property
+    def done(self) -> bool:
+        return self.result.truncated and self.after == 0
+
+    def _add_match(self, line: str):
+        blocks = self.result.blocks
+        before = list(self.recent)
+        if blocks and self.gap <= self.context:
+            # Пропущенные строки целиком попадают в контекст — продолжаем группу
+            blocks[-1].extend(before + [line])
+        else:
+            blocks.append(before + [line])
+        self.recent.clear()
+        self.gap = 0
+        self.result.matches += 1
+        self.after = self.context
+        if self.result.matches >= self.max_matches:
+            self.result.truncated = True
+
+    def _skip(self, text: str, start: int, end: int):
+        """Пропуск участка text[start:end] из целых строк с запоминанием контекста"""
+        self.gap += text.count('\n', start, end) + (0 if text.endswith('\n', start, end) else 1)
+        self.recent.extend(self._last_lines(text, start, end))
+
+    def _last_lines(self, text: str, start: int, end: int) -> List[str]:
+        """Последние context строк участка text[start:end], который начинается с начала строки"""
+        lines = []
+        position = end
+        while position > start and len(lines) < self.context:
+            line_start = text.rfind('\n', start, position - 1) + 1 or start
+            lines.append(text[line_start:position])
+            position = line_start
+        lines.reverse()
+        return lines
+
+    def feed(self, text: str):
+        """Обработка участка, состоящего из целых строк"""
+        position = 0
+        length = len(text)
+        while position < length and not self.done:
+            if self.after > 0:
+                end = text.find('\n', position)
+                end = length if end == -1 else end + 1
+                line = text[position:end]
+                if not self.result.truncated and self.pattern.search(line):
+                    self._add_match(line)
+                else:
+                    self.result.blocks[-1].append(line)
+                    self.after -= 1
+                position = end
+                continue
+
+            if self.result.truncated:
+                break
+
+            match = self.pattern.search(text, position)
+            if not match:
+                if position < length:
+                    self._skip(text, position, length)
+                break
+
+            line_start = text.rfind('\n', position, match.start()) + 1 or position
+            line_end = text.find('\n', match.start())
+            line_end = length if line_end == -1 else line_end + 1
+
+            if line_start > position:
+                self._skip(text, position, line_start)
+            self._add_match(text[line_start:line_end])
+            position = line_end
+
+
+def grep_file(path: str, pattern: Pattern, max_matches: int = 50, context: int = 0,
+              start_offset: int = 0, end_offset: Optional[int] = None,
+              deadline: Optional[float] = None) -> GrepResult:
+    """Потоковый поиск строк по регулярному выражению в диапазоне файла
+
+    Файл читается блоками по GREP_CHUNK_SIZE, незавершенная строка переносится
+    в следующий блок. deadline — значение time.monotonic(), после которого
+    поиск прекращается с флагом timed_out.
+    """
+    state = _GrepState(pattern, max_matches, context)
+    with open(path, 'rb') as f:
+        if end_offset is None:
+            end_offset = f.seek(0, os.SEEK_END)
+        position = next_line_offset(f, start_offset)
+        f.seek(position)
+        leftover = b''
+        while position < end_offset and not state.done:
+            if deadline is not None and time.monotonic() > deadline:
+                state.result.timed_out = True
+                break
+            chunk = f.read(min(GREP_CHUNK_SIZE, end_offset - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            state.result.scanned_bytes += len(chunk)
+            data = leftover + chunk
+            cut = data.rfind(b'\n') + 1
+            leftover = data[cut:]
+            if cut:
+                state.feed(decode_text(data[:cut]))
+        if leftover and not state.done and not state.result.timed_out:
+            state.feed(decode_text(leftover))
+    return state.result
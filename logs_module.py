@@ -2,17 +2,30 @@ import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import io
+import re
+import time
 import asyncio
+from datetime import datetime
+from log_export import EXTENSIONS, export_compression, export_range
+from log_follow import FOLLOW_DEFAULT_MINUTES, FOLLOW_MAX_MINUTES, FollowManager
+from log_index import LogIndex
+from log_reader import decode_lines, grep_file, next_line_offset, parse_duration, parse_size, read_tail
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Конфигурация
 LOG_DIR = "/srv/neuroboss/logs"
-MAX_LOG_SIZE = 50 * 1024 * 1024  # 50MB максимальный размер лога для отправки
+MAX_LOG_SIZE = 50 * 1024 * 1024  # 50MB максимальный размер одного документа (лимит Telegram)
 MAX_LINES = 1000  # Максимальное количество строк для отправки
+MAX_MESSAGE_SIZE = 4000  # Больше этого размера результат отправляется файлом
+
+# Поиск по логам (/grep)
+GREP_MAX_MATCHES = 50  # Совпадений по умолчанию
+GREP_MAX_MATCHES_LIMIT = 1000  # Максимум, который можно запросить через -m
+GREP_MAX_CONTEXT = 10  # Максимум строк контекста (-C)
+GREP_TIME_BUDGET = 10  # Бюджет времени на один поиск, секунды
 
 # Список контейнеров (соответствует скрипту auto_update_simlink.sh)
 CONTAINERS = [
@@ -26,9 +39,21 @@ CONTAINERS = [
 class LogsModule:
     def __init__(self):
         self.log_dir = LOG_DIR
+        # Индексы меток времени по пути лог-файла
+        self.indexes: Dict[str, LogIndex] = {}
+        self.follow_manager = FollowManager()
         
     async def logs_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик команды /logs - показывает список доступных сервисов"""
+        """Обработчик команды /logs - показывает список доступных сервисов
+        
+        С аргументами выдает записи лога за период:
+        /logs <контейнер> --since 15m
+        /logs <контейнер> --between <от> <до>
+        """
+        if context.args:
+            await self._send_log_range(update, context, list(context.args))
+            return
+        
         keyboard = []
         
         # Создаем кнопки для каждого контейнера
@@ -58,6 +83,257 @@ class LogsModule:
             parse_mode='Markdown'
         )
     
+    async def grep_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /grep <контейнер> [-m N] [-C N] [--bytes 100M] [--since 2h] <regex>"""
+        usage = (
+            "Использование: /grep <контейнер> [опции] <regex>\n\n"
+            "Опции:\n"
+            f"-m N - максимум совпадений (по умолчанию {GREP_MAX_MATCHES})\n"
+            "-C N - строк контекста до и после совпадения\n"
+            "--bytes 100M - искать только в последних N байтах лога\n"
+            "--since 2h - искать только в записях за последние 30s/15m/2h/1d\n\n"
+            "Пример: /grep chroma -C 2 --since 1h Traceback|ERROR"
+        )
+        args = list(context.args or [])
+        if len(args) < 2:
+            await update.message.reply_text(usage)
+            return
+        
+        container = args.pop(0)
+        if container not in CONTAINERS:
+            await update.message.reply_text(
+                f"❌ Неизвестный контейнер: {container}\n\nДоступные: {', '.join(CONTAINERS)}"
+            )
+            return
+        
+        max_matches = GREP_MAX_MATCHES
+        context_lines = 0
+        window_bytes: Optional[int] = None
+        since: Optional[float] = None
+        try:
+            while len(args) > 1 and args[0] in ('-m', '-C', '--bytes', '--since'):
+                option, value = args.pop(0), args.pop(0)
+                try:
+                    if option == '-m':
+                        max_matches = min(max(1, int(value)), GREP_MAX_MATCHES_LIMIT)
+                    elif option == '-C':
+                        context_lines = min(max(0, int(value)), GREP_MAX_CONTEXT)
+                    elif option == '--bytes':
+                        window_bytes = parse_size(value)
+                    else:
+                        since = time.time() - parse_duration(value)
+                except ValueError:
+                    raise ValueError(f"Некорректное значение опции {option}: {value}")
+            if not args:
+                raise ValueError("Не указано регулярное выражение")
+            pattern = re.compile(' '.join(args), re.MULTILINE)
+        except re.error as e:
+            await update.message.reply_text(f"❌ Некорректное регулярное выражение: {e}")
+            return
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}\n\n{usage}")
+            return
+        
+        log_file = os.path.join(self.log_dir, f"{container}.log")
+        if not os.path.exists(log_file):
+            await update.message.reply_text(f"❌ Лог для контейнера {container} недоступен")
+            return
+        
+        await update.message.reply_text(f"🔍 Ищу /{pattern.pattern}/ в логе {container}...")
+        
+        try:
+            result = await asyncio.to_thread(
+                self._grep_log, log_file, pattern, max_matches, context_lines, window_bytes, since
+            )
+        except Exception as e:
+            logger.error(f"Ошибка поиска в логе {container}: {e}")
+            await update.message.reply_text(f"❌ Ошибка поиска в логе {container}: {str(e)}")
+            return
+        
+        header = f"🔍 {container}: /{pattern.pattern}/\n"
+        header += f"Совпадений: {result.matches}, просмотрено: {self._format_size(result.scanned_bytes)}\n"
+        if result.truncated:
+            header += f"⚠️ Достигнут лимит совпадений ({max_matches})\n"
+        if result.timed_out:
+            header += f"⏱ Поиск остановлен по бюджету времени ({GREP_TIME_BUDGET}s)\n"
+        
+        if not result.blocks:
+            await update.message.reply_text(header + "\nНичего не найдено")
+            return
+        
+        body = "--\n".join("".join(block) for block in result.blocks)
+        await self._reply_text_or_document(update, context, header, body, f"{container}_grep.txt")
+    
+    def _grep_log(self, log_file: str, pattern, max_matches: int, context_lines: int,
+                  window_bytes: Optional[int], since: Optional[float]):
+        """Поиск в логе с учетом окна (выполняется в отдельном потоке)"""
+        deadline = time.monotonic() + GREP_TIME_BUDGET
+        start_offset = 0
+        with open(log_file, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            if window_bytes is not None:
+                start_offset = next_line_offset(f, max(0, size - window_bytes))
+        if since is not None:
+            start_offset = max(start_offset, self._get_index(log_file).lookup(since))
+        return grep_file(log_file, pattern, max_matches, context_lines,
+                         start_offset=start_offset, end_offset=size, deadline=deadline)
+    
+    def _get_index(self, log_file: str) -> LogIndex:
+        """Индекс меток времени лога, дополненный до текущего размера файла
+        
+        Выполняется в отдельном потоке: при первом обращении к большому файлу
+        индекс строится по одной точке на мегабайт.
+        """
+        index = self.indexes.get(log_file)
+        if index is None:
+            index = self.indexes.setdefault(log_file, LogIndex(log_file))
+        index.update()
+        return index
+    
+    def _parse_time_arg(self, value: str) -> float:
+        """Момент времени: длительность назад (15m, 2h), ISO дата-время или HH:MM сегодня"""
+        try:
+            return time.time() - parse_duration(value)
+        except ValueError:
+            pass
+        try:
+            if re.fullmatch(r'\d{1,2}:\d{2}(:\d{2})?', value):
+                value = f"{datetime.now():%Y-%m-%d}T{value}"
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"Некорректное время: {value}")
+    
+    def _read_log_range(self, log_file: str, since: Optional[float], until: Optional[float],
+                        max_lines: int = MAX_LINES):
+        """Первые max_lines строк записей лога за период (выполняется в отдельном потоке)"""
+        start, end = self._get_index(log_file).range(since, until)
+        lines = []
+        truncated = False
+        with open(log_file, 'rb') as f:
+            f.seek(start)
+            position = start
+            while position < end:
+                line = f.readline()
+                if not line:
+                    break
+                position += len(line)
+                if len(lines) >= max_lines:
+                    truncated = True
+                    break
+                lines.append(line)
+        return start, end, decode_lines(b''.join(lines)), truncated
+    
+    async def _send_log_range(self, update: Update, context: ContextTypes.DEFAULT_TYPE, args: List[str]):
+        """Отправка записей лога за период: /logs <контейнер> --since 15m | --between <от> <до>"""
+        usage = (
+            "Использование:\n"
+            "/logs - список логов\n"
+            "/logs <контейнер> --since 15m - записи за последние 15 минут\n"
+            "/logs <контейнер> --between <от> <до> - записи за период\n\n"
+            "Время: длительность назад (30s, 15m, 2h, 1d), ISO дата-время (2025-08-28T18:00) или HH:MM сегодня"
+        )
+        container = args.pop(0)
+        if container not in CONTAINERS:
+            await update.message.reply_text(
+                f"❌ Неизвестный контейнер: {container}\n\nДоступные: {', '.join(CONTAINERS)}"
+            )
+            return
+        
+        try:
+            if len(args) == 2 and args[0] == '--since':
+                since, until = self._parse_time_arg(args[1]), None
+            elif len(args) == 3 and args[0] == '--between':
+                since, until = self._parse_time_arg(args[1]), self._parse_time_arg(args[2])
+                if since > until:
+                    since, until = until, since
+            else:
+                await update.message.reply_text(usage)
+                return
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}\n\n{usage}")
+            return
+        
+        log_file = os.path.join(self.log_dir, f"{container}.log")
+        if not os.path.exists(log_file):
+            await update.message.reply_text(f"❌ Лог для контейнера {container} недоступен")
+            return
+        
+        try:
+            start, end, lines, truncated = await asyncio.to_thread(self._read_log_range, log_file, since, until)
+        except Exception as e:
+            logger.error(f"Ошибка при чтении лога {container} за период: {e}")
+            await update.message.reply_text(f"❌ Ошибка при чтении лога контейнера {container}: {str(e)}")
+            return
+        
+        period = f"с {self._format_time(since)}"
+        if until is not None:
+            period += f" по {self._format_time(until)}"
+        header = f"📄 Лог {container} {period}\n"
+        header += f"Диапазон: {self._format_size(end - start)}, строк: {len(lines)}\n"
+        if truncated:
+            header += f"⚠️ Показаны первые {MAX_LINES} строк, сузьте период\n"
+        
+        if not lines:
+            await update.message.reply_text(header + "\nЗаписей за период нет")
+            return
+        
+        await self._reply_text_or_document(update, context, header, "".join(lines), f"{container}_range.txt")
+    
+    async def _reply_text_or_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                      header: str, body: str, filename: str):
+        """Ответ текстом или, если не помещается в сообщение, файлом с заголовком в подписи"""
+        if len(header.encode('utf-8')) + len(body.encode('utf-8')) > MAX_MESSAGE_SIZE:
+            await context.bot.send_document(
+                chat_id=update.effective_chat.id,
+                document=io.BytesIO(body.encode('utf-8')),
+                filename=filename,
+                caption=header[:1024]
+            )
+        else:
+            await update.message.reply_text(header + "\n" + body)
+    
+    async def follow_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /follow <контейнер> [минуты] - слежение за новыми строками лога"""
+        args = context.args or []
+        if not args:
+            await update.message.reply_text(
+                "Использование: /follow <контейнер> [минуты]\n"
+                f"Слежение останавливается через {FOLLOW_DEFAULT_MINUTES} минут "
+                f"(максимум {FOLLOW_MAX_MINUTES}) или командой /unfollow"
+            )
+            return
+        
+        container = args[0]
+        if container not in CONTAINERS:
+            await update.message.reply_text(
+                f"❌ Неизвестный контейнер: {container}\n\nДоступные: {', '.join(CONTAINERS)}"
+            )
+            return
+        
+        minutes = FOLLOW_DEFAULT_MINUTES
+        if len(args) > 1:
+            try:
+                minutes = min(max(1, int(args[1])), FOLLOW_MAX_MINUTES)
+            except ValueError:
+                await update.message.reply_text(f"❌ Некорректное число минут: {args[1]}")
+                return
+        
+        log_file = os.path.join(self.log_dir, f"{container}.log")
+        if not os.path.exists(log_file):
+            await update.message.reply_text(f"❌ Лог для контейнера {container} недоступен")
+            return
+        
+        self.follow_manager.start(context.bot, update.effective_chat.id, container, log_file, minutes)
+        await update.message.reply_text(
+            f"📡 Слежу за логом {container} {minutes} мин. Новые строки появятся ниже.\n"
+            "Остановить: /unfollow"
+        )
+    
+    async def unfollow_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /unfollow - остановка слежения в текущем чате"""
+        if not self.follow_manager.stop(update.effective_chat.id):
+            await update.message.reply_text("Слежение за логами в этом чате не запущено")
+    
     async def handle_log_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик нажатий на кнопки с логами"""
         query = update.callback_query
@@ -68,6 +344,9 @@ class LogsModule:
         elif query.data.startswith("get_log:"):
             container = query.data.split(":", 1)[1]
             await self._send_container_log(query, context, container)
+        elif query.data.startswith("get_full_log:"):
+            container = query.data.split(":", 1)[1]
+            await self._send_full_log(query, context, container)
     
     async def _send_container_log(self, query, context, container: str):
         """Отправляет лог конкретного контейнера"""
@@ -86,7 +365,7 @@ class LogsModule:
             file_info = os.stat(log_file)
             
             # Читаем последние строки лога
-            lines = await self._read_log_tail(log_file)
+            offset, lines = await self._read_log_tail(log_file)
             
             if not lines:
                 await query.edit_message_text(
@@ -105,13 +384,14 @@ class LogsModule:
             # Добавляем содержимое лога
             log_content = "\n".join(lines)
             
-            # Если лог слишком большой, отправляем как файл
-            if len(log_content.encode('utf-8')) > 4000:
-                await self._send_log_as_file(query, context, container, log_content)
+            # Если лог слишком большой, отправляем как файл (тот же хвост, прямо из лог-файла)
+            if len(log_content.encode('utf-8')) > MAX_MESSAGE_SIZE:
+                await self._send_log_as_file(query, context, container, log_file, offset)
             else:
                 message += f"```\n{log_content}\n```"
                 await query.edit_message_text(
                     message,
+                    reply_markup=self._full_log_markup(container),
                     parse_mode='Markdown'
                 )
                 
@@ -174,28 +454,68 @@ class LogsModule:
             parse_mode='Markdown'
         )
     
-    async def _send_log_as_file(self, query, context, container: str, content: str):
-        """Отправляет лог как файл"""
+    async def _send_full_log(self, query, context, container: str):
+        """Отправляет весь лог контейнера сжатыми частями"""
+        if container not in CONTAINERS:
+            await query.edit_message_text(f"❌ Неизвестный контейнер: {container}")
+            return
+        log_file = os.path.join(self.log_dir, f"{container}.log")
+        if not os.path.exists(log_file):
+            await query.edit_message_text(
+                f"❌ Лог для контейнера `{container}` недоступен",
+                parse_mode='Markdown'
+            )
+            return
+        await query.edit_message_text(
+            f"⏳ Готовлю полный лог контейнера `{container}`...",
+            parse_mode='Markdown'
+        )
+        await self._send_log_as_file(query, context, container, log_file, 0)
+    
+    async def _send_log_as_file(self, query, context, container: str, log_file: str,
+                                start_offset: int = 0, end_offset: Optional[int] = None):
+        """Отправляет участок лог-файла как сжатые документы
+        
+        Данные сжимаются потоково прямо из лог-файла; все части готовятся до
+        первой отправки (больше 8 МБ на часть — во временных файлах, см.
+        export_range). Если результат больше MAX_LOG_SIZE, он делится на
+        пронумерованные части, каждая из которых распаковывается отдельно.
+        """
+        compression = export_compression()
+        parts = []
         try:
-            # Создаем временный файл
-            temp_file = f"/tmp/{container}_log.txt"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            parts = await asyncio.to_thread(
+                export_range, log_file, start_offset, end_offset, MAX_LOG_SIZE, compression
+            )
+            if not parts:
+                await query.edit_message_text(
+                    f"📄 Лог контейнера `{container}` пуст",
+                    parse_mode='Markdown'
+                )
+                return
             
-            # Отправляем файл
-            with open(temp_file, 'rb') as f:
+            extension = EXTENSIONS[compression]
+            raw_size = sum(part.raw_size for part in parts)
+            for number, part in enumerate(parts, 1):
+                if len(parts) > 1:
+                    filename = f"{container}_log.part{number:02d}.txt{extension}"
+                    caption = f"📄 Лог контейнера {container}, часть {number}/{len(parts)}"
+                else:
+                    filename = f"{container}_log.txt{extension}"
+                    caption = f"📄 Лог контейнера {container}"
                 await context.bot.send_document(
                     chat_id=query.message.chat_id,
-                    document=f,
-                    filename=f"{container}_log.txt",
-                    caption=f"📄 Лог контейнера {container}"
+                    document=part.file,
+                    filename=filename,
+                    caption=caption
                 )
             
-            # Удаляем временный файл
-            os.remove(temp_file)
-            
+            sent_size = sum(part.size for part in parts)
             await query.edit_message_text(
-                f"📄 Лог контейнера `{container}` отправлен как файл",
+                f"📄 Лог контейнера `{container}` отправлен как файл "
+                f"({self._format_size(raw_size)} → {self._format_size(sent_size)}, "
+                f"частей: {len(parts)})",
+                reply_markup=self._full_log_markup(container) if start_offset > 0 else None,
                 parse_mode='Markdown'
             )
             
@@ -205,16 +525,27 @@ class LogsModule:
                 f"❌ Ошибка при отправке лога контейнера `{container}`: {str(e)}",
                 parse_mode='Markdown'
             )
+        finally:
+            for part in parts:
+                part.close()
+    
+    def _full_log_markup(self, container: str) -> InlineKeyboardMarkup:
+        """Кнопка выгрузки всего лог-файла"""
+        return InlineKeyboardMarkup([[
+            InlineKeyboardButton("📦 Весь лог", callback_data=f"get_full_log:{container}")
+        ]])
     
-    async def _read_log_tail(self, log_file: str, max_lines: int = MAX_LINES) -> List[str]:
-        """Читает последние строки из лог-файла"""
+    async def _read_log_tail(self, log_file: str, max_lines: int = MAX_LINES) -> Tuple[int, List[str]]:
+        """Читает последние строки из лог-файла и смещение, с которого они начинаются
+        
+        Файл читается с конца блоками в отдельном потоке, чтобы не блокировать
+        event loop бота на многогигабайтных логах.
+        """
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                return lines[-max_lines:] if len(lines) > max_lines else lines
+            return await asyncio.to_thread(read_tail, log_file, max_lines)
         except Exception as e:
             logger.error(f"Ошибка при чтении файла {log_file}: {e}")
-            return []
+            return 0, []
     
     def _format_size(self, size_bytes: int) -> str:
         """Форматирует размер файла в читаемый вид"""
@@ -247,6 +578,9 @@ def setup_logs_module(application):
     application.add_handler(
         CallbackQueryHandler(logs_module.handle_log_callback, pattern="^get_all_logs$")
     )
+    application.add_handler(
+        CallbackQueryHandler(logs_module.handle_log_callback, pattern="^get_full_log:")
+    )
     
     return logs_module
 
@@ -0,0 +1,255 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Базовая метрика с набором меток; серии (метки -> значение) обновляются под локом"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self.series: Dict[LabelValues, Any] = {}
+
+    def _label_text(self, values: LabelValues, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def remove_matching(self, label: str, value: str):
+        """Удаление всех серий, у которых метка label равна value"""
+        if label not in self.labels:
+            return
+        position = self.labels.index(label)
+        with self._lock:
+            for key in [key for key in self.series if key[position] == value]:
+                del self.series[key]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self.series[labels] = self.series.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self.series.items())
+        return self.header() + [f"{self.name}{self._label_text(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self.series[labels] = value
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными корзинами: на серию — список счетчиков, сумма и число"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels: str, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Серия: [счетчики по корзинам (без накопления) + переполнение, сумма, число]
+            data = self.series.get(labels)
+            if data is None:
+                data = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self.series.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик; render() только форматирует уже накопленные значения"""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def remove_service(self, name: str):
+        """Удаление серий удаленного сервиса"""
+        for metric in self.metrics:
+            metric.remove_matching('service', name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+SERVICE_UP = REGISTRY.register(Gauge(
+    'healthbot_service_up', 'Service health from the last check (1 healthy, 0 otherwise)',
+    ('service', 'type')))
+SERVICE_LAST_CHECK = REGISTRY.register(Gauge(
+    'healthbot_service_last_check_timestamp_seconds', 'Time of the last check of the service',
+    ('service', 'type')))
+PROBE_DURATION = REGISTRY.register(Histogram(
+    'healthbot_probe_duration_seconds', 'Duration of a single service check',
+    ('service', 'type')))
+HTTP_RESPONSE_TIME = REGISTRY.register(Histogram(
+    'healthbot_http_response_time_seconds', 'HTTP response time measured by check_http_service',
+    ('service',)))
+CHECKS_TOTAL = REGISTRY.register(Counter(
+    'healthbot_checks_total', 'Service checks by type and result', ('type', 'status')))
+CYCLE_DURATION = REGISTRY.register(Histogram(
+    'healthbot_check_cycle_duration_seconds', 'Duration of a check cycle'))
+STARTUP_DURATION = REGISTRY.register(Gauge(
+    'healthbot_startup_seconds', 'Time from process start until the bot is ready to handle commands'))
+HANDLER_DURATION = REGISTRY.register(Histogram(
+    'healthbot_telegram_handler_duration_seconds', 'Telegram handler latency', ('handler',)))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    'healthbot_telegram_handler_errors_total', 'Telegram handler exceptions', ('handler',)))
+
+
+def observe_check(service, status, duration: float):
+    """Учет результата одной проверки сервиса (ServiceEntry)"""
+    name = service.name
+    service_type = service.type
+    SERVICE_UP.set(name, service_type, value=1.0 if status.status == 'healthy' else 0.0)
+    SERVICE_LAST_CHECK.set(name, service_type, value=time.time())
+    PROBE_DURATION.observe(name, service_type, value=duration)
+    CHECKS_TOTAL.inc(service_type, status.status)
+    if service_type == 'http' and status.response_time is not None:
+        HTTP_RESPONSE_TIME.observe(name, value=status.response_time)
+
+
+def observe_remote(service, status):
+    """Учет результата, присланного агентом (длительности проверки в пакете нет)"""
+    SERVICE_UP.set(service.name, service.type, value=1.0 if status.status == 'healthy' else 0.0)
+    checked_at = status.last_check.timestamp() if status.last_check else time.time()
+    SERVICE_LAST_CHECK.set(service.name, service.type, value=checked_at)
+
+
+def timed_handler(name: str, callback: Callable) -> Callable:
+    """Обертка обработчика Telegram: время выполнения и исключения"""
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_DURATION.observe(name, value=time.perf_counter() - started)
+    return wrapper
+
+
+class MetricsServer:
+    """Минимальный HTTP сервер для GET /metrics на asyncio"""
+
+    def __init__(self, host: str, port: int, registry: Registry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Метрики Prometheus доступны на http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Заголовки запроса не нужны, но их нужно дочитать
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                body = self.registry.render().encode('utf-8')
+                status = '200 OK'
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                body = b'Not Found\n'
+                status = '404 Not Found'
+                content_type = 'text/plain'
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def metrics_server_from_env() -> Optional[MetricsServer]:
+    """Сервер метрик, если задан METRICS_PORT"""
+    port = os.getenv('METRICS_PORT', '')
+    if not port:
+        return None
+    try:
+        return MetricsServer(os.getenv('METRICS_HOST', '127.0.0.1'), int(port))
+    except ValueError:
+        logger.warning(f"Некорректный METRICS_PORT={port}, метрики отключены")
+        return None
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorLoop:
+    """Отдельный поток со своим event loop для циклов проверок
+
+    Проверки не выполняются в event loop бота: обработчики команд только
+    ожидают результат, и бот продолжает отвечать во время долгих циклов.
+    Один постоянный loop также сохраняет пул HTTP соединений между циклами.
+    """
+
+    def __init__(self, name: str = 'monitor-loop'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Запуск потока при первом обращении"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,),
+                                                name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self.loop
+
+    def _run(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def in_loop(self) -> bool:
+        """Вызов происходит из потока монитора"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]):
+        """Запуск корутины в потоке монитора, возвращает concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Ожидание корутины, выполняемой в потоке монитора, из другого event loop
+
+        Отмена ожидания отменяет и саму корутину.
+        """
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def call(self, func: Callable[..., Any], *args) -> Any:
+        """Вызов функции в потоке монитора (для чтения состояния, которое меняет только он)"""
+        async def wrapper():
+            return func(*args)
+        return await self.run(wrapper())
+
+    def run_sync(self, coro: Awaitable[Any]) -> Any:
+        """Блокирующее выполнение корутины в потоке монитора (для синхронного кода)"""
+        if self.in_loop():
+            raise RuntimeError("run_sync нельзя вызывать из потока монитора")
+        return self.submit(coro).result()
+
+    def stop(self):
+        """Остановка потока"""
+        if self.loop is not None and self._thread is not None and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+def threadsafe_callback(callback: Callable[..., None],
+                        loop: Optional[asyncio.AbstractEventLoop] = None) -> Callable[..., None]:
+    """Обертка, вызывающая callback в event loop вызывающего кода (по умолчанию — текущем)"""
+    loop = loop or asyncio.get_running_loop()
+
+    def wrapper(*args):
+        loop.call_soon_threadsafe(callback, *args)
+    return wrapper
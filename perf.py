@@ -0,0 +1,202 @@
+import sys
+import time
+import inspect
+import logging
+import functools
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from history import percentile
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних длительностей хранить на спан для перцентилей
+SPAN_WINDOW = 256
+# Период опроса стеков потоков при профилировании, секунды
+SAMPLE_INTERVAL = 0.005
+MAX_PROFILE_SECONDS = 60
+
+
+class SpanStats:
+    """Накопленная статистика одного спана: число, сумма, максимум и последние длительности"""
+
+    __slots__ = ('count', 'total', 'maximum', 'recent', 'position')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.recent = array('f', bytes(4 * SPAN_WINDOW))
+        self.position = 0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        if duration > self.maximum:
+            self.maximum = duration
+        self.recent[self.position] = duration
+        self.position = (self.position + 1) % SPAN_WINDOW
+
+    def summary(self) -> Dict:
+        recent = sorted(self.recent[:min(self.count, SPAN_WINDOW)])
+        return {
+            'count': self.count,
+            'total': self.total,
+            'avg': self.total / self.count if self.count else 0.0,
+            'max': self.maximum,
+            'p95': percentile(recent, 95),
+        }
+
+
+class SpanRegistry:
+    """Агрегатор длительностей спанов (потокобезопасный, O(1) на запись)"""
+
+    def __init__(self):
+        self.spans: Dict[str, SpanStats] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(duration)
+
+    def top(self, limit: int = 15, key: str = 'p95') -> List[Tuple[str, Dict]]:
+        """Самые медленные спаны по key (p95, avg, max или total)"""
+        with self._lock:
+            items = [(name, stats.summary()) for name, stats in self.spans.items()]
+        items.sort(key=lambda item: item[1][key] or 0.0, reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.started_at = time.time()
+
+
+SPANS = SpanRegistry()
+
+
+def record(name: str, duration: float):
+    SPANS.record(name, duration)
+
+
+@contextmanager
+def span(name: str):
+    """Замер длительности блока кода"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPANS.record(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Декоратор замера длительности функции или корутины"""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    SPANS.record(name, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                SPANS.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def format_spans(items: List[Tuple[str, Dict]], since: float) -> str:
+    """Текст для /perf"""
+    if not items:
+        return "⏱ Замеров пока нет"
+    lines = [f"⏱ Самые медленные операции (p95, с {time.strftime('%H:%M:%S', time.localtime(since))}):", ""]
+    for name, stats in items:
+        p95 = stats['p95'] or 0.0
+        lines.append(
+            f"• {name}: p95 {p95 * 1000:.1f} мс, ср. {stats['avg'] * 1000:.1f} мс, "
+            f"макс. {stats['max'] * 1000:.1f} мс, {stats['count']} раз"
+        )
+    return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Профилировщик по выборкам стеков всех потоков (sys._current_frames)
+
+    В отличие от cProfile видит все потоки бота (event loop бота, поток
+    монитора, пул проверок) и почти не замедляет работу: стеки опрашиваются
+    раз в SAMPLE_INTERVAL секунд из отдельного потока.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def run(self, seconds: float):
+        """Сбор выборок в течение seconds секунд (блокирующий вызов)"""
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def report(self, top: int = 40) -> str:
+        """Отчет: функции с наибольшим собственным и общим временем и свернутые стеки
+        (формат collapsed stacks, подходит для flamegraph.pl и speedscope)"""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        total = sum(self.stacks.values())
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                cumulative[frame] += count
+
+        def section(title: str, counter: Counter) -> List[str]:
+            lines = [title]
+            for frame, count in counter.most_common(top):
+                lines.append(f"{count * 100 / total:6.2f}%  {count:7d}  {frame}")
+            return lines + [""]
+
+        lines = [f"Выборок: {self.samples}, интервал {self.interval * 1000:.0f} мс, стеков потоков: {total}", ""]
+        if total:
+            lines += section("Собственное время (вершина стека):", own)
+            lines += section("Общее время (функция в стеке):", cumulative)
+            lines.append("Свернутые стеки:")
+            for stack, count in self.stacks.most_common():
+                lines.append(f"{';'.join(stack)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def profile(seconds: float, interval: float = SAMPLE_INTERVAL) -> str:
+    """Профилирование всех потоков в течение seconds секунд, возвращает отчет"""
+    profiler = SamplingProfiler(interval)
+    profiler.run(min(max(seconds, 0.1), MAX_PROFILE_SECONDS))
+    return profiler.report()
@@ -0,0 +1,66 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import perf
+
+logger = logging.getLogger(__name__)
+
+
+def _matches(query: str, name: str, cmdline: str) -> bool:
+    """Правило совпадения процесса с запросом (без учета регистра)"""
+    return query in name or query in cmdline or name in query
+
+
+class ProcessTable:
+    """Снимок таблицы процессов за один проход psutil.process_iter
+
+    Запросы, известные заранее (все process-проверки цикла), вычисляются
+    за тот же проход; остальные отвечаются по снимку в памяти без
+    повторного чтения /proc.
+    """
+
+    def __init__(self, processes: List[Tuple[str, str, float]],
+                 oldest: Optional[Dict[str, Optional[float]]] = None):
+        # (имя в нижнем регистре, cmdline в нижнем регистре, create_time)
+        self.processes = processes
+        # Запрос в нижнем регистре -> create_time самого старого совпавшего процесса
+        self._oldest: Dict[str, Optional[float]] = oldest or {}
+
+    @classmethod
+    @perf.timed('psutil.process_iter')
+    def take(cls, queries: Iterable[str] = ()) -> 'ProcessTable':
+        """Снимок всех процессов с вычислением ответов для queries"""
+        # Пакет psutil импортируется при первой process-проверке: его загрузка не задерживает запуск
+        import psutil
+        queries = list({q.lower() for q in queries})
+        oldest: Dict[str, Optional[float]] = {q: None for q in queries}
+        processes = []
+
+        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
+            try:
+                info = proc.info
+                if info['name'] is None or info['create_time'] is None:
+                    continue
+                name = info['name'].lower()
+                cmdline = ' '.join(info['cmdline']).lower() if info['cmdline'] else ''
+                create_time = info['create_time']
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+            processes.append((name, cmdline, create_time))
+            for query in queries:
+                if _matches(query, name, cmdline):
+                    current = oldest[query]
+                    if current is None or create_time < current:
+                        oldest[query] = create_time
+
+        return cls(processes, oldest)
+
+    def oldest_create_time(self, query: str) -> Optional[float]:
+        """create_time самого старого процесса, совпавшего с query, или None"""
+        query = query.lower()
+        if query not in self._oldest:
+            matched = [create_time for name, cmdline, create_time in self.processes
+                       if _matches(query, name, cmdline)]
+            self._oldest[query] = min(matched) if matched else None
+        return self._oldest[query]
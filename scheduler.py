@@ -0,0 +1,308 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Интервал проверки сервиса по умолчанию, секунды
+DEFAULT_MONITOR_INTERVAL = 60.0
+# Случайный разброс интервала, доля от интервала (0.1 = ±10%)
+DEFAULT_MONITOR_JITTER = 0.1
+# Проверки, срок которых наступает в пределах этого окна (но не больше десятой доли
+# интервала сервиса), выполняются одним циклом (общие снимки Docker/systemd/процессов)
+COALESCE_WINDOW = 0.5
+# Адаптивные интервалы: стабильные сервисы проверяются реже (до base * MAX_FACTOR),
+# упавшие и «моргающие» — чаще (base * FAST_FACTOR, но не чаще MIN_INTERVAL)
+ADAPTIVE_MAX_FACTOR = 5.0
+ADAPTIVE_FAST_FACTOR = 0.25
+ADAPTIVE_MIN_INTERVAL = 5.0
+# Множитель увеличения интервала после каждой успешной проверки стабильного сервиса
+ADAPTIVE_BACKOFF = 1.5
+# Сколько последних проверок подряд должны быть успешными, чтобы сервис считался стабильным
+STABLE_WINDOW = 5
+# Максимальный сон планировщика: за это время подхватываются новые и удаленные сервисы
+MAX_SLEEP = 5.0
+
+
+def parse_intervals(raw: str) -> Dict[str, float]:
+    """Парсинг интервалов вида "web=30,nginx=120" (секунды)"""
+    intervals = {}
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            name, value = item.rsplit('=', 1)
+            intervals[name.strip()] = max(1.0, float(value))
+        except ValueError:
+            logger.warning(f"Некорректный интервал проверки: {item}")
+    return intervals
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Некорректное значение {name}, используем {default}")
+        return default
+
+
+class AdaptiveInterval:
+    """Интервал проверки одного сервиса, подстраиваемый по истории результатов
+
+    - ошибка или недавняя ошибка в окне STABLE_WINDOW — быстрый интервал;
+    - пока окно не заполнено — базовый интервал;
+    - окно целиком из успешных проверок — интервал растет в ADAPTIVE_BACKOFF
+      раз с каждой проверкой, до base * ADAPTIVE_MAX_FACTOR.
+    """
+
+    __slots__ = ('base', 'interval', 'recent', 'changes')
+
+    def __init__(self, base: float):
+        self.base = base
+        self.interval = base
+        self.recent: Deque[bool] = deque(maxlen=STABLE_WINDOW)
+        # Смены состояния за время работы (для статистики «моргания»)
+        self.changes = 0
+
+    @property
+    def fast(self) -> float:
+        return max(min(ADAPTIVE_MIN_INTERVAL, self.base), self.base * ADAPTIVE_FAST_FACTOR)
+
+    @property
+    def maximum(self) -> float:
+        return self.base * ADAPTIVE_MAX_FACTOR
+
+    def update(self, healthy: bool) -> float:
+        """Учет результата проверки, возвращает новый интервал"""
+        if self.recent and self.recent[-1] != healthy:
+            self.changes += 1
+        self.recent.append(healthy)
+        if not all(self.recent):
+            self.interval = self.fast
+        elif len(self.recent) < STABLE_WINDOW:
+            self.interval = self.base
+        else:
+            self.interval = min(self.maximum, max(self.interval, self.base) * ADAPTIVE_BACKOFF)
+        return self.interval
+
+
+class MonitorScheduler:
+    """Периодические проверки сервисов внутри event loop
+
+    У каждого сервиса свой интервал (MONITOR_INTERVAL, переопределяется через
+    SERVICE_INTERVALS или interval в файле конфигурации) со случайным разбросом; первые проверки равномерно
+    распределены по интервалу, поэтому сервисы не проверяются все разом.
+    Проверки, срок которых совпал, выполняются одним циклом движка. Сервис
+    не проверяется повторно, пока не завершилась предыдущая проверка.
+    Результаты передаются подписчикам (add_listener) в event loop планировщика.
+
+    При MONITOR_ADAPTIVE=true (по умолчанию) интервал каждого сервиса
+    подстраивается по истории его проверок (AdaptiveInterval).
+    """
+
+    def __init__(self, monitor, interval: Optional[float] = None, jitter: Optional[float] = None,
+                 intervals: Optional[Dict[str, float]] = None, adaptive: Optional[bool] = None):
+        self.monitor = monitor
+        self.interval = interval if interval is not None else max(
+            1.0, _env_float('MONITOR_INTERVAL', DEFAULT_MONITOR_INTERVAL))
+        self.jitter = jitter if jitter is not None else min(
+            0.5, max(0.0, _env_float('MONITOR_JITTER', DEFAULT_MONITOR_JITTER)))
+        self.intervals = intervals if intervals is not None else parse_intervals(
+            os.getenv('SERVICE_INTERVALS', ''))
+        self.adaptive = adaptive if adaptive is not None else (
+            os.getenv('MONITOR_ADAPTIVE', 'true').lower() == 'true')
+        self.listeners: List[Callable[[object, object], None]] = []
+        self.remove_listeners: List[Callable[[str], None]] = []
+        self.policies: Dict[str, AdaptiveInterval] = {}
+        # Статистика проверок: по сервисам и по типам, с момента запуска
+        self.started_at = time.monotonic()
+        self.probes: Dict[str, int] = {}
+        self.probes_by_type: Dict[str, int] = {}
+        # Последний результат по имени сервиса
+        self.latest: Dict[str, object] = {}
+        # Время следующей проверки по time.monotonic()
+        self.next_run: Dict[str, float] = {}
+        # Сервисы расписания по имени и версия реестра, с которой они согласованы
+        self.services: Dict[str, object] = {}
+        self._registry_version = -1
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add_listener(self, callback: Callable[[object, object], None]):
+        """Подписка на результаты: callback(сервис ServiceEntry, статус) по мере готовности"""
+        self.listeners.append(callback)
+
+    def add_remove_listener(self, callback: Callable[[str], None]):
+        """Подписка на удаление сервиса из расписания: callback(имя)"""
+        self.remove_listeners.append(callback)
+
+    def interval_for(self, name: str) -> float:
+        """Базовый интервал сервиса: SERVICE_INTERVALS, затем interval из конфигурации"""
+        if name in self.intervals:
+            return self.intervals[name]
+        service = self.services.get(name)
+        if service is not None and service.interval:
+            return service.interval
+        return self.interval
+
+    def current_interval(self, name: str) -> float:
+        """Текущий интервал сервиса с учетом адаптации"""
+        policy = self.policies.get(name)
+        return policy.interval if policy is not None else self.interval_for(name)
+
+    def _next_delay(self, name: str) -> float:
+        interval = self.current_interval(name)
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _record(self, service, status):
+        """Учет результата: статистика и адаптация интервала"""
+        name = service.name
+        self.probes[name] = self.probes.get(name, 0) + 1
+        service_type = service.type
+        self.probes_by_type[service_type] = self.probes_by_type.get(service_type, 0) + 1
+        if not self.adaptive:
+            return
+        policy = self.policies.get(name)
+        if policy is None:
+            policy = self.policies[name] = AdaptiveInterval(self.interval_for(name))
+        previous = policy.interval
+        interval = policy.update(status.status == 'healthy')
+        if interval < previous:
+            # Сервис стал нестабилен — следующая проверка не позже нового интервала
+            self.next_run[name] = min(self.next_run[name], time.monotonic() + interval)
+
+    def _sync_services(self, now: float) -> Dict[str, object]:
+        """Согласование расписания с реестром сервисов (только при изменении его версии)"""
+        registry = self.monitor.registry
+        if registry.version == self._registry_version:
+            return self.services
+        self._registry_version = registry.version
+        previous = self.services
+        services = self.services = {s.name: s for s in registry.services}
+        for name, service in services.items():
+            if name not in self.next_run:
+                # Первая проверка в случайный момент интервала
+                self.next_run[name] = now + random.uniform(0, self.interval_for(name))
+            elif previous.get(name) is not service:
+                # Параметры изменились: история адаптации больше не относится к сервису
+                self.policies.pop(name, None)
+                self.next_run[name] = min(self.next_run[name], now + self.interval_for(name))
+        for name in list(self.next_run):
+            if name not in services:
+                del self.next_run[name]
+                self.latest.pop(name, None)
+                self.policies.pop(name, None)
+                self.probes.pop(name, None)
+                for listener in list(self.remove_listeners):
+                    try:
+                        listener(name)
+                    except Exception as e:
+                        logger.error(f"Ошибка обработчика удаления сервиса {name}: {e}")
+        return services
+
+    def start(self) -> asyncio.Task:
+        """Запуск планировщика в текущем event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        logger.info(f"Планировщик проверок запущен: интервал {self.interval:.0f}s, "
+                    f"разброс ±{self.jitter:.0%}")
+        while True:
+            now = time.monotonic()
+            services = self._sync_services(now)
+            due = [name for name, at in self.next_run.items()
+                   if name not in self._running
+                   and at <= now + min(COALESCE_WINDOW, self.current_interval(name) / 10)]
+            for name in due:
+                planned = self.next_run[name] + self._next_delay(name)
+                # После долгой проверки не наверстываем пропущенные запуски
+                self.next_run[name] = planned if planned > now else now + self._next_delay(name)
+            if due:
+                self._running.update(due)
+                task = asyncio.create_task(self._run_batch([services[name] for name in due]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            pending = [at for name, at in self.next_run.items() if name not in self._running]
+            sleep = min(pending, default=now + MAX_SLEEP) - time.monotonic()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(MAX_SLEEP, max(0.05, sleep)))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _run_batch(self, services: List):
+        def on_result(index: int, status):
+            # Сервис освобождается сразу, не дожидаясь остальных проверок цикла
+            service = services[index]
+            self._running.discard(service.name)
+            if service.name in self.next_run:
+                self.latest[service.name] = status
+                self._record(service, status)
+            self._wakeup.set()
+            for listener in list(self.listeners):
+                try:
+                    listener(service, status)
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика результата {service.name}: {e}")
+
+        try:
+            await self.monitor.check_services_async(services, on_result=on_result)
+        except Exception as e:
+            logger.error(f"Ошибка планового цикла проверок: {e}")
+        finally:
+            self._running.difference_update(s.name for s in services)
+            self._wakeup.set()
+
+    def stats(self) -> Dict:
+        """Статистика бюджета проверок
+
+        Сравнивает фактическое число проверок с тем, сколько их было бы при
+        фиксированных базовых интервалах, и распределение текущих интервалов.
+        """
+        elapsed = max(1.0, time.monotonic() - self.started_at)
+        names = list(self.next_run)
+        fixed_rate = sum(60 / self.interval_for(name) for name in names)
+        current_rate = sum(60 / self.current_interval(name) for name in names)
+        fast = backed_off = 0
+        for name in names:
+            policy = self.policies.get(name)
+            if policy is None:
+                continue
+            if policy.interval < policy.base:
+                fast += 1
+            elif policy.interval > policy.base:
+                backed_off += 1
+        flapping = sorted(
+            ((policy.changes, name) for name, policy in self.policies.items() if policy.changes),
+            reverse=True
+        )
+        return {
+            'services': len(names),
+            'elapsed': elapsed,
+            'probes': sum(self.probes_by_type.values()),
+            'probes_by_type': dict(self.probes_by_type),
+            'actual_per_minute': sum(self.probes_by_type.values()) * 60 / elapsed,
+            'fixed_per_minute': fixed_rate,
+            'current_per_minute': current_rate,
+            'fast': fast,
+            'backed_off': backed_off,
+            'flapping': [(name, changes) for changes, name in flapping[:5]],
+            'adaptive': self.adaptive,
+        }
@@ -1,20 +1,28 @@
 import os
 import time
+import subprocess
+import asyncio
 import logging
-import requests
-import psutil
-import docker
-import schedule
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from check_engine import STILL_RUNNING_MESSAGE, CheckCycle, CheckEngine
+from docker_backend import (
+    DEFAULT_DISCOVERY_INTERVAL, ContainerInfo, DiscoveryFilter, DockerDiscovery, DockerEventWatcher, DockerSnapshot
+)
+from process_backend import ProcessTable
+from systemd_backend import SystemdUnits, unit_name
+from http_probe import HttpProbe
+from monitor_loop import MonitorLoop, threadsafe_callback
+from service_registry import (
+    DEFAULT_CONFIG_RELOAD_INTERVAL, ConfigWatcher, RegistryDiff, ServiceEntry, ServiceRegistry,
+    load_services_file, parse_services_env, resolve_target
+)
+import metrics
+import perf
 
-# Загружаем переменные окружения
-load_dotenv()
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -30,166 +38,233 @@ class ServiceStatus:
 class ServiceMonitor:
     """Класс для мониторинга различных типов сервисов"""
     
-    def __init__(self):
+    def __init__(self, start_backends: bool = True):
+        """start_backends - сразу начать подключение к Docker и обнаружение
+        контейнеров в фоне; конструктор при этом не блокируется"""
         self.docker_client = None
-        self._init_docker_client()
-        self.services = self._parse_services_config()
+        self.docker_watcher = None
+        self.docker_discovery: Optional[DockerDiscovery] = None
+        # Какие контейнеры добавлять в мониторинг автоматически
+        self.discovery_filter = DiscoveryFilter.from_env()
+        # Изменения последней сверки контейнеров (время, RegistryDiff)
+        self.last_discovery: Optional[Tuple[datetime, RegistryDiff]] = None
+        # Сверка контейнеров и события Docker меняют источник 'docker' реестра:
+        # без общей блокировки сверка по устаревшему снимку затирает изменения событий
+        self._docker_sync_lock = threading.Lock()
+        self._backends_lock = threading.Lock()
+        self._backends: Optional[Future] = None
+        # Реестр сервисов: SERVICES_TO_MONITOR, файл SERVICES_CONFIG и обнаруженные контейнеры
+        self.registry = ServiceRegistry()
+        self.registry.set_source('env', self._parse_services_config())
+        self.config_path = os.getenv('SERVICES_CONFIG', '')
+        self.config_watcher: Optional[ConfigWatcher] = None
+        if self.config_path:
+            self.reload_config()
+        self.http_probe = HttpProbe()
+        # Циклы проверок выполняются в отдельном потоке со своим event loop
+        self.monitor_loop = MonitorLoop()
+        self.engine = CheckEngine(self.check_service_async, self._deadline_status)
+        # Пул потоков для блокирующих проверок (docker, systemd, psutil);
+        # HTTP проверки выполняются прямо в event loop и потоков не занимают
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(limit for service_type, limit in self.engine.limits.items()
+                            if service_type != 'http'),
+            thread_name_prefix='service-check'
+        )
+        # Сервисы, проверка которых еще выполняется в пуле потоков: поток нельзя
+        # прервать по дедлайну, поэтому повторная проверка не ставится в очередь
+        self._running_checks = set()
+        self._running_lock = threading.Lock()
+        if start_backends:
+            self.start_backends()
+    
+    @property
+    def services(self) -> List[ServiceEntry]:
+        """Текущий список сервисов (не изменяется, при изменениях реестра заменяется новым)"""
+        return self.registry.services
+    
+    def reload_config(self) -> Optional[RegistryDiff]:
+        """Перечитывание файла SERVICES_CONFIG с применением только изменений"""
+        try:
+            entries = load_services_file(self.config_path)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки конфигурации сервисов {self.config_path}: {e}")
+            return None
+        diff = self.registry.set_source('file', entries)
+        if diff:
+            logger.info(f"Конфигурация сервисов {self.config_path}: {diff.summary()}")
+        return diff
     
-    def _parse_services_config(self) -> List[Dict]:
+    def _init_config_watcher(self):
+        """Отслеживание изменений файла SERVICES_CONFIG"""
+        if not self.config_path:
+            return
+        try:
+            interval = float(os.getenv('SERVICES_CONFIG_RELOAD', DEFAULT_CONFIG_RELOAD_INTERVAL))
+        except ValueError:
+            interval = DEFAULT_CONFIG_RELOAD_INTERVAL
+        if interval <= 0:
+            return
+        self.config_watcher = ConfigWatcher(self.config_path, self.reload_config, interval)
+        self.config_watcher.start()
+    
+    def start_backends(self) -> Future:
+        """Фоновое подключение к Docker и обнаружение контейнеров (однократно)"""
+        with self._backends_lock:
+            if self._backends is None:
+                self._backends = Future()
+                threading.Thread(target=self._init_backends, name='backend-init', daemon=True).start()
+            return self._backends
+    
+    def _init_backends(self):
+        started = time.perf_counter()
+        try:
+            self._init_config_watcher()
+            self._init_docker_client()
+            self._init_docker_discovery()
+            self._init_docker_watcher()
+        except Exception as e:
+            logger.error(f"Ошибка инициализации бэкендов мониторинга: {e}")
+        finally:
+            logger.info(f"Бэкенды мониторинга готовы за {(time.perf_counter() - started) * 1000:.0f} мс")
+            self._backends.set_result(None)
+    
+    def wait_backends(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание инициализации бэкендов (для синхронного кода)"""
+        backends = self.start_backends()
+        wait([backends], timeout)
+        return backends.done()
+    
+    async def ensure_backends(self):
+        """Ожидание инициализации бэкендов из event loop"""
+        backends = self.start_backends()
+        if not backends.done():
+            await asyncio.wrap_future(backends)
+    
+    def _parse_services_config(self) -> List[ServiceEntry]:
         """Парсинг конфигурации сервисов из переменной окружения"""
-        services_config = os.getenv('SERVICES_TO_MONITOR', '')
-        services = []
-        
         try:
-            # Поддерживаемые форматы:
-            # 1. "service1:http://localhost:8080,service2:docker:nginx" (полный формат)
-            # 2. "http://localhost:8080,http://localhost:3000,postgresql,nginx" (упрощенный формат)
-            if services_config:
-                for service_config in services_config.split(','):
-                    service_config = service_config.strip()
-                    if not service_config:
-                        continue
-                    
-                    # Проверяем, есть ли двоеточие в конфигурации
-                    if ':' in service_config:
-                        # Сначала проверяем, не является ли это URL
-                        if service_config.startswith('http://') or service_config.startswith('https://'):
-                            service_type = 'http'
-                            logger.info(f"Добавляем HTTP сервис: {service_config}")
-                            services.append({
-                                'name': service_config,  # Используем URL как имя
-                                'type': service_type,
-                                'config': service_config
-                            })
-                        else:
-                            # Это формат name:config
-                            parts = service_config.split(':', 1)
-                            if len(parts) == 2:
-                                name, config = parts
-                                service_type = self._detect_service_type(config)
-                                
-                                services.append({
-                                    'name': name.strip(),
-                                    'type': service_type,
-                                    'config': config.strip()
-                                })
-                            else:
-                                # Возможно это URL без имени
-                                service_type = self._detect_service_type(service_config)
-                                services.append({
-                                    'name': service_config,  # Используем конфигурацию как имя
-                                    'type': service_type,
-                                    'config': service_config
-                                })
-                    else:
-                        # Простое имя сервиса без конфигурации
-                        # Пытаемся определить тип автоматически
-                        service_type = self._detect_service_type(service_config)
-                        services.append({
-                            'name': service_config,
-                            'type': service_type,
-                            'config': service_config
-                        })
-            
-            # Добавляем все запущенные Docker контейнеры
-            docker_services = self._get_running_docker_containers()
-            services.extend(docker_services)
-                
+            return parse_services_env(os.getenv('SERVICES_TO_MONITOR', ''))
         except Exception as e:
             logger.error(f"Ошибка парсинга SERVICES_TO_MONITOR: {e}")
-        
-        return services
-    
-    def _detect_service_type(self, config: str) -> str:
-        """Определение типа сервиса по конфигурации"""
-        if config.startswith('http://') or config.startswith('https://'):
-            return 'http'
-        elif config.startswith('docker:'):
-            return 'docker'
-        elif config.startswith('process:'):
-            return 'process'
-        elif config.startswith('systemd:'):
-            return 'systemd'
-        else:
-            # Попытка определить тип по имени сервиса
-            config_lower = config.lower()
-            
-            # Известные systemd сервисы
-            systemd_services = ['redis', 'redis-server', 'postgresql', 'postgres', 'mysql', 'nginx', 'apache2', 'ssh', 'cron']
-            if config_lower in systemd_services:
-                return 'systemd'
-            
-            # Известные Docker контейнеры (только те, которые обычно в Docker)
-            docker_services = ['jenkins', 'minio', 'grafana', 'prometheus']
-            if config_lower in docker_services:
-                return 'docker'
-            
-            # Известные системные процессы
-            system_services = ['wg-quick', 'systemd', 'cron']
-            if any(service in config_lower for service in system_services):
-                return 'process'
-            
-            # По умолчанию считаем systemd сервисом
-            return 'systemd'
+            return []
     
     def _init_docker_client(self):
         """Инициализация Docker клиента"""
         try:
+            # Пакет docker импортируется только здесь: его загрузка не задерживает запуск бота
+            import docker
             self.docker_client = docker.from_env()
             logger.info("Docker клиент инициализирован")
         except Exception as e:
             logger.warning(f"Не удалось инициализировать Docker клиент: {e}")
             self.docker_client = None
     
-    def _get_running_docker_containers(self) -> List[Dict]:
-        """Получение всех запущенных Docker контейнеров"""
-        containers = []
-        
+    def _init_docker_watcher(self):
+        """Запуск отслеживания контейнеров по событиям Docker"""
         if not self.docker_client:
-            return containers
+            return
+        if os.getenv('DOCKER_EVENTS_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            return
+        self.docker_watcher = DockerEventWatcher(self.docker_client, on_event=self._on_docker_event)
+        self.docker_watcher.start()
+    
+    def _on_docker_event(self, action: str, container: ContainerInfo):
+        """Обновление реестра по событиям Docker
         
+        Новые запущенные контейнеры добавляются как автоматически обнаруженные,
+        удаленные — убираются из мониторинга.
+        """
+        with self._docker_sync_lock:
+            if action == 'start':
+                if not self.discovery_filter.matches(container):
+                    return
+                if self.registry.find_target('docker', container.name) is not None:
+                    return
+                logger.info(f"Обнаружен новый Docker контейнер: {container.name}")
+                self.registry.add(ServiceEntry(container.name, 'docker', container.name, source='docker'))
+            elif action == 'destroy':
+                if self.registry.remove('docker', container.name):
+                    logger.info(f"Docker контейнер удален из мониторинга: {container.name}")
+    
+    def _init_docker_discovery(self):
+        """Первичное обнаружение контейнеров и запуск периодической сверки"""
+        if not self.docker_client:
+            return
+        self.refresh_docker_services()
         try:
-            running_containers = self.docker_client.containers.list()
-            
-            for container in running_containers:
-                container_name = container.name
-                containers.append({
-                    'name': container_name,
-                    'type': 'docker',
-                    'config': container_name,
-                    'auto_discovered': True  # Флаг для автоматически обнаруженных контейнеров
-                })
-            
-            if containers:
-                logger.info(f"Автоматически обнаружено {len(containers)} Docker контейнеров")
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении Docker контейнеров: {e}")
+            interval = float(os.getenv('DOCKER_DISCOVERY_INTERVAL', DEFAULT_DISCOVERY_INTERVAL))
+        except ValueError:
+            interval = DEFAULT_DISCOVERY_INTERVAL
+        if interval <= 0:
+            return
+        self.docker_discovery = DockerDiscovery(self.refresh_docker_services, interval)
+        self.docker_discovery.start()
+    
+    def _configured_containers(self) -> set:
+        """Контейнеры, явно указанные в конфигурации (их не нужно обнаруживать повторно)"""
+        return {entry.target
+                for source in ('env', 'file')
+                for entry in self.registry.source_entries(source) if entry.type == 'docker'}
+    
+    def refresh_docker_services(self) -> Optional[RegistryDiff]:
+        """Сверка обнаруженных контейнеров с Docker
         
-        return containers
+        Новые запущенные контейнеры (по discovery_filter) добавляются, исчезнувшие —
+        удаляются. Остановленный, но существующий контейнер остается в мониторинге,
+        чтобы его падение было видно. Неизмененные записи реестра сохраняются,
+        поэтому их расписание и история не сбрасываются.
+        """
+        if not self.docker_client:
+            return None
+        # Снимок и замена источника под одной блокировкой с _on_docker_event:
+        # событие, пришедшее между ними, не будет отменено устаревшим снимком
+        with self._docker_sync_lock:
+            if self.docker_watcher is not None and self.docker_watcher.live:
+                snapshot = self.docker_watcher.snapshot()
+            else:
+                snapshot = DockerSnapshot.take(self.docker_client)
+            known = {entry.target for entry in self.registry.source_entries('docker')}
+            configured = self._configured_containers()
+            entries = [
+                ServiceEntry(container.name, 'docker', container.name, source='docker')
+                for container in snapshot.containers
+                if container.name not in configured
+                and (container.state == 'running' or container.name in known)
+                and self.discovery_filter.matches(container)
+            ]
+            diff = self.registry.set_source('docker', entries)
+            if diff:
+                self.last_discovery = (datetime.now(), diff)
+        if diff:
+            logger.info(f"Обнаружение Docker контейнеров ({self.discovery_filter}): {diff.summary()}")
+        return diff
     
     def check_http_service(self, url: str, timeout: int = 10) -> ServiceStatus:
+        """Проверка HTTP сервиса (синхронная обертка над check_http_service_async)"""
+        return self.monitor_loop.run_sync(self.check_http_service_async(url, timeout))
+    
+    async def check_http_service_async(self, url: str, timeout: int = 10) -> ServiceStatus:
         """Проверка HTTP сервиса
         
         Логика проверки:
         - 2xx, 3xx, 4xx (включая 404) - сервер работает нормально
         - 5xx - ошибка сервера, сервис не работает
         """
-        # Очищаем URL от лишних символов
-        url = url.strip()
-        # Убираем лишние символы в конце URL
-        while url.endswith('*') or url.endswith('/'):
-            url = url.rstrip('*/')
-        
-        start_time = time.time()
+        # Очищаем URL от лишних символов и завершающих */
+        return await self._check_http_target(resolve_target('http', url), timeout)
+    
+    async def _check_http_target(self, url: str, timeout: int = 10) -> ServiceStatus:
+        """Проверка HTTP сервиса по уже очищенному URL"""
+        # httpx загружается лениво вместе с HttpProbe, здесь нужны только классы исключений
+        import httpx
         try:
             logger.info(f"Проверяем HTTP сервис: {url}")
-            response = requests.get(url, timeout=timeout, verify=False)
-            response_time = time.time() - start_time
+            status_code, response_time = await self.http_probe.probe(url, timeout=timeout)
             
             # 404 означает, что сервер работает, но страница не найдена - это нормально
             # 5xx ошибки - это проблемы сервера
-            if response.status_code < 500:
+            if status_code < 500:
                 return ServiceStatus(
                     name=url,
                     status='healthy',
@@ -201,18 +276,18 @@ class ServiceMonitor:
                     name=url,
                     status='unhealthy',
                     response_time=response_time,
-                    error_message=f"HTTP {response.status_code}",
+                    error_message=f"HTTP {status_code}",
                     last_check=datetime.now()
                 )
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             return ServiceStatus(
                 name=url,
                 status='unhealthy',
                 error_message="Timeout",
                 last_check=datetime.now()
             )
-        except requests.exceptions.ConnectionError:
+        except httpx.TransportError:
             return ServiceStatus(
                 name=url,
                 status='unhealthy',
@@ -227,8 +302,13 @@ class ServiceMonitor:
                 last_check=datetime.now()
             )
     
-    def check_docker_service(self, container_name: str) -> ServiceStatus:
-        """Проверка Docker контейнера"""
+    def check_docker_service(self, container_name: str,
+                             snapshot: Optional[DockerSnapshot] = None) -> ServiceStatus:
+        """Проверка Docker контейнера
+        
+        snapshot - снимок контейнеров текущего цикла проверок; если не передан,
+        делается отдельный снимок (один вызов Docker API).
+        """
         if not self.docker_client:
             return ServiceStatus(
                 name=container_name,
@@ -242,38 +322,20 @@ class ServiceMonitor:
             if container_name.startswith('docker:'):
                 container_name = container_name.replace('docker:', '')
             
-            # Сначала пытаемся найти контейнер по точному имени
-            try:
-                container = self.docker_client.containers.get(container_name)
-            except docker.errors.NotFound:
-                # Если не найден, ищем по частичному совпадению
-                containers = self.docker_client.containers.list(all=True)
-                matching_containers = []
-                
-                for container in containers:
-                    # Проверяем различные варианты совпадения
-                    if (container_name.lower() in container.name.lower() or
-                        container_name.lower() in container.attrs.get('Config', {}).get('Image', '').lower() or
-                        any(tag.lower().startswith(container_name.lower()) for tag in container.image.tags)):
-                        matching_containers.append(container)
-                
-                if not matching_containers:
-                    return ServiceStatus(
-                        name=container_name,
-                        status='unhealthy',
-                        error_message="Container not found",
-                        last_check=datetime.now()
-                    )
-                
-                # Берем первый найденный контейнер
-                container = matching_containers[0]
-            
-            container_info = container.attrs
+            if snapshot is None:
+                snapshot = DockerSnapshot.take(self.docker_client)
             
-            status = container_info['State']['Status']
-            health_status = container_info['State'].get('Health', {}).get('Status', 'unknown')
+            # Точное совпадение по имени, затем частичное по имени, образу и тегу
+            container = snapshot.find(container_name)
+            if container is None:
+                return ServiceStatus(
+                    name=container_name,
+                    status='unhealthy',
+                    error_message="Container not found",
+                    last_check=datetime.now()
+                )
             
-            if status == 'running':
+            if container.state == 'running':
                 # Контейнер считается здоровым если он запущен
                 # Health check может быть 'healthy', 'none' или 'unknown' - все это нормально для запущенного контейнера
                 return ServiceStatus(
@@ -285,17 +347,10 @@ class ServiceMonitor:
                 return ServiceStatus(
                     name=container_name,
                     status='unhealthy',
-                    error_message=f"Status: {status}, Health: {health_status}",
+                    error_message=f"Status: {container.state}, Health: {container.health}",
                     last_check=datetime.now()
                 )
                 
-        except docker.errors.NotFound:
-            return ServiceStatus(
-                name=container_name,
-                status='unhealthy',
-                error_message="Container not found",
-                last_check=datetime.now()
-            )
         except Exception as e:
             return ServiceStatus(
                 name=container_name,
@@ -304,117 +359,77 @@ class ServiceMonitor:
                 last_check=datetime.now()
             )
     
-    def check_systemd_service(self, service_name: str) -> ServiceStatus:
-        """Проверка systemd сервиса"""
+    def check_systemd_service(self, service_name: str,
+                              units: Optional[SystemdUnits] = None) -> ServiceStatus:
+        """Проверка systemd сервиса
+        
+        units - состояние юнитов текущего цикла проверок (один вызов systemctl
+        на все юниты); если не передано, юнит запрашивается отдельно.
+        """
+        service_name = unit_name(service_name)
+        name = service_name.replace('.service', '')
         try:
-            # Убираем префикс systemd: если он есть
-            if service_name.startswith('systemd:'):
-                service_name = service_name.replace('systemd:', '')
+            if units is None:
+                units = SystemdUnits.take([service_name])
             
-            # Добавляем .service если его нет
-            if not service_name.endswith('.service'):
-                service_name = f"{service_name}.service"
-            
-            import subprocess
-            result = subprocess.run(
-                ['systemctl', 'is-active', service_name],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            state = units.get(service_name)
+            if state is None:
+                return ServiceStatus(
+                    name=name,
+                    status='unknown',
+                    error_message="Service state unavailable",
+                    last_check=datetime.now()
+                )
             
-            if result.returncode == 0 and result.stdout.strip() == 'active':
-                # Получаем дополнительную информацию о сервисе
-                try:
-                    status_result = subprocess.run(
-                        ['systemctl', 'show', service_name, '--property=ActiveEnterTimestamp'],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    
-                    uptime = None
-                    if status_result.returncode == 0:
-                        # Парсим время запуска
-                        for line in status_result.stdout.split('\n'):
-                            if line.startswith('ActiveEnterTimestamp='):
-                                timestamp_str = line.split('=', 1)[1]
-                                if timestamp_str:
-                                    try:
-                                        # Парсим timestamp в формате systemd
-                                        if timestamp_str.startswith('Mon '):
-                                            # Формат: Mon 2025-08-28 18:48:36 UTC
-                                            dt = datetime.strptime(timestamp_str, '%a %Y-%m-%d %H:%M:%S %Z')
-                                        else:
-                                            # Другие форматы timestamp
-                                            dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                                        
-                                        uptime = time.time() - dt.timestamp()
-                                    except:
-                                        pass
-                                break
-                    
-                    return ServiceStatus(
-                        name=service_name.replace('.service', ''),
-                        status='healthy',
-                        uptime=uptime,
-                        last_check=datetime.now()
-                    )
-                    
-                except Exception as e:
-                    return ServiceStatus(
-                        name=service_name.replace('.service', ''),
-                        status='healthy',
-                        last_check=datetime.now()
-                    )
+            if state.active_state == 'active':
+                return ServiceStatus(
+                    name=name,
+                    status='healthy',
+                    uptime=state.uptime,
+                    last_check=datetime.now()
+                )
             else:
                 return ServiceStatus(
-                    name=service_name.replace('.service', ''),
+                    name=name,
                     status='unhealthy',
-                    error_message=f"Service not active: {result.stdout.strip()}",
+                    error_message=f"Service not active: {state.active_state} ({state.sub_state})",
                     last_check=datetime.now()
                 )
                 
         except subprocess.TimeoutExpired:
             return ServiceStatus(
-                name=service_name.replace('.service', ''),
+                name=name,
                 status='unhealthy',
                 error_message="Timeout checking service",
                 last_check=datetime.now()
             )
         except Exception as e:
             return ServiceStatus(
-                name=service_name.replace('.service', ''),
+                name=name,
                 status='unhealthy',
                 error_message=str(e),
                 last_check=datetime.now()
             )
     
-    def check_process_service(self, process_name: str) -> ServiceStatus:
-        """Проверка системного процесса"""
+    def check_process_service(self, process_name: str,
+                              table: Optional[ProcessTable] = None) -> ServiceStatus:
+        """Проверка системного процесса
+        
+        table - снимок таблицы процессов текущего цикла проверок; если не передан,
+        делается отдельный проход по процессам.
+        """
         try:
             # Убираем префикс process: если он есть
             if process_name.startswith('process:'):
                 process_name = process_name.replace('process:', '')
             
-            found_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
-                try:
-                    proc_name = proc.info['name'].lower()
-                    cmdline = ' '.join(proc.info['cmdline']).lower() if proc.info['cmdline'] else ''
-                    
-                    # Проверяем различные варианты совпадения
-                    if (process_name.lower() in proc_name or 
-                        process_name.lower() in cmdline or
-                        proc_name in process_name.lower()):
-                        found_processes.append(proc)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            if table is None:
+                table = ProcessTable.take([process_name])
             
-            if found_processes:
-                # Берем самый старый процесс для расчета uptime
-                oldest_proc = min(found_processes, key=lambda p: p.info['create_time'])
-                uptime = time.time() - oldest_proc.info['create_time']
+            # Берем самый старый процесс для расчета uptime
+            create_time = table.oldest_create_time(process_name)
+            if create_time is not None:
+                uptime = time.time() - create_time
                 
                 return ServiceStatus(
                     name=process_name,
@@ -438,50 +453,157 @@ class ServiceMonitor:
                 last_check=datetime.now()
             )
     
-    def check_service(self, service_config: Dict) -> ServiceStatus:
-        """Проверка сервиса по конфигурации"""
-        service_type = service_config['type']
-        config = service_config['config']
-        name = service_config['name']
+    def check_service(self, service: ServiceEntry, cycle: Optional[CheckCycle] = None) -> ServiceStatus:
+        """Проверка сервиса из реестра
+        
+        cycle - контекст цикла проверок со снимками бэкендов, общими для всех
+        проверок цикла.
+        """
+        service_type = service.type
         
         if service_type == 'http':
-            return self.check_http_service(config)
+            return self.monitor_loop.run_sync(self._check_http_target(service.target))
         elif service_type == 'docker':
-            container_name = config.replace('docker:', '')
-            return self.check_docker_service(container_name)
+            snapshot = None
+            if self.docker_watcher is not None and self.docker_watcher.live:
+                # Таблица, поддерживаемая событиями Docker, — без обращения к API
+                snapshot = self.docker_watcher.snapshot()
+            elif cycle is not None and self.docker_client:
+                try:
+                    snapshot = cycle.snapshot('docker', lambda: DockerSnapshot.take(self.docker_client))
+                except Exception as e:
+                    return ServiceStatus(
+                        name=service.target,
+                        status='unhealthy',
+                        error_message=str(e),
+                        last_check=datetime.now()
+                    )
+            return self.check_docker_service(service.target, snapshot)
         elif service_type == 'systemd':
-            service_name = config.replace('systemd:', '')
-            return self.check_systemd_service(service_name)
+            units = None
+            if cycle is not None:
+                try:
+                    units = cycle.snapshot('systemd', lambda: SystemdUnits.take(
+                        s.target for s in cycle.services if s.type == 'systemd'
+                    ))
+                except Exception as e:
+                    return ServiceStatus(
+                        name=service.target.replace('.service', ''),
+                        status='unhealthy',
+                        error_message="Timeout checking service" if isinstance(e, subprocess.TimeoutExpired) else str(e),
+                        last_check=datetime.now()
+                    )
+            return self.check_systemd_service(service.target, units)
         elif service_type == 'process':
-            process_name = config.replace('process:', '')
-            return self.check_process_service(process_name)
+            table = None
+            if cycle is not None:
+                try:
+                    table = cycle.snapshot('process', lambda: ProcessTable.take(
+                        s.target for s in cycle.services if s.type == 'process'
+                    ))
+                except Exception as e:
+                    return ServiceStatus(
+                        name=service.target,
+                        status='unhealthy',
+                        error_message=str(e),
+                        last_check=datetime.now()
+                    )
+            return self.check_process_service(service.target, table)
         else:
             return ServiceStatus(
-                name=name,
+                name=service.name,
                 status='unknown',
                 error_message=f"Unknown service type: {service_type}",
                 last_check=datetime.now()
             )
     
-    def check_all_services(self) -> List[ServiceStatus]:
-        """Проверка всех сервисов"""
-        results = []
-        for service_config in self.services:
-            try:
-                status = self.check_service(service_config)
-                results.append(status)
-                logger.info(f"Service {status.name}: {status.status}")
-            except Exception as e:
-                logger.error(f"Ошибка проверки сервиса {service_config['name']}: {e}")
-                results.append(ServiceStatus(
-                    name=service_config['name'],
-                    status='unknown',
-                    error_message=str(e),
-                    last_check=datetime.now()
-                ))
+    async def check_service_async(self, service: ServiceEntry,
+                                  cycle: Optional[CheckCycle] = None) -> ServiceStatus:
+        """Асинхронная проверка сервиса: блокирующие вызовы выполняются в пуле потоков"""
+        started = time.perf_counter()
+        if service.type == 'http':
+            status = await self._check_http_target(service.target)
+        else:
+            status = await self._check_in_executor(service, cycle)
+        elapsed = time.perf_counter() - started
+        metrics.observe_check(service, status, elapsed)
+        perf.record(f"check.{service.type}", elapsed)
+        return status
+    
+    async def _check_in_executor(self, service: ServiceEntry,
+                                 cycle: Optional[CheckCycle]) -> ServiceStatus:
+        """Проверка в пуле потоков; пока предыдущая проверка сервиса не вернулась
+        (например, зависла после дедлайна), новая не запускается"""
+        with self._running_lock:
+            if service.name in self._running_checks:
+                logger.warning(f"Предыдущая проверка {service.name} еще выполняется, пропуск")
+                return self._deadline_status(service, STILL_RUNNING_MESSAGE)
+            self._running_checks.add(service.name)
+        
+        def release(_future):
+            with self._running_lock:
+                self._running_checks.discard(service.name)
+        
+        try:
+            future = self.executor.submit(self.check_service, service, cycle)
+        except BaseException:
+            release(None)
+            raise
+        # Отмена по дедлайну не прерывает поток: слот освобождается, только когда он вернется
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+    
+    def _deadline_status(self, service: ServiceEntry, message: str) -> ServiceStatus:
+        """Статус для проверки, которая не завершилась или упала внутри движка"""
+        return ServiceStatus(
+            name=service.name,
+            status='unknown',
+            error_message=message,
+            last_check=datetime.now()
+        )
+    
+    async def check_all_services_async(self, deadline: Optional[float] = None,
+                                       on_result: Optional[Callable[[int, ServiceStatus], None]] = None
+                                       ) -> List[ServiceStatus]:
+        """Параллельная проверка всех сервисов с общим дедлайном
         
+        on_result(индекс, статус) вызывается по мере завершения проверок.
+        """
+        await self.ensure_backends()
+        return await self.check_services_async(list(self.services), deadline, on_result)
+    
+    async def check_services_async(self, services: List[ServiceEntry], deadline: Optional[float] = None,
+                                   on_result: Optional[Callable[[int, ServiceStatus], None]] = None
+                                   ) -> List[ServiceStatus]:
+        """Параллельная проверка заданных сервисов одним циклом (общие снимки бэкендов)"""
+        await self.ensure_backends()
+        cycle = CheckCycle(services)
+        started = time.perf_counter()
+        results = await self.engine.run(
+            services,
+            deadline=deadline,
+            check_func=lambda service: self.check_service_async(service, cycle),
+            on_result=on_result
+        )
+        metrics.CYCLE_DURATION.observe(value=time.perf_counter() - started)
+        for status in results:
+            logger.info(f"Service {status.name}: {status.status}")
         return results
     
+    async def run_cycle(self, on_result: Optional[Callable[[int, ServiceStatus], None]] = None
+                        ) -> List[ServiceStatus]:
+        """Цикл проверок в потоке монитора, ожидаемый из event loop бота
+        
+        on_result вызывается в event loop вызывающего кода.
+        """
+        if on_result is not None:
+            on_result = threadsafe_callback(on_result)
+        return await self.monitor_loop.run(self.check_all_services_async(on_result=on_result))
+    
+    def check_all_services(self) -> List[ServiceStatus]:
+        """Проверка всех сервисов (синхронно)"""
+        return self.monitor_loop.run_sync(self.check_all_services_async())
+    
     def get_summary(self, statuses: List[ServiceStatus]) -> str:
         """Получение сводки по статусам сервисов"""
         healthy_count = sum(1 for s in statuses if s.status == 'healthy')
@@ -510,26 +632,37 @@ class ServiceMonitor:
         return summary
     
     def start_monitoring(self, callback_func=None, interval_minutes: int = 5):
-        """Запуск периодического мониторинга"""
-        def monitoring_job():
-            statuses = self.check_all_services()
-            if callback_func:
-                callback_func(statuses)
-        
-        # Запускаем сразу
-        monitoring_job()
-        
-        # Планируем периодические проверки
-        schedule.every(interval_minutes).minutes.do(monitoring_job)
+        """Запуск периодического мониторинга (блокирующий, для запуска без бота)
         
+        Полный цикл проверок выполняется сразу и затем раз в interval_minutes;
+        callback_func получает статусы всех сервисов один раз после каждого цикла.
+        """
         logger.info(f"Мониторинг запущен с интервалом {interval_minutes} минут")
+        self.monitor_loop.run_sync(self.run_monitoring(callback_func, interval_minutes * 60))
+    
+    async def run_monitoring(self, callback_func=None, interval: float = 300):
+        """Циклы check_all_services раз в interval секунд с вызовом callback_func(статусы)
         
+        Если цикл длился дольше интервала, пропущенные запуски не наверстываются.
+        """
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
         while True:
-            schedule.run_pending()
-            time.sleep(60)  # Проверяем каждую минуту
+            statuses = await self.check_all_services_async()
+            if callback_func:
+                try:
+                    callback_func(statuses)
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика результатов мониторинга: {e}")
+            next_run = max(next_run + interval, loop.time())
+            await asyncio.sleep(next_run - loop.time())
 
 # Пример использования
 if __name__ == '__main__':
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
     monitor = ServiceMonitor()
     
     def print_status(statuses):
@@ -0,0 +1,372 @@
+import os
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from systemd_backend import unit_name
+
+logger = logging.getLogger(__name__)
+
+# Источники сервисов в порядке приоритета: при совпадении имени берется запись
+# из более раннего источника (явная конфигурация важнее обнаруженных контейнеров)
+SOURCES = ('env', 'file', 'docker')
+# Как часто проверять изменение файла конфигурации, секунды
+DEFAULT_CONFIG_RELOAD_INTERVAL = 5.0
+
+SERVICE_TYPES = ('http', 'docker', 'systemd', 'process')
+TYPE_PREFIXES = ('docker:', 'process:', 'systemd:')
+
+# Известные имена для автоопределения типа
+SYSTEMD_SERVICES = ['redis', 'redis-server', 'postgresql', 'postgres', 'mysql', 'nginx', 'apache2', 'ssh', 'cron']
+DOCKER_SERVICES = ['jenkins', 'minio', 'grafana', 'prometheus']
+PROCESS_SERVICES = ['wg-quick', 'systemd', 'cron']
+
+
+def detect_service_type(config: str) -> str:
+    """Определение типа сервиса по конфигурации"""
+    if config.startswith('http://') or config.startswith('https://'):
+        return 'http'
+    elif config.startswith('docker:'):
+        return 'docker'
+    elif config.startswith('process:'):
+        return 'process'
+    elif config.startswith('systemd:'):
+        return 'systemd'
+    # Попытка определить тип по имени сервиса
+    config_lower = config.lower()
+    if config_lower in SYSTEMD_SERVICES:
+        return 'systemd'
+    if config_lower in DOCKER_SERVICES:
+        return 'docker'
+    if any(service in config_lower for service in PROCESS_SERVICES):
+        return 'process'
+    # По умолчанию считаем systemd сервисом
+    return 'systemd'
+
+
+def strip_type_prefix(config: str) -> str:
+    """Конфигурация без префикса типа docker:/process:/systemd:"""
+    for prefix in TYPE_PREFIXES:
+        if config.startswith(prefix):
+            return config[len(prefix):]
+    return config
+
+
+def resolve_target(service_type: str, config: str) -> str:
+    """Цель проверки без префиксов: URL, имя контейнера, юнит systemd или имя процесса"""
+    config = config.strip()
+    if service_type == 'http':
+        while config.endswith('*') or config.endswith('/'):
+            config = config.rstrip('*/')
+        return config
+    config = strip_type_prefix(config)
+    if service_type == 'systemd':
+        return unit_name(config)
+    return config
+
+
+class ServiceEntry:
+    """Сервис в реестре с заранее вычисленной целью проверки"""
+
+    __slots__ = ('name', 'type', 'config', 'target', 'source', 'interval', 'labels')
+
+    def __init__(self, name: str, service_type: str, config: str, source: str = 'env',
+                 interval: Optional[float] = None, labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.type = service_type
+        self.config = config
+        self.target = resolve_target(service_type, config)
+        self.source = source
+        # Интервал плановых проверок из файла конфигурации (None — по умолчанию)
+        self.interval = interval
+        self.labels = labels or {}
+
+    @property
+    def auto_discovered(self) -> bool:
+        return self.source == 'docker'
+
+    def same_as(self, other: 'ServiceEntry') -> bool:
+        """Совпадают ли параметры проверки (для вычисления изменений при перезагрузке)"""
+        return (self.type == other.type and self.target == other.target
+                and self.interval == other.interval and self.labels == other.labels)
+
+    def __repr__(self) -> str:
+        return f"ServiceEntry({self.name!r}, {self.type!r}, {self.target!r}, source={self.source!r})"
+
+
+@dataclass
+class RegistryDiff:
+    """Изменения реестра: имена добавленных, удаленных и измененных сервисов"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        parts = []
+        for title, names in (("добавлено", self.added), ("удалено", self.removed), ("изменено", self.changed)):
+            if names:
+                shown = ", ".join(names[:10]) + (f" и еще {len(names) - 10}" if len(names) > 10 else "")
+                parts.append(f"{title} {len(names)}: {shown}")
+        return "; ".join(parts) or "без изменений"
+
+
+class ServiceRegistry:
+    """Реестр сервисов из нескольких источников (SOURCES)
+
+    Каждый источник обновляется отдельно и только разницей: неизмененные
+    записи сохраняются как есть, поэтому расписание и история сервисов не
+    сбрасываются. Список services заменяется целиком при каждом изменении
+    (копирование при записи): цикл проверок, уже взявший ссылку на старый
+    список, изменений не видит. version растет с каждым изменением.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Dict[str, ServiceEntry]] = {}
+        self._view: Dict[str, ServiceEntry] = {}
+        self._lock = threading.Lock()
+        self.services: List[ServiceEntry] = []
+        self.version = 0
+        self.listeners: List[Callable[[RegistryDiff], None]] = []
+
+    def add_listener(self, callback: Callable[[RegistryDiff], None]):
+        """Подписка на изменения реестра: callback(RegistryDiff), вызывается вне лока"""
+        self.listeners.append(callback)
+
+    def get(self, name: str) -> Optional[ServiceEntry]:
+        return self._view.get(name)
+
+    def source_entries(self, source: str) -> List[ServiceEntry]:
+        """Записи одного источника (включая перекрытые более приоритетными)"""
+        with self._lock:
+            return list(self._sources.get(source, {}).values())
+
+    def find_target(self, service_type: str, target: str) -> Optional[ServiceEntry]:
+        """Сервис заданного типа с указанной целью проверки"""
+        for entry in self.services:
+            if entry.type == service_type and entry.target == target:
+                return entry
+        return None
+
+    def set_source(self, source: str, entries: Iterable[ServiceEntry]) -> RegistryDiff:
+        """Замена всех записей источника с применением только разницы"""
+        with self._lock:
+            current = self._sources.get(source, {})
+            updated: Dict[str, ServiceEntry] = {}
+            for entry in entries:
+                entry.source = source
+                previous = current.get(entry.name)
+                # Неизмененная запись сохраняется тем же объектом
+                updated[entry.name] = previous if previous is not None and previous.same_as(entry) else entry
+            self._sources[source] = updated
+            diff = self._rebuild()
+        self._notify(diff)
+        return diff
+
+    def add(self, entry: ServiceEntry) -> RegistryDiff:
+        """Добавление или замена одной записи источника entry.source"""
+        with self._lock:
+            self._sources.setdefault(entry.source, {})[entry.name] = entry
+            diff = self._rebuild()
+        self._notify(diff)
+        return diff
+
+    def remove(self, source: str, name: str) -> RegistryDiff:
+        """Удаление одной записи источника"""
+        with self._lock:
+            if self._sources.get(source, {}).pop(name, None) is None:
+                return RegistryDiff()
+            diff = self._rebuild()
+        self._notify(diff)
+        return diff
+
+    def _rebuild(self) -> RegistryDiff:
+        """Пересборка общего списка по источникам и вычисление разницы (под локом)"""
+        order = list(SOURCES) + [source for source in self._sources if source not in SOURCES]
+        view: Dict[str, ServiceEntry] = {}
+        for source in order:
+            for name, entry in self._sources.get(source, {}).items():
+                view.setdefault(name, entry)
+        diff = RegistryDiff(
+            added=[name for name in view if name not in self._view],
+            removed=[name for name in self._view if name not in view],
+            changed=[name for name, entry in view.items()
+                     if name in self._view and self._view[name] is not entry],
+        )
+        if diff:
+            self._view = view
+            self.services = list(view.values())
+            self.version += 1
+        return diff
+
+    def _notify(self, diff: RegistryDiff):
+        if not diff:
+            return
+        for listener in list(self.listeners):
+            try:
+                listener(diff)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика изменений реестра сервисов: {e}")
+
+
+def parse_services_env(raw: str) -> List[ServiceEntry]:
+    """Сервисы из строки SERVICES_TO_MONITOR
+
+    Поддерживаемые форматы:
+    1. "service1:http://localhost:8080,service2:docker:nginx" (полный формат)
+    2. "http://localhost:8080,postgresql,nginx,docker:jenkins" (упрощенный формат)
+    """
+    entries = []
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith('http://') or item.startswith('https://'):
+            # URL используется как имя
+            entries.append(ServiceEntry(item, 'http', item))
+        elif item.startswith(TYPE_PREFIXES):
+            # Тип без имени: имя — цель проверки
+            service_type = detect_service_type(item)
+            entries.append(ServiceEntry(strip_type_prefix(item), service_type, item))
+        elif ':' in item:
+            name, config = item.split(':', 1)
+            config = config.strip()
+            entries.append(ServiceEntry(name.strip(), detect_service_type(config), config))
+        else:
+            entries.append(ServiceEntry(item, detect_service_type(item), item))
+    return _unique_names(entries)
+
+
+def _unique_names(entries: List[ServiceEntry]) -> List[ServiceEntry]:
+    """Имя — ключ расписания, истории и оповещений: повторное имя получает суффикс #2, #3...,
+    иначе один из сервисов молча не проверялся бы"""
+    used = set()
+    for entry in entries:
+        unique = entry.name
+        count = 1
+        while unique in used:
+            count += 1
+            unique = f"{entry.name}#{count}"
+        if unique != entry.name:
+            logger.warning(f"Сервис {entry.name} указан несколько раз, проверяется как {unique} ({entry.config})")
+            entry.name = unique
+        used.add(unique)
+    return entries
+
+
+def _read_config_file(path: str) -> Dict:
+    """Содержимое файла конфигурации: TOML или YAML по расширению"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise RuntimeError("Для TOML на Python < 3.11 нужен пакет tomli")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("Для YAML конфигурации нужен пакет PyYAML")
+        with open(path, encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    raise RuntimeError(f"Неподдерживаемый формат конфигурации: {path} (нужен .toml, .yaml или .yml)")
+
+
+def load_services_file(path: str) -> List[ServiceEntry]:
+    """Сервисы из файла конфигурации
+
+    Формат (TOML):
+        [[services]]
+        name = "web"
+        target = "http://localhost:8080"
+        interval = 30
+
+        [[services]]
+        name = "db"
+        type = "docker"
+        target = "postgres"
+
+    type определяется по target, если не указан. В YAML — тот же список services.
+    """
+    data = _read_config_file(path)
+    items = data.get('services') or []
+    if isinstance(items, dict):
+        # Вариант с именами в ключах: [services.web]
+        items = [dict(item, name=item.get('name', name)) for name, item in items.items()]
+    if not isinstance(items, list):
+        raise ValueError("services должен быть списком")
+
+    entries = []
+    names = set()
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Сервис #{index}: ожидалась таблица параметров")
+        target = str(item.get('target') or item.get('config') or item.get('name') or '')
+        if not target:
+            raise ValueError(f"Сервис #{index}: не указан target")
+        service_type = item.get('type') or detect_service_type(target)
+        if service_type not in SERVICE_TYPES:
+            raise ValueError(f"Сервис #{index}: неизвестный тип {service_type}")
+        name = str(item.get('name') or target)
+        if name in names:
+            raise ValueError(f"Сервис {name} указан дважды")
+        names.add(name)
+        interval = item.get('interval')
+        entries.append(ServiceEntry(
+            name, service_type, target, source='file',
+            interval=max(1.0, float(interval)) if interval is not None else None,
+            labels={str(k): str(v) for k, v in (item.get('labels') or {}).items()}
+        ))
+    return entries
+
+
+class ConfigWatcher:
+    """Перезагрузка файла конфигурации сервисов при его изменении
+
+    Фоновый поток раз в interval секунд сравнивает время изменения и размер
+    файла; при изменении вызывается reload(). Ошибка разбора оставляет
+    прежний набор сервисов.
+    """
+
+    def __init__(self, path: str, reload: Callable[[], None], interval: float = DEFAULT_CONFIG_RELOAD_INTERVAL):
+        self.path = path
+        self.reload = reload
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            self._signature = signature
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Ошибка перезагрузки конфигурации {self.path}: {e}")
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Время жизни результата проверки по умолчанию, секунды
+DEFAULT_STATUS_TTL = 30.0
+
+
+def status_cache_ttl() -> float:
+    """TTL кэша статусов из STATUS_CACHE_TTL (0 — кэш отключен)"""
+    raw = os.getenv('STATUS_CACHE_TTL', '')
+    if not raw:
+        return DEFAULT_STATUS_TTL
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.warning(f"Некорректный STATUS_CACHE_TTL={raw}, используем {DEFAULT_STATUS_TTL}")
+        return DEFAULT_STATUS_TTL
+
+
+class StatusCache:
+    """Кэш результата цикла проверок с объединением одновременных запросов
+
+    Пока результат моложе ttl, он отдается из кэша. Если цикл уже идет,
+    новые запросы ждут его завершения, а не запускают свой (single-flight).
+    Отмена одного из ожидающих не прерывает общий цикл.
+
+    fetch(on_result) получает функцию, которую вызывает с (индекс, результат)
+    по мере готовности частичных результатов; они раздаются всем ожидающим.
+    """
+
+    def __init__(self, fetch: Callable[[Callable[[int, Any], None]], Awaitable[Any]],
+                 ttl: Optional[float] = None):
+        self.fetch = fetch
+        self.ttl = status_cache_ttl() if ttl is None else ttl
+        self.value: Optional[Any] = None
+        # Время получения результата по time.monotonic()
+        self.updated_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        # Частичные результаты идущего цикла и подписчики на них
+        self._partial: Dict[int, Any] = {}
+        self._listeners: List[Callable[[int, Any], None]] = []
+
+    @property
+    def age(self) -> Optional[float]:
+        """Возраст закэшированного результата в секундах"""
+        if self.updated_at is None:
+            return None
+        return time.monotonic() - self.updated_at
+
+    def put(self, value: Any, age: float = 0.0):
+        """Сохранение результата, полученного вне кэша (например, загруженного с диска)"""
+        self.value = value
+        self.updated_at = time.monotonic() - age
+
+    def is_fresh(self) -> bool:
+        """Есть результат моложе ttl"""
+        return self.value is not None and self.age < self.ttl
+
+    async def get(self, fresh: bool = False,
+                  on_result: Optional[Callable[[int, Any], None]] = None) -> Tuple[Any, float]:
+        """Результат и его возраст в секундах
+
+        fresh=True пропускает кэш, но присоединяется к уже идущему циклу, а не
+        запускает второй. Такой цикл начат до запроса, поэтому часть его
+        результатов могла быть получена раньше самого запроса. on_result
+        получает частичные результаты, включая уже готовые к моменту вызова.
+        """
+        if not fresh and self.is_fresh():
+            return self.value, self.age
+
+        if self._inflight is None:
+            self._partial = {}
+            self._inflight = asyncio.create_task(self._refresh())
+        if on_result is not None:
+            for index, result in list(self._partial.items()):
+                on_result(index, result)
+            self._listeners.append(on_result)
+        try:
+            await asyncio.shield(self._inflight)
+        finally:
+            if on_result in self._listeners:
+                self._listeners.remove(on_result)
+        return self.value, self.age
+
+    def _on_partial(self, index: int, result: Any):
+        self._partial[index] = result
+        for listener in list(self._listeners):
+            try:
+                listener(index, result)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика частичного результата: {e}")
+
+    async def _refresh(self):
+        try:
+            self.put(await self.fetch(self._on_partial))
+        finally:
+            self._inflight = None
+            self._partial = {}
+
+
+def format_age(seconds: float) -> str:
+    """Возраст данных для ответа пользователю"""
+    if seconds < 1:
+        return "только что"
+    if seconds < 60:
+        return f"{seconds:.0f} с назад"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} мин {seconds % 60:.0f} с назад"
+    return f"{seconds // 3600:.0f} ч {seconds % 3600 // 60:.0f} мин назад"
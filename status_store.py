@@ -0,0 +1,292 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сброс накопленных результатов на диск: не реже, чем раз в столько секунд, или по размеру пачки
+FLUSH_INTERVAL = 5.0
+FLUSH_BATCH = 500
+# Хранение: сырые результаты, минутные и часовые агрегаты (дни)
+RAW_RETENTION_DAYS = 2
+MINUTE_RETENTION_DAYS = 14
+HOUR_RETENTION_DAYS = 400
+# Как часто удалять устаревшие данные, секунды
+RETENTION_INTERVAL = 3600
+
+# Диапазоны длиннее этих порогов читаются из агрегатов, а не из сырых строк
+MINUTE_QUERY_THRESHOLD = 6 * 3600
+HOUR_QUERY_THRESHOLD = 2 * 86400
+
+STATUS_CODES = {'healthy': 1, 'unhealthy': 0, 'unknown': -1}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    service_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    response_time REAL
+);
+CREATE INDEX IF NOT EXISTS samples_service_ts ON samples (service_id, ts);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollup_1m (
+    service_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    healthy INTEGER NOT NULL,
+    rt_sum REAL NOT NULL,
+    rt_count INTEGER NOT NULL,
+    rt_max REAL,
+    PRIMARY KEY (service_id, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1h (
+    service_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    healthy INTEGER NOT NULL,
+    rt_sum REAL NOT NULL,
+    rt_count INTEGER NOT NULL,
+    rt_max REAL,
+    PRIMARY KEY (service_id, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS last_state (
+    service_id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    status INTEGER NOT NULL,
+    response_time REAL,
+    error_message TEXT,
+    uptime REAL
+);
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO {table} (service_id, bucket, total, healthy, rt_sum, rt_count, rt_max)
+VALUES (?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (service_id, bucket) DO UPDATE SET
+    total = total + 1,
+    healthy = healthy + excluded.healthy,
+    rt_sum = rt_sum + excluded.rt_sum,
+    rt_count = rt_count + excluded.rt_count,
+    rt_max = CASE
+        WHEN excluded.rt_max IS NULL THEN rt_max
+        WHEN rt_max IS NULL OR excluded.rt_max > rt_max THEN excluded.rt_max
+        ELSE rt_max
+    END
+"""
+
+
+class StatusStore:
+    """Хранилище результатов проверок в SQLite с агрегатами raw -> 1 мин -> 1 ч
+
+    Результаты ставятся в очередь без блокировки и записываются фоновым
+    потоком пачками в одной транзакции: сырые строки, минутные и часовые
+    агрегаты (обновляются сразу при вставке) и последнее состояние сервиса.
+    Устаревшие данные удаляются по срокам хранения каждого уровня.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._service_ids: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._flushed = threading.Condition()
+        self._pending = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        # WAL: чтение запросов бота не блокируется записью фонового потока
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='status-store', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Запись оставшихся результатов и остановка потока"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=30)
+
+    def record(self, name: str, status, timestamp: Optional[float] = None):
+        """Постановка результата проверки (ServiceStatus) в очередь записи"""
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((
+            name,
+            timestamp if timestamp is not None else time.time(),
+            STATUS_CODES.get(status.status, -1),
+            status.response_time,
+            status.error_message,
+            status.uptime
+        ))
+
+    def flush(self, timeout: float = 30) -> bool:
+        """Ожидание записи всех поставленных в очередь результатов"""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self):
+        connection = self._connect()
+        next_retention = 0.0
+        stopping = False
+        try:
+            while not stopping:
+                batch = []
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while len(batch) < FLUSH_BATCH:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if batch:
+                    try:
+                        self._write(connection, batch)
+                    except Exception as e:
+                        logger.error(f"Ошибка записи результатов проверок в {self.path}: {e}")
+                    finally:
+                        with self._flushed:
+                            self._pending -= len(batch)
+                            self._flushed.notify_all()
+                if time.monotonic() >= next_retention:
+                    next_retention = time.monotonic() + RETENTION_INTERVAL
+                    try:
+                        self._apply_retention(connection)
+                    except Exception as e:
+                        logger.error(f"Ошибка очистки устаревших данных в {self.path}: {e}")
+        finally:
+            connection.close()
+
+    def _service_id(self, connection: sqlite3.Connection, name: str) -> int:
+        service_id = self._service_ids.get(name)
+        if service_id is None:
+            connection.execute("INSERT OR IGNORE INTO services (name) VALUES (?)", (name,))
+            service_id = connection.execute(
+                "SELECT id FROM services WHERE name = ?", (name,)).fetchone()[0]
+            self._service_ids[name] = service_id
+        return service_id
+
+    def _write(self, connection: sqlite3.Connection, batch: List[Tuple]):
+        """Запись пачки результатов одной транзакцией"""
+        samples = []
+        minute_rows = []
+        hour_rows = []
+        last_states = {}
+        with connection:
+            for name, ts, code, response_time, error_message, uptime in batch:
+                service_id = self._service_id(connection, name)
+                second = int(ts)
+                healthy = 1 if code == 1 else 0
+                rt_sum = response_time if response_time is not None else 0.0
+                rt_count = 1 if response_time is not None else 0
+                samples.append((service_id, second, code, response_time))
+                minute_rows.append((service_id, second - second % 60, healthy, rt_sum, rt_count, response_time))
+                hour_rows.append((service_id, second - second % 3600, healthy, rt_sum, rt_count, response_time))
+                last_states[service_id] = (service_id, ts, code, response_time, error_message, uptime)
+            connection.executemany(
+                "INSERT INTO samples (service_id, ts, status, response_time) VALUES (?, ?, ?, ?)", samples)
+            connection.executemany(ROLLUP_UPSERT.format(table='rollup_1m'), minute_rows)
+            connection.executemany(ROLLUP_UPSERT.format(table='rollup_1h'), hour_rows)
+            connection.executemany(
+                "INSERT OR REPLACE INTO last_state "
+                "(service_id, ts, status, response_time, error_message, uptime) VALUES (?, ?, ?, ?, ?, ?)",
+                list(last_states.values())
+            )
+
+    def _apply_retention(self, connection: sqlite3.Connection):
+        now = int(time.time())
+        with connection:
+            connection.execute("DELETE FROM samples WHERE ts < ?", (now - RAW_RETENTION_DAYS * 86400,))
+            connection.execute("DELETE FROM rollup_1m WHERE bucket < ?", (now - MINUTE_RETENTION_DAYS * 86400,))
+            connection.execute("DELETE FROM rollup_1h WHERE bucket < ?", (now - HOUR_RETENTION_DAYS * 86400,))
+
+    # Чтение (из любого потока, отдельное соединение на запрос)
+
+    def _read(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def last_states(self) -> Dict[str, Tuple[float, str, Optional[float], Optional[str], Optional[float]]]:
+        """Последнее сохраненное состояние сервисов:
+        имя -> (время, статус, время ответа, ошибка, uptime)"""
+        rows = self._read(
+            "SELECT s.name, l.ts, l.status, l.response_time, l.error_message, l.uptime "
+            "FROM last_state l JOIN services s ON s.id = l.service_id"
+        )
+        return {
+            name: (ts, STATUS_NAMES.get(code, 'unknown'), response_time, error_message, uptime)
+            for name, ts, code, response_time, error_message, uptime in rows
+        }
+
+    def service_names(self) -> List[str]:
+        return [row[0] for row in self._read("SELECT name FROM services ORDER BY name")]
+
+    def uptime(self, name: str, since: float, until: Optional[float] = None) -> Optional[Dict]:
+        """Доступность и время ответа сервиса за период
+
+        Короткие периоды считаются по сырым результатам, длинные — по минутным
+        или часовым агрегатам (с точностью до границ корзин).
+        """
+        until = until if until is not None else time.time()
+        rows = self._read("SELECT id FROM services WHERE name = ?", (name,))
+        if not rows:
+            return None
+        service_id = rows[0][0]
+        span = until - since
+
+        if span > HOUR_QUERY_THRESHOLD:
+            source, step = 'rollup_1h', 3600
+        elif span > MINUTE_QUERY_THRESHOLD:
+            source, step = 'rollup_1m', 60
+        else:
+            source, step = 'samples', 0
+
+        if step:
+            # Корзина входит в период, если ее начало попадает в [since, until)
+            start = int(since) - int(since) % step
+            row = self._read(
+                f"SELECT SUM(total), SUM(healthy), SUM(rt_sum), SUM(rt_count), MAX(rt_max) "
+                f"FROM {source} WHERE service_id = ? AND bucket >= ? AND bucket < ?",
+                (service_id, start, until)
+            )[0]
+        else:
+            row = self._read(
+                "SELECT COUNT(*), SUM(status = 1), SUM(response_time), COUNT(response_time), "
+                "MAX(response_time) FROM samples WHERE service_id = ? AND ts >= ? AND ts < ?",
+                (service_id, int(since), until)
+            )[0]
+        total, healthy, rt_sum, rt_count, rt_max = row
+        if not total:
+            return {'samples': 0, 'source': source}
+        return {
+            'samples': total,
+            'availability': (healthy or 0) / total,
+            'avg_response_time': rt_sum / rt_count if rt_count else None,
+            'max_response_time': rt_max,
+            'source': source,
+        }
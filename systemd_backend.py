@@ -0,0 +1,122 @@
+import time
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import perf
+
+logger = logging.getLogger(__name__)
+
+PROPERTIES = ['Id', 'LoadState', 'ActiveState', 'SubState', 'ActiveEnterTimestampMonotonic']
+SYSTEMCTL_TIMEOUT = 10
+
+
+def unit_name(service_name: str) -> str:
+    """Имя юнита systemd: без префикса systemd: и с суффиксом .service"""
+    if service_name.startswith('systemd:'):
+        service_name = service_name.replace('systemd:', '')
+    if not service_name.endswith('.service'):
+        service_name = f"{service_name}.service"
+    return service_name
+
+
+@dataclass
+class UnitState:
+    """Состояние юнита systemd"""
+    unit: str
+    load_state: str
+    active_state: str
+    sub_state: str
+    # ActiveEnterTimestampMonotonic в микросекундах CLOCK_MONOTONIC, 0 если юнит не запускался
+    active_enter_monotonic: int = 0
+
+    @property
+    def uptime(self) -> Optional[float]:
+        """Точное время работы юнита в секундах"""
+        if self.active_state != 'active' or not self.active_enter_monotonic:
+            return None
+        return time.monotonic() - self.active_enter_monotonic / 1_000_000
+
+
+def _parse_show_output(output: str) -> List[Dict[str, str]]:
+    """Разбор вывода systemctl show: блоки key=value, разделенные пустой строкой"""
+    blocks = []
+    current: Dict[str, str] = {}
+    for line in output.split('\n'):
+        if not line.strip():
+            if current:
+                blocks.append(current)
+                current = {}
+            continue
+        key, _, value = line.partition('=')
+        current[key] = value
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+@perf.timed('systemd.show')
+def _show(units: List[str], timeout: float) -> List[Dict[str, str]]:
+    result = subprocess.run(
+        ['systemctl', 'show', f"--property={','.join(PROPERTIES)}", '--', *units],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    blocks = _parse_show_output(result.stdout)
+    if not blocks and result.returncode != 0:
+        # systemctl недоступен целиком (нет systemd, нет доступа к шине)
+        raise RuntimeError(result.stderr.strip() or f"systemctl exited with code {result.returncode}")
+    return blocks
+
+
+class SystemdUnits:
+    """Состояние набора юнитов systemd за один вызов systemctl show
+
+    systemctl выводит блоки свойств в порядке переданных юнитов, поэтому
+    блоки сопоставляются с запросом по позиции (Id может отличаться у алиасов).
+    """
+
+    def __init__(self, states: Dict[str, UnitState]):
+        self.states = states
+
+    @classmethod
+    def take(cls, service_names: Iterable[str], timeout: float = SYSTEMCTL_TIMEOUT) -> 'SystemdUnits':
+        """Запрос состояния всех юнитов одним процессом systemctl"""
+        units = list(dict.fromkeys(unit_name(name) for name in service_names))
+        if not units:
+            return cls({})
+
+        blocks = _show(units, timeout)
+        if len(blocks) != len(units):
+            # Один некорректный юнит ломает весь пакетный запрос — опрашиваем по одному
+            logger.warning(f"systemctl show вернул {len(blocks)} блоков для {len(units)} юнитов, "
+                           f"опрашиваем юниты по отдельности")
+            blocks = []
+            for unit in units:
+                try:
+                    unit_blocks = _show([unit], timeout)
+                except RuntimeError as e:
+                    logger.warning(f"Не удалось получить состояние юнита {unit}: {e}")
+                    unit_blocks = []
+                blocks.append(unit_blocks[0] if unit_blocks else {})
+
+        states = {}
+        for unit, block in zip(units, blocks):
+            try:
+                monotonic = int(block.get('ActiveEnterTimestampMonotonic') or 0)
+            except ValueError:
+                monotonic = 0
+            states[unit] = UnitState(
+                unit=unit,
+                load_state=block.get('LoadState', 'unknown'),
+                active_state=block.get('ActiveState', 'unknown'),
+                sub_state=block.get('SubState', 'unknown'),
+                active_enter_monotonic=monotonic
+            )
+        return cls(states)
+
+    def get(self, service_name: str) -> Optional[UnitState]:
+        """Состояние юнита по имени сервиса"""
+        return self.states.get(unit_name(service_name))
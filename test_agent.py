@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Тесты протокола агента: подтверждение пакетов, повторы, полная синхронизация
+и проверки запросов на стороне приема
+"""
+
+import gzip
+import json
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+from agent import MAX_BODY, FleetView, IngestServer, StatusAgent
+from service_monitor import ServiceStatus
+from service_registry import ServiceEntry
+
+
+class FakeClient:
+    """Клиент, передающий пакеты прямо в FleetView; lose_responses ответов «теряется»
+    уже после того, как бот применил пакет"""
+
+    def __init__(self, fleet: FleetView):
+        self.fleet = fleet
+        self.lose_responses = 0
+        self.bodies = []
+
+    async def post(self, url, content, headers):
+        self.bodies.append(content)
+        if headers.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        answer = self.fleet.apply(json.loads(content))
+        if self.lose_responses:
+            self.lose_responses -= 1
+            raise httpx.ReadTimeout("ответ потерян")
+        return httpx.Response(200, json=answer, request=httpx.Request('POST', url))
+
+
+def make_agent(confirm_checks: int = 3) -> StatusAgent:
+    return StatusAgent('http://bot/ingest', 'token', host='node1', push_interval=1,
+                       heartbeat_interval=30, full_sync_interval=300, confirm_checks=confirm_checks)
+
+
+def result(agent: StatusAgent, name: str, status: str, error: str = None):
+    agent.on_result(ServiceEntry(name, 'docker', name), ServiceStatus(name, status, None, error, datetime.now()))
+
+
+def push(agent: StatusAgent, client: FakeClient):
+    return asyncio.run(agent.push(client, 'http://bot/ingest'))
+
+
+def collect(fleet: FleetView):
+    received = []
+    fleet.add_listener(lambda service, status: received.append((service.name, status.status)))
+    return received
+
+
+def test_lost_response_is_resent_unchanged():
+    fleet = FleetView(stale_seconds=90)
+    received = collect(fleet)
+    client = FakeClient(fleet)
+    agent = make_agent()
+
+    result(agent, 'web', 'healthy')
+    push(agent, client)  # полная синхронизация
+    result(agent, 'web', 'unhealthy', 'down')
+    client.lose_responses = 1
+    try:
+        push(agent, client)
+    except httpx.HTTPError:
+        pass
+    # Пока пакет не подтвержден, новый результат в него не попадает
+    result(agent, 'db', 'unhealthy', 'refused')
+    push(agent, client)
+    assert client.bodies[-1] == client.bodies[-2]
+    push(agent, client)
+
+    assert fleet.statuses('node1')[0].name == 'db@node1'
+    assert fleet.statuses('node1')[0].status == 'unhealthy'
+    # Повтор пакета не засчитан второй проверкой
+    assert received.count(('web@node1', 'unhealthy')) == 1
+    assert received.count(('db@node1', 'unhealthy')) == 1
+    assert not agent.pending
+
+
+def test_bot_restart_requests_full_sync():
+    fleet = FleetView(stale_seconds=90)
+    client = FakeClient(fleet)
+    agent = make_agent(confirm_checks=1)
+    for name in ('a', 'b', 'c'):
+        result(agent, name, 'healthy')
+    push(agent, client)
+    assert len(fleet.statuses('node1')) == 3
+
+    # Бот перезапустился и потерял состояние: разностный пакет применяется,
+    # а агент получает запрос полной синхронизации
+    client.fleet = fleet = FleetView(stale_seconds=90)
+    result(agent, 'a', 'unhealthy', 'down')
+    push(agent, client)
+    assert [s.name for s in fleet.statuses('node1')] == ['a@node1']
+    assert agent.build_payload(0)['full']
+    push(agent, client)
+    assert len(fleet.statuses('node1')) == 3
+    assert not agent.build_payload(0) or not agent.build_payload(0)['full']
+
+
+def test_full_sync_repeats_are_not_new_checks():
+    fleet = FleetView(stale_seconds=90)
+    received = collect(fleet)
+    client = FakeClient(fleet)
+    agent = make_agent(confirm_checks=1)
+    result(agent, 'web', 'healthy')
+    push(agent, client)
+    result(agent, 'web', 'healthy')
+    agent._last_full = 0
+    push(agent, client)
+    assert received == [('web@node1', 'healthy')]
+
+
+def test_removed_service_is_retired():
+    fleet = FleetView(stale_seconds=90)
+    removed = []
+    fleet.add_remove_listener(removed.append)
+    client = FakeClient(fleet)
+    agent = make_agent()
+    result(agent, 'web', 'healthy')
+    result(agent, 'db', 'healthy')
+    push(agent, client)
+    agent.on_remove('db')
+    push(agent, client)
+    assert removed == ['db@node1']
+    assert not agent.removed
+
+
+def test_malformed_batch_does_not_advance_seq():
+    fleet = FleetView(stale_seconds=90)
+    received = collect(fleet)
+    good = ['web', 'http', 'healthy', 0.1, None, 0, None]
+    batch = {'v': 1, 'host': 'node1', 'run': 'r', 'seq': 1,
+             'services': [good, ['db', 'docker', 'healthy', 'not-a-number', None, 0, None]]}
+    with pytest.raises(ValueError):
+        fleet.apply(batch)
+    # Ни одна строка не применена, номер пакета не сдвинулся
+    assert received == []
+    assert fleet.statuses('node1') == []
+
+    # Исправленный повтор с тем же seq применяется, а не отбрасывается как дубликат
+    batch['services'][1][3] = 0.2
+    assert fleet.apply(batch) == {'ok': True, 'full': True}
+    assert received == [('web@node1', 'healthy'), ('db@node1', 'healthy')]
+    assert fleet.hosts['node1'].seq == 1
+
+
+async def ingest_request(head: str, body: bytes = b'') -> str:
+    """Запрос к IngestServer на свободном порту, возвращает строку статуса ответа"""
+    server = IngestServer(FleetView(stale_seconds=90), 'token', '127.0.0.1', 0)
+    await server.start()
+    try:
+        port = server._server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+        status = (await asyncio.wait_for(reader.readline(), timeout=5)).decode().strip()
+        writer.close()
+        return status
+    finally:
+        await server.stop()
+
+
+def test_ingest_rejects_without_token_before_reading_body():
+    # Тело не отправляется: ответ должен прийти, не дожидаясь его
+    head = f"POST /ingest HTTP/1.1\r\nContent-Length: {MAX_BODY}\r\n"
+    assert asyncio.run(ingest_request(head)).endswith('401 Unauthorized')
+
+
+def test_ingest_rejects_invalid_content_length():
+    for value in ('-5', 'abc'):
+        head = f"POST /ingest HTTP/1.1\r\nAuthorization: Bearer token\r\nContent-Length: {value}\r\n"
+        assert asyncio.run(ingest_request(head)).endswith('400 Bad Request')
+
+
+def test_ingest_limits_decompressed_size():
+    bomb = gzip.compress(b' ' * (MAX_BODY + 1))
+    head = (f"POST /ingest HTTP/1.1\r\nAuthorization: Bearer token\r\nContent-Encoding: gzip\r\n"
+            f"Content-Length: {len(bomb)}\r\n")
+    assert asyncio.run(ingest_request(head, bomb)).endswith('413 Payload Too Large')
+
+
+def test_ingest_accepts_agent_batch():
+    body = gzip.compress(json.dumps({'v': 1, 'host': 'node1', 'run': 'r', 'seq': 1, 'full': True,
+                                     'services': [['web', 'http', 'healthy', 0.1, None, 0, None]]}).encode())
+    head = (f"POST /ingest HTTP/1.1\r\nAuthorization: Bearer token\r\nContent-Encoding: gzip\r\n"
+            f"Content-Length: {len(body)}\r\n")
+    assert asyncio.run(ingest_request(head, body)).endswith('200 OK')
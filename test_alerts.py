@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Тесты оповещений: подтверждение падения и восстановления, «моргание» и группировка
+"""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from alerts import MAX_ALERT_SIZE, AlertManager, format_alert
+from service_monitor import ServiceStatus
+
+
+def make_manager(sent: list, **kwargs) -> AlertManager:
+    async def send(text: str):
+        sent.append(text)
+    # Окно группировки большое: отправка только явным flush()
+    options = dict(failure_threshold=3, recovery_threshold=2, flap_threshold=6, group_window=60)
+    options.update(kwargs)
+    return AlertManager(send, **options)
+
+
+def feed(manager: AlertManager, name: str, statuses: str):
+    """Результаты по строке вида "hhuuu": h — healthy, u — unhealthy"""
+    service = SimpleNamespace(name=name, type='http')
+    for code in statuses:
+        status = 'healthy' if code == 'h' else 'unhealthy'
+        manager.on_result(service, ServiceStatus(name, status, None, None if code == 'h' else 'HTTP 502',
+                                                 datetime.now()))
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro()
+        finally:
+            for task in asyncio.all_tasks() - {asyncio.current_task()}:
+                task.cancel()
+    return asyncio.run(wrapper())
+
+
+def test_debounce_fire_and_recover():
+    sent = []
+
+    async def scenario():
+        manager = make_manager(sent)
+        feed(manager, 'web', 'hh')
+        # Одиночные сбои ниже порога не оповещают
+        feed(manager, 'web', 'uuhuu')
+        assert not manager.pending
+        feed(manager, 'web', 'u')
+        assert manager.pending == [('down', 'web', 'HTTP 502')]
+        await manager.flush()
+        # Дальнейшие сбои не повторяют оповещение, одна успешная проверка — еще не восстановление
+        feed(manager, 'web', 'uuh')
+        assert not manager.pending
+        feed(manager, 'web', 'h')
+        assert [event[:2] for event in manager.pending] == [('up', 'web')]
+        await manager.flush()
+
+    run(scenario)
+    assert len(sent) == 2
+    assert sent[0].startswith("🚨 Недоступны (1):\n• web - HTTP 502")
+    assert sent[1].startswith("✅ Восстановлены (1):\n• web - простой")
+
+
+def test_first_healthy_state_is_silent_and_seed_suppresses_known_outage():
+    sent = []
+
+    async def scenario():
+        manager = make_manager(sent)
+        manager.seed({'db': 'unhealthy'})
+        feed(manager, 'web', 'hhhh')
+        feed(manager, 'db', 'uuuu')
+        assert not manager.pending
+        feed(manager, 'db', 'hh')
+        assert [event[:2] for event in manager.pending] == [('up', 'db')]
+
+    run(scenario)
+
+
+def test_flapping_suppresses_alerts_until_stable():
+    sent = []
+
+    async def scenario():
+        manager = make_manager(sent, failure_threshold=1, recovery_threshold=1)
+        feed(manager, 'web', 'h')
+        # Шесть смен состояния: после каждой был бы отдельный down/up
+        feed(manager, 'web', 'uhuhuh')
+        kinds = [event[0] for event in manager.pending]
+        assert kinds == ['down', 'up', 'down', 'up', 'down', 'flapping']
+        manager.pending.clear()
+        # Пока сервис нестабилен, оповещений нет
+        feed(manager, 'web', 'uhuh')
+        assert not manager.pending
+        assert manager.states['web'].flapping
+        # Смены уходят из окна — нестабильность снимается с текущим состоянием
+        feed(manager, 'web', 'u' * 20)
+        assert manager.pending == [('stable', 'web', 'сейчас недоступен')]
+        assert manager.states['web'].confirmed == 'unhealthy'
+        assert not manager.states['web'].flapping
+
+    run(scenario)
+
+
+def test_events_are_grouped_into_one_message():
+    sent = []
+
+    async def scenario():
+        manager = make_manager(sent, group_window=0.05)
+        for name in ('web', 'db', 'cache'):
+            feed(manager, name, 'hhuuu')
+        feed(manager, 'web', 'hh')
+        await asyncio.sleep(0.2)
+
+    run(scenario)
+    assert len(sent) == 1
+    down, up = sent[0].split("\n\n")
+    assert down == "🚨 Недоступны (3):\n• web - HTTP 502\n• db - HTTP 502\n• cache - HTTP 502"
+    assert up.startswith("✅ Восстановлены (1):\n• web - простой")
+
+
+def test_format_alert_keeps_last_event_per_service_and_splits_long_messages():
+    text = format_alert([('down', 'web', 'HTTP 502'), ('down', 'web', 'Timeout')])
+    assert text == "🚨 Недоступны (1):\n• web - Timeout"
+
+    sent = []
+
+    async def scenario():
+        manager = make_manager(sent)
+        manager.pending = [('down', f"service-{i}", 'x' * 100) for i in range(100)]
+        await manager.flush()
+
+    run(scenario)
+    assert len(sent) > 1
+    assert all(len(text) <= MAX_ALERT_SIZE for text in sent)
+    assert sum(text.count("• service-") for text in sent) == 100
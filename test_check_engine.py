@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тесты движка проверок: порядок результатов, лимиты по типам и дедлайн
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from check_engine import DEADLINE_EXCEEDED_MESSAGE, CheckEngine, parse_concurrency_limits
+
+
+def service(name: str, service_type: str = 'http'):
+    return SimpleNamespace(name=name, type=service_type)
+
+
+def fallback(svc, message: str):
+    return (svc.name, 'fallback', message)
+
+
+def test_results_keep_config_order_and_hung_checks_hit_deadline():
+    services = [service('slow'), service('hang'), service('fast'), service('error'), service('hang2', 'docker')]
+    notified = []
+
+    async def check(svc):
+        if svc.name.startswith('hang'):
+            await asyncio.Event().wait()
+        if svc.name == 'error':
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.05 if svc.name == 'slow' else 0)
+        return (svc.name, 'ok', None)
+
+    engine = CheckEngine(check, fallback, limits={'http': 10, 'docker': 1}, deadline=0.3)
+    results = asyncio.run(engine.run(services, on_result=lambda i, r: notified.append(i)))
+
+    assert results == [
+        ('slow', 'ok', None),
+        ('hang', 'fallback', DEADLINE_EXCEEDED_MESSAGE),
+        ('fast', 'ok', None),
+        ('error', 'fallback', 'boom'),
+        ('hang2', 'fallback', DEADLINE_EXCEEDED_MESSAGE),
+    ]
+    # Каждый результат, включая замененные по дедлайну, передан ровно один раз
+    assert sorted(notified) == [0, 1, 2, 3, 4]
+    assert notified[-2:] in ([1, 4], [4, 1])
+
+
+def test_concurrency_limited_per_type():
+    running = {'http': 0, 'docker': 0}
+    peak = {'http': 0, 'docker': 0}
+
+    async def check(svc):
+        running[svc.type] += 1
+        peak[svc.type] = max(peak[svc.type], running[svc.type])
+        await asyncio.sleep(0.01)
+        running[svc.type] -= 1
+        return svc.name
+
+    services = [service(f"h{i}") for i in range(20)] + [service(f"d{i}", 'docker') for i in range(20)]
+    engine = CheckEngine(check, fallback, limits={'http': 5, 'docker': 2}, deadline=5)
+    results = asyncio.run(engine.run(services))
+    assert results == [s.name for s in services]
+    assert peak == {'http': 5, 'docker': 2}
+
+
+def test_hung_checks_do_not_block_other_types():
+    async def check(svc):
+        if svc.type == 'docker':
+            await asyncio.Event().wait()
+        return svc.name
+
+    services = [service(f"d{i}", 'docker') for i in range(3)] + [service('web')]
+    engine = CheckEngine(check, fallback, limits={'docker': 1}, deadline=0.2)
+    results = asyncio.run(engine.run(services))
+    assert results[-1] == 'web'
+    assert all(r[2] == DEADLINE_EXCEEDED_MESSAGE for r in results[:3])
+
+
+def test_parse_concurrency_limits():
+    limits = parse_concurrency_limits("http=32, docker=0, bad, custom=3")
+    assert limits['http'] == 32
+    # Лимит не меньше 1, некорректные элементы пропускаются
+    assert limits['docker'] == 1
+    assert limits['custom'] == 3
+    assert limits['systemd'] == 4
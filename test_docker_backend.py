@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Тесты Docker бэкенда без демона: поиск контейнеров в снимке и применение событий
+"""
+
+from types import SimpleNamespace
+
+from docker_backend import ContainerInfo, DockerEventWatcher, DockerSnapshot
+
+
+def container(container_id: str, name: str, image: str, image_id: str = '') -> ContainerInfo:
+    return ContainerInfo(id=container_id.ljust(64, '0'), name=name, image=image, image_id=image_id,
+                         state='running')
+
+
+class FakeApi:
+    def __init__(self, images):
+        self._images = images
+        self.calls = 0
+
+    def images(self):
+        self.calls += 1
+        return self._images
+
+
+def make_snapshot():
+    containers = [
+        container('abc123', 'web-abc123def', 'nginx:1.25', 'sha256:nginx'),
+        container('abd456', 'db', 'postgres:16', 'sha256:pg'),
+        container('ffee01', 'worker', 'sha256:deadbeef', 'sha256:app'),
+    ]
+    api = FakeApi([
+        {'Id': 'sha256:nginx', 'RepoTags': ['nginx:1.25']},
+        {'Id': 'sha256:pg', 'RepoTags': ['postgres:16']},
+        {'Id': 'sha256:app', 'RepoTags': ['registry.local/billing-app:2.0']},
+    ])
+    return DockerSnapshot(containers, SimpleNamespace(api=api)), api
+
+
+def test_exact_name_and_full_id_first():
+    snapshot, api = make_snapshot()
+    assert snapshot.find('db').name == 'db'
+    assert snapshot.find('ffee01'.ljust(64, '0')).name == 'worker'
+    assert api.calls == 0
+
+
+def test_unique_id_prefix_before_substring():
+    snapshot, api = make_snapshot()
+    # Короткий ID совпадает и с префиксом ID web, и с подстрокой имени — побеждает ID
+    assert snapshot.find('abc123').name == 'web-abc123def'
+    assert snapshot.find('abd4').name == 'db'
+    assert snapshot.find('ABD456').name == 'db'
+    assert snapshot.find('ffee01000000').name == 'worker'
+
+
+def test_ambiguous_prefix_falls_back_to_substring():
+    snapshot, api = make_snapshot()
+    # "ab" — префикс двух ID: ищется как подстрока имени/образа (первый по порядку)
+    assert snapshot.find('ab').name == 'web-abc123def'
+    # Шестнадцатеричная строка, не являющаяся префиксом ID, ищется в образе
+    assert snapshot.find('deadbeef').name == 'worker'
+
+
+def test_substring_before_tag_prefix():
+    snapshot, api = make_snapshot()
+    assert snapshot.find('postgres').name == 'db'
+    assert api.calls == 0
+    # Не найдено в имени и образе — префикс тега, теги запрашиваются один раз
+    assert snapshot.find('registry.local/billing').name == 'worker'
+    assert snapshot.find('registry.local/other') is None
+    assert api.calls == 1
+
+
+def test_results_are_cached_per_query():
+    snapshot, api = make_snapshot()
+    assert snapshot.find('missing') is None
+    assert snapshot.find('missing') is None
+    assert snapshot.find('registry.local/billing') is snapshot.find('registry.local/billing')
+    # Теги образов запрошены один раз на весь снимок
+    assert api.calls == 1
+
+
+def event(action: str, container_id: str = 'c1', name: str = 'web') -> dict:
+    return {'Action': action, 'Actor': {'ID': container_id, 'Attributes': {'name': name, 'image': 'nginx'}}}
+
+
+def test_pause_and_unpause_events_update_state():
+    received = []
+    watcher = DockerEventWatcher(None, on_event=lambda action, c: received.append((action, c.state)))
+    for action in ('create', 'start', 'pause'):
+        watcher._apply(event(action))
+    # Приостановленный контейнер не считается запущенным
+    assert watcher.snapshot().find('web').state == 'paused'
+    assert watcher.snapshot().running() == []
+
+    watcher._apply(event('unpause'))
+    assert watcher.snapshot().find('web').state == 'running'
+    assert received == [('create', 'created'), ('start', 'running'),
+                        ('pause', 'paused'), ('unpause', 'running')]
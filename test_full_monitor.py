@@ -5,8 +5,12 @@
 
 import os
 import time
+from dotenv import load_dotenv
 from service_monitor import ServiceMonitor
 
+# Остальные настройки (Docker, дедлайны) — из .env, как у бота
+load_dotenv()
+
 def test_full_monitoring():
     """Тестирование полной функциональности мониторинга"""
     
@@ -18,6 +22,8 @@ def test_full_monitoring():
     
     # Создаем монитор
     monitor = ServiceMonitor()
+    # Проверяются и автоматически обнаруженные контейнеры
+    monitor.wait_backends()
     
     print("🔍 Тестирование мониторинга сервисов")
     print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Тесты кольцевого буфера истории: окна по времени после переполнения и перцентили
+"""
+
+from datetime import datetime
+
+import pytest
+
+from history import HistoryStore, ServiceHistory, percentile
+from service_monitor import ServiceStatus
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7
+    assert percentile([1.0, 2.0, 3.0], 0) == 1
+    assert percentile([], 50) is None
+
+
+def test_window_after_wraparound():
+    history = ServiceHistory(10)
+    # 25 записей раз в 10 с: в буфере остаются последние 10 (t = 1150..1240)
+    for i in range(25):
+        history.append(1000 + i * 10, 'unhealthy' if i % 5 == 0 else 'healthy', (i + 1) / 100)
+    assert history.count == 10
+    assert history.last_timestamp() == 1240
+
+    whole = history.window()
+    assert whole['samples'] == 10
+    # Недоступны записи 15 и 20
+    assert whole['availability'] == 0.8
+    assert whole['p50'] == pytest.approx(0.20)
+    assert whole['p99'] == pytest.approx(0.25)
+
+    # Граница окна включительно: now - seconds = 1200 -> записи 20..24
+    recent = history.window(seconds=40, now=1240)
+    assert recent['samples'] == 5
+    assert recent['availability'] == 0.8
+    assert recent['p50'] == pytest.approx(0.23)
+    assert history.window(seconds=1000, now=1240)['samples'] == 10
+    assert history.window(seconds=5, now=2000) == {
+        'samples': 0, 'availability': None, 'p50': None, 'p95': None, 'p99': None,
+    }
+
+
+def test_missing_response_times_are_skipped():
+    history = ServiceHistory(4)
+    history.append(1, 'healthy', 0.5)
+    history.append(2, 'unknown', None)
+    history.append(3, 'unhealthy', None)
+    result = history.window()
+    assert result['samples'] == 3
+    assert result['availability'] == pytest.approx(1 / 3)
+    assert result['p50'] == result['p99'] == 0.5
+    assert history.last(2) == ['unknown', 'unhealthy']
+    assert history.last(10) == ['healthy', 'unknown', 'unhealthy']
+
+
+def test_store_record_find_and_memory():
+    store = HistoryStore(capacity=16)
+    for name in ('web-frontend', 'web-api', 'db'):
+        store.record(name, ServiceStatus(name, 'healthy', 0.1, None, datetime.now()), timestamp=100)
+    assert store.find('web-api') == ['web-api']
+    assert store.find('WEB') == ['web-api', 'web-frontend']
+    assert store.get('db').last(1) == ['healthy']
+    assert store.memory_bytes() == 3 * 16 * 9
+    store.remove('db')
+    assert store.get('db') is None
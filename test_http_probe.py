@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тесты HTTP пробера на локальном сервере: прохождение перенаправлений и их предел
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from http_probe import HttpProbe
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Путь -> (код, Location)
+    routes = {
+        '/ok': (200, None),
+        '/down': (503, None),
+        '/to-ok': (302, '/ok'),
+        '/to-down': (301, '/down'),
+        '/loop': (302, '/loop'),
+    }
+
+    def do_GET(self):
+        code, location = self.routes.get(self.path, (404, None))
+        self.send_response(code)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def probe_status(probe: HttpProbe, url: str) -> int:
+    async def run():
+        try:
+            status_code, _ = await probe.probe(url, timeout=5)
+            return status_code
+        finally:
+            await probe.aclose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('method', ['GET', 'HEAD'])
+def test_redirect_reports_final_status(server_url, method):
+    assert probe_status(HttpProbe(method=method), server_url + '/to-ok') == 200
+    # Перенаправление на упавший бэкенд не считается успехом
+    assert probe_status(HttpProbe(method=method), server_url + '/to-down') == 503
+
+
+def test_redirect_limit(server_url):
+    with pytest.raises(httpx.TooManyRedirects):
+        probe_status(HttpProbe(max_redirects=3), server_url + '/loop')
+
+
+def test_zero_redirects_returns_redirect_status(server_url, monkeypatch):
+    monkeypatch.setenv('HTTP_PROBE_MAX_REDIRECTS', '0')
+    assert probe_status(HttpProbe(), server_url + '/to-down') == 301
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Тесты выгрузки логов: лимит размера частей и самостоятельная распаковка каждой части
+"""
+
+import gzip
+import random
+
+import pytest
+
+import log_export
+from log_export import export_range
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Масштаб уменьшен: блок 4 КБ, запас на заголовки 1 КБ
+    monkeypatch.setattr(log_export, 'EXPORT_BLOCK_SIZE', 4096)
+    monkeypatch.setattr(log_export, 'PART_OVERHEAD', 1024)
+
+
+def write_log(tmp_path, size: int, compressible: bool) -> bytes:
+    rng = random.Random(42)
+    if compressible:
+        data = b''.join(f"2024-05-01T00:00:{i % 60:02d}Z request {i} ok\n".encode() for i in range(size // 40))
+    else:
+        data = bytes(rng.getrandbits(8) for _ in range(size))
+    (tmp_path / 'app.log').write_bytes(data)
+    return data
+
+
+def read_parts(parts, compression: str) -> bytes:
+    result = b''
+    for part in parts:
+        raw = part.file.read()
+        assert len(raw) == part.size
+        # Каждая часть распаковывается без остальных
+        if compression == 'gzip':
+            raw = gzip.decompress(raw)
+        elif compression == 'zstd':
+            raw = log_export.zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+        result += raw
+    return result
+
+
+@pytest.mark.parametrize('compression', [
+    'gzip', 'none',
+    pytest.param('zstd', marks=pytest.mark.skipif(log_export.zstandard is None, reason="zstandard не установлен")),
+])
+def test_incompressible_data_is_split_within_limit(tmp_path, compression):
+    data = write_log(tmp_path, 100_000, compressible=False)
+    limit = 20_000
+    parts = export_range(str(tmp_path / 'app.log'), 0, None, limit, compression)
+    try:
+        assert len(parts) > 1
+        assert all(part.size <= limit for part in parts)
+        assert sum(part.raw_size for part in parts) == len(data)
+        assert read_parts(parts, compression) == data
+    finally:
+        for part in parts:
+            part.close()
+
+
+def test_compressible_data_fits_one_part(tmp_path):
+    data = write_log(tmp_path, 200_000, compressible=True)
+    parts = export_range(str(tmp_path / 'app.log'), 0, None, 50_000, 'gzip')
+    try:
+        assert len(parts) == 1
+        assert parts[0].size < len(data) // 5
+        assert read_parts(parts, 'gzip') == data
+    finally:
+        for part in parts:
+            part.close()
+
+
+def test_range_and_empty_export(tmp_path):
+    data = write_log(tmp_path, 30_000, compressible=True)
+    path = str(tmp_path / 'app.log')
+    parts = export_range(path, 1000, 5000, 50_000, 'gzip')
+    try:
+        assert read_parts(parts, 'gzip') == data[1000:5000]
+    finally:
+        for part in parts:
+            part.close()
+    assert export_range(path, len(data), None, 50_000, 'gzip') == []
+
+
+def test_export_compression_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setenv('LOG_EXPORT_COMPRESSION', 'brotli')
+    assert log_export.export_compression() == 'gzip'
+    monkeypatch.setenv('LOG_EXPORT_COMPRESSION', 'NONE')
+    assert log_export.export_compression() == 'none'
+    monkeypatch.setattr(log_export, 'zstandard', None)
+    monkeypatch.setenv('LOG_EXPORT_COMPRESSION', 'zstd')
+    assert log_export.export_compression() == 'gzip'
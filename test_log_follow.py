@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Тесты сессии слежения за логом: завершение при ошибках Telegram
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from telegram.error import BadRequest, NetworkError
+
+import log_follow
+from log_follow import FollowSession
+
+
+class FakeFollower:
+    def __init__(self):
+        self.subscribers = set()
+
+    def subscribe(self, callback):
+        self.subscribers.add(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.discard(callback)
+
+
+class FakeBot:
+    """Первое сообщение отправляется, дальнейшие редактирования падают с edit_error"""
+
+    def __init__(self, edit_error: Exception):
+        self.edit_error = edit_error
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        raise self.edit_error
+
+
+async def follow_until_error(bot: FakeBot, follower: FakeFollower):
+    finished = []
+    session = FollowSession(bot, 1, 'web', follower, minutes=1)
+    session.on_finish = finished.append
+    session.start()
+    (callback,) = follower.subscribers
+    callback(['first\n'])
+    await asyncio.sleep(0.05)
+    callback(['second\n'])
+    await asyncio.wait_for(session._task, timeout=2)
+    return finished
+
+
+def test_session_finishes_after_telegram_error(monkeypatch):
+    monkeypatch.setattr(log_follow, 'FOLLOW_EDIT_INTERVAL', 0)
+    for error in (BadRequest("Message to edit not found"), NetworkError("connection reset")):
+        bot = FakeBot(error)
+        follower = FakeFollower()
+        finished = asyncio.run(follow_until_error(bot, follower))
+
+        assert not follower.subscribers
+        assert len(finished) == 1
+        # Недоставленные строки и итог уходят новыми сообщениями
+        assert bot.sent[0].endswith('first\n')
+        assert bot.sent[1].endswith('second\n')
+        assert bot.sent[-1].startswith("⚠️ Слежение остановлено из-за ошибки: web")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Тесты индекса меток времени: поиск диапазонов по периоду и перестройка при ротации
+"""
+
+from datetime import datetime, timezone
+
+import log_index
+from log_index import LogIndex
+
+BASE = datetime(2024, 5, 1, tzinfo=timezone.utc).timestamp()
+
+
+def stamp(second: int) -> str:
+    return datetime.fromtimestamp(BASE + second, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def write_log(path, seconds, extra_every: int = 0) -> bytes:
+    """Лог с записью на каждую секунду из seconds; каждая extra_every-я — с продолжением без метки"""
+    lines = []
+    for i, second in enumerate(seconds):
+        lines.append(f"{stamp(second)} event {second}\n")
+        if extra_every and i % extra_every == 0:
+            lines.append(f"    continuation of {second}\n")
+    data = ''.join(lines).encode()
+    path.write_bytes(data)
+    return data
+
+
+def offset_of(data: bytes, second: int) -> int:
+    return data.index(stamp(second).encode())
+
+
+def make_index(tmp_path, monkeypatch, seconds, extra_every: int = 0):
+    # Маленький шаг, чтобы в индексе было много записей и поиск шел между ними
+    monkeypatch.setattr(log_index, 'INDEX_INTERVAL', 256)
+    path = tmp_path / 'app.log'
+    data = write_log(path, seconds, extra_every)
+    index = LogIndex(str(path))
+    assert index.update()
+    assert len(index.offsets) > 3
+    return path, data, index
+
+
+def test_range_between_index_entries(tmp_path, monkeypatch):
+    path, data, index = make_index(tmp_path, monkeypatch, range(0, 1000, 2))
+    for since, until in ((100, 200), (101, 199), (0, 1), (37, 38), (500, 998)):
+        first = since + since % 2
+        last = until + until % 2
+        start, end = index.range(BASE + since, BASE + until)
+        assert start == offset_of(data, first), (since, until)
+        assert end == (offset_of(data, last) if last < 1000 else len(data)), (since, until)
+
+
+def test_range_open_ends_and_outside_file(tmp_path, monkeypatch):
+    path, data, index = make_index(tmp_path, monkeypatch, range(100, 400))
+    assert index.range(None, None) == (0, len(data))
+    assert index.range(BASE + 200, None) == (offset_of(data, 200), len(data))
+    assert index.range(None, BASE + 200) == (0, offset_of(data, 200))
+    assert index.range(BASE, BASE + 50) == (0, 0)
+    assert index.range(BASE + 1000, BASE + 2000) == (len(data), len(data))
+    # Пустой период: начало не может оказаться после конца
+    start, end = index.range(BASE + 300, BASE + 250)
+    assert start == end
+
+
+def test_lines_without_timestamp_belong_to_previous_entry(tmp_path, monkeypatch):
+    path, data, index = make_index(tmp_path, monkeypatch, range(300), extra_every=1)
+    start, end = index.range(BASE + 10, BASE + 11)
+    assert data[start:end].decode() == f"{stamp(10)} event 10\n    continuation of 10\n"
+
+
+def test_index_grows_and_survives_reload(tmp_path, monkeypatch):
+    path, data, index = make_index(tmp_path, monkeypatch, range(200))
+    entries = len(index.offsets)
+    with open(path, 'ab') as f:
+        f.write(''.join(f"{stamp(s)} event {s}\n" for s in range(200, 400)).encode())
+    data = path.read_bytes()
+    assert index.update()
+    assert len(index.offsets) > entries
+    assert not index.update()
+
+    reloaded = LogIndex(str(path))
+    assert reloaded.offsets == index.offsets
+    assert not reloaded.update()
+    assert reloaded.range(BASE + 300, BASE + 301) == (offset_of(data, 300), offset_of(data, 301))
+
+
+def test_rotation_rebuilds_index(tmp_path, monkeypatch):
+    path, data, index = make_index(tmp_path, monkeypatch, range(1000, 1400))
+    # Усечение и запись нового содержимого: старые записи индекса недействительны
+    data = write_log(path, range(0, 100))
+    assert index.update()
+    assert index.offsets[-1] < len(data)
+    assert index.range(BASE + 50, BASE + 60) == (offset_of(data, 50), offset_of(data, 60))
+
+
+def test_growth_without_timestamps_is_not_rescanned(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, 'INDEX_INTERVAL', 256)
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'no timestamp here\n' * 100)
+    scans = []
+    original = log_index.first_timestamp_after
+
+    def recording(f, offset, limit):
+        scans.append(offset)
+        return original(f, offset, limit)
+
+    monkeypatch.setattr(log_index, 'first_timestamp_after', recording)
+    index = LogIndex(str(path))
+    assert index.update()
+    assert index.offsets == []
+    size = path.stat().st_size
+    assert index.scanned_to == size
+
+    with open(path, 'ab') as f:
+        f.write(b'still nothing\n' * 10 + f"{stamp(5)} event 5\n".encode())
+    scans.clear()
+    assert index.update()
+    # Просмотр продолжается с конца прошлого, а не с начала файла
+    assert scans == [size]
+    assert index.offsets == [size + len(b'still nothing\n') * 10]
+
+    reloaded = LogIndex(str(path))
+    assert reloaded.scanned_to == index.scanned_to
+    assert not reloaded.update()
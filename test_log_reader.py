@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Тесты чтения логов: смещения последних строк на границах блоков и потоковый поиск
+"""
+
+import io
+import os
+import re
+import time
+from types import SimpleNamespace
+
+import log_reader
+from log_reader import decode_lines, find_tail_offset, grep_file, read_tail
+
+
+def lines_data(count: int, trailing_newline: bool = True) -> bytes:
+    data = b''.join(f"line {i}\n".encode() for i in range(count))
+    return data if trailing_newline else data[:-1]
+
+
+def expected_offset(data: bytes, max_lines: int) -> int:
+    """Смещение последних max_lines строк, посчитанное напрямую"""
+    lines = data.splitlines(keepends=True)
+    return len(b''.join(lines[:max(0, len(lines) - max_lines)]))
+
+
+def test_tail_offset_across_block_boundaries():
+    for trailing_newline in (True, False):
+        data = lines_data(50, trailing_newline)
+        for block_size in (1, 3, 7, 64, 4096):
+            for max_lines in (1, 2, 10, 49, 50):
+                offset = find_tail_offset(io.BytesIO(data), max_lines, block_size)
+                assert offset == expected_offset(data, max_lines), (trailing_newline, block_size, max_lines)
+
+
+def test_tail_offset_more_lines_than_file():
+    data = lines_data(5)
+    assert find_tail_offset(io.BytesIO(data), 100, block_size=4) == 0
+
+
+def test_tail_offset_empty_file_and_zero_lines():
+    assert find_tail_offset(io.BytesIO(b''), 10) == 0
+    data = lines_data(5)
+    assert find_tail_offset(io.BytesIO(data), 0) == len(data)
+
+
+def test_tail_offset_ignores_only_one_trailing_newline():
+    # Пустая строка перед завершающим переводом строки считается строкой
+    assert find_tail_offset(io.BytesIO(b'a\nb\n\n'), 1) == 4
+    assert find_tail_offset(io.BytesIO(b'a\nb\n\n'), 2) == 2
+
+
+def test_read_tail(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'first\r\nsecond\rprogress\nthird\n')
+    offset, lines = read_tail(str(path), 2)
+    assert offset == len(b'first\r\n')
+    # \r\n приводится к \n, одиночный \r остается внутри строки
+    assert lines == ['second\rprogress\n', 'third\n']
+
+
+def test_decode_lines_keeps_multibyte_characters():
+    assert decode_lines('привет\nмир'.encode()) == ['привет\n', 'мир']
+
+
+# Строки с совпадениями в write_numbered
+ERRORS = {5, 7, 20, 98}
+
+
+def write_numbered(tmp_path, count: int) -> str:
+    path = tmp_path / 'search.log'
+    path.write_text(''.join(f"line {i}{' ERROR' if i in ERRORS else ''}\n" for i in range(count)))
+    return str(path)
+
+
+def test_grep_context_lines(tmp_path):
+    path = write_numbered(tmp_path, 100)
+    result = grep_file(path, re.compile('ERROR'), context=1)
+    assert result.matches == 4
+    # 5 и 7: окна [4..6] и [6..8] пересекаются и объединяются в одну группу
+    assert [[line.split()[1] for line in block] for block in result.blocks] == [
+        ['4', '5', '6', '7', '8'], ['19', '20', '21'], ['97', '98', '99'],
+    ]
+    assert not result.truncated
+
+
+def test_grep_adjacent_windows_merge_and_gaps_split(tmp_path):
+    path = write_numbered(tmp_path, 30)
+    # Между 7 и 20 двенадцать строк: при context=6 окна смыкаются, при 5 — нет
+    assert len(grep_file(path, re.compile('ERROR'), context=6).blocks) == 1
+    assert len(grep_file(path, re.compile('ERROR'), context=5).blocks) == 2
+
+
+def test_grep_across_chunks_and_limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_reader, 'GREP_CHUNK_SIZE', 7)
+    path = write_numbered(tmp_path, 100)
+    result = grep_file(path, re.compile('ERROR'), context=1)
+    assert [len(block) for block in result.blocks] == [5, 3, 3]
+
+    # Лимит совпадений: контекст после последнего совпадения дописывается
+    result = grep_file(path, re.compile('ERROR'), max_matches=2, context=1)
+    assert result.truncated
+    assert result.matches == 2
+    assert [line.split()[1] for line in result.blocks[0]] == ['4', '5', '6', '7', '8']
+
+
+def test_grep_deadline_stops_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_reader, 'GREP_CHUNK_SIZE', 64)
+    path = write_numbered(tmp_path, 100)
+    result = grep_file(path, re.compile('ERROR'), deadline=time.monotonic() - 1)
+    assert result.timed_out
+    assert result.matches == 0
+    assert result.scanned_bytes == 0
+
+    # Бюджет заканчивается посреди файла: найденное до этого момента сохраняется
+    ticks = iter([0, 0, 0] + [10] * 100)
+    monkeypatch.setattr(log_reader, 'time', SimpleNamespace(monotonic=lambda: next(ticks)))
+    result = grep_file(path, re.compile('ERROR'), deadline=5)
+    assert result.timed_out
+    assert 0 < result.scanned_bytes < os.path.getsize(path)
@@ -4,8 +4,12 @@
 """
 
 import os
+from dotenv import load_dotenv
 from service_monitor import ServiceMonitor
 
+# Остальные настройки (Docker, дедлайны) — из .env, как у бота
+load_dotenv()
+
 def test_services_parsing():
     """Тестирование парсинга конфигурации сервисов"""
     
@@ -17,6 +21,7 @@ def test_services_parsing():
     
     # Создаем монитор
     monitor = ServiceMonitor()
+    monitor.wait_backends()
     
     print("🔍 Тестирование парсинга конфигурации сервисов")
     print("=" * 60)
@@ -25,9 +30,9 @@ def test_services_parsing():
     
     # Выводим распарсенные сервисы
     for i, service in enumerate(monitor.services, 1):
-        print(f"{i}. Имя: {service['name']}")
-        print(f"   Тип: {service['type']}")
-        print(f"   Конфигурация: {service['config']}")
+        print(f"{i}. Имя: {service.name}")
+        print(f"   Тип: {service.type}")
+        print(f"   Конфигурация: {service.config}")
         print()
     
     print("=" * 60)
@@ -36,7 +41,7 @@ def test_services_parsing():
     # Проверяем типы сервисов
     type_counts = {}
     for service in monitor.services:
-        service_type = service['type']
+        service_type = service.type
         type_counts[service_type] = type_counts.get(service_type, 0) + 1
     
     print("\n📊 Распределение по типам:")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Тесты адаптивных интервалов проверок
+"""
+
+import pytest
+
+from scheduler import (
+    ADAPTIVE_BACKOFF, ADAPTIVE_MAX_FACTOR, ADAPTIVE_MIN_INTERVAL, STABLE_WINDOW,
+    AdaptiveInterval, parse_intervals,
+)
+
+
+def test_stable_service_backs_off_up_to_maximum():
+    policy = AdaptiveInterval(60)
+    # Пока окно не заполнено — базовый интервал
+    for _ in range(STABLE_WINDOW - 1):
+        assert policy.update(True) == 60
+    assert policy.update(True) == pytest.approx(60 * ADAPTIVE_BACKOFF)
+    assert policy.update(True) == pytest.approx(60 * ADAPTIVE_BACKOFF ** 2)
+    for _ in range(20):
+        policy.update(True)
+    assert policy.interval == 60 * ADAPTIVE_MAX_FACTOR
+
+
+def test_failure_switches_to_fast_interval_until_window_clears():
+    policy = AdaptiveInterval(60)
+    for _ in range(10):
+        policy.update(True)
+    assert policy.update(False) == 15
+    # Недавняя ошибка в окне держит быстрый интервал
+    for _ in range(STABLE_WINDOW - 1):
+        assert policy.update(True) == 15
+    # Окно снова целиком из успехов — рост начинается от базового
+    assert policy.update(True) == pytest.approx(60 * ADAPTIVE_BACKOFF)
+    assert policy.changes == 2
+
+
+def test_fast_interval_respects_minimum():
+    assert AdaptiveInterval(10).fast == ADAPTIVE_MIN_INTERVAL
+    # Базовый интервал меньше минимума не увеличивается
+    assert AdaptiveInterval(2).fast == 2
+    assert AdaptiveInterval(600).fast == 150
+
+
+def test_flapping_counts_state_changes():
+    policy = AdaptiveInterval(60)
+    for healthy in (True, False, True, False, False, True):
+        policy.update(healthy)
+    assert policy.changes == 4
+    assert policy.interval == policy.fast
+
+
+def test_parse_intervals():
+    assert parse_intervals("web=30, nginx=0.5,bad,db=x, api:8080=45") == {
+        'web': 30.0, 'nginx': 1.0, 'api:8080': 45.0,
+    }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Тесты ServiceMonitor без Docker и systemd: периодический мониторинг, проверки в пуле потоков и сверка контейнеров
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from types import SimpleNamespace
+
+from check_engine import DEADLINE_EXCEEDED_MESSAGE, STILL_RUNNING_MESSAGE
+from service_monitor import ServiceMonitor, ServiceStatus
+from service_registry import RegistryDiff
+
+
+def make_monitor(monkeypatch, services: str) -> ServiceMonitor:
+    monkeypatch.setenv('SERVICES_TO_MONITOR', services)
+    monkeypatch.delenv('SERVICES_CONFIG', raising=False)
+    monitor = ServiceMonitor(start_backends=False)
+    # Бэкенды (Docker) не подключаются: проверяются только сервисы из конфигурации
+    monitor._backends = Future()
+    monitor._backends.set_result(None)
+    return monitor
+
+
+def test_monitoring_calls_back_once_per_interval(monkeypatch):
+    monitor = make_monitor(monkeypatch, ','.join(f"process:worker{i}" for i in range(5)))
+    checked = []
+
+    def check_service(service, cycle=None):
+        checked.append(service.name)
+        return ServiceStatus(service.name, 'healthy', last_check=datetime.now())
+
+    monitor.check_service = check_service
+    callbacks = []
+
+    async def run():
+        try:
+            await asyncio.wait_for(monitor.run_monitoring(callbacks.append, interval=0.3), timeout=0.75)
+        except asyncio.TimeoutError:
+            pass
+
+    try:
+        asyncio.run(run())
+    finally:
+        monitor.executor.shutdown(wait=True)
+
+    # Циклы в 0, 0.3 и 0.6 с: каждый — один вызов со статусами всех сервисов
+    assert len(callbacks) == 3
+    for statuses in callbacks:
+        assert sorted(status.name for status in statuses) == [f"worker{i}" for i in range(5)]
+    assert len(checked) == 15
+
+
+def test_hung_executor_check_is_not_requeued(monkeypatch):
+    monitor = make_monitor(monkeypatch, "process:stuck,process:worker")
+    release = threading.Event()
+    calls = []
+
+    def check_service(service, cycle=None):
+        calls.append(service.name)
+        if service.name == 'stuck':
+            release.wait(5)
+        return ServiceStatus(service.name, 'healthy', last_check=datetime.now())
+
+    monitor.check_service = check_service
+    try:
+        first = asyncio.run(monitor.check_services_async(list(monitor.services), deadline=0.2))
+        second = asyncio.run(monitor.check_services_async(list(monitor.services), deadline=0.2))
+        release.set()
+    finally:
+        monitor.executor.shutdown(wait=True)
+
+    assert [s.error_message for s in first] == [DEADLINE_EXCEEDED_MESSAGE, None]
+    # Поток первой проверки еще занят — повторная не ставится в очередь пула
+    assert [(s.status, s.error_message) for s in second] == [('unknown', STILL_RUNNING_MESSAGE), ('healthy', None)]
+    assert sorted(calls) == ['stuck', 'worker', 'worker']
+    assert not monitor._running_checks
+
+
+class FakeDockerApi:
+    """Ответ GET /containers/json по текущему списку (имя, состояние, метки)"""
+
+    def __init__(self):
+        self.items = []
+
+    def containers(self, all=False):
+        return [{'Id': f"{name:0<64}", 'Names': [f"/{name}"], 'Image': 'app', 'State': state,
+                 'Status': '', 'Labels': labels} for name, state, labels in self.items]
+
+
+def test_refresh_docker_services_applies_only_differences(monkeypatch):
+    monkeypatch.setenv('DOCKER_DISCOVERY_PROJECTS', 'shop')
+    monitor = make_monitor(monkeypatch, "docker:db")
+    api = FakeDockerApi()
+    monitor.docker_client = SimpleNamespace(api=api)
+    shop = {'com.docker.compose.project': 'shop'}
+
+    api.items = [('web', 'running', shop), ('db', 'running', shop), ('cache', 'exited', shop),
+                 ('other', 'running', {})]
+    diff = monitor.refresh_docker_services()
+    # db задан в конфигурации, остановленный и чужой контейнеры не добавляются
+    assert diff == RegistryDiff(added=['web'])
+    web = monitor.registry.get('web')
+
+    api.items = [('web', 'exited', shop), ('cache', 'running', shop), ('db', 'running', shop)]
+    diff = monitor.refresh_docker_services()
+    # Остановленный, но существующий контейнер остается в мониторинге тем же объектом
+    assert diff == RegistryDiff(added=['cache'])
+    assert monitor.registry.get('web') is web
+    assert monitor.last_discovery[1] is diff
+
+    api.items = [('cache', 'running', shop)]
+    assert monitor.refresh_docker_services() == RegistryDiff(removed=['web'])
+    assert not monitor.refresh_docker_services()
+    assert sorted(entry.name for entry in monitor.services) == ['cache', 'db']
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тесты реестра сервисов: изменения при замене источника и приоритет источников
+"""
+
+from service_registry import RegistryDiff, ServiceEntry, ServiceRegistry, parse_services_env
+
+
+def docker(name: str, source: str = 'docker', **kwargs) -> ServiceEntry:
+    return ServiceEntry(name, 'docker', f"docker:{name}", source=source, **kwargs)
+
+
+def test_set_source_reports_only_changes():
+    registry = ServiceRegistry()
+    diffs = []
+    registry.add_listener(diffs.append)
+
+    diff = registry.set_source('docker', [docker('web'), docker('db')])
+    assert diff == RegistryDiff(added=['web', 'db'])
+    web = registry.get('web')
+    version = registry.version
+
+    # Повтор тех же записей — без изменений, версия и объекты прежние
+    assert not registry.set_source('docker', [docker('web'), docker('db')])
+    assert registry.version == version
+    assert registry.get('web') is web
+
+    diff = registry.set_source('docker', [docker('web'), docker('db', interval=30), docker('cache')])
+    assert diff == RegistryDiff(added=['cache'], changed=['db'])
+    assert registry.get('web') is web
+    assert registry.get('db').interval == 30
+
+    diff = registry.set_source('docker', [docker('cache')])
+    assert diff == RegistryDiff(removed=['web', 'db'])
+    assert [entry.name for entry in registry.services] == ['cache']
+    # Слушатели получают только непустые изменения
+    assert len(diffs) == 3
+    assert registry.version == version + 2
+
+
+def test_services_list_is_replaced_not_mutated():
+    registry = ServiceRegistry()
+    registry.set_source('docker', [docker('web')])
+    services = registry.services
+    registry.set_source('docker', [docker('web'), docker('db')])
+    assert [entry.name for entry in services] == ['web']
+    assert [entry.name for entry in registry.services] == ['web', 'db']
+
+
+def test_configured_entry_overrides_discovered():
+    registry = ServiceRegistry()
+    registry.set_source('docker', [docker('web')])
+    discovered = registry.get('web')
+
+    diff = registry.set_source('env', [docker('web', source='env')])
+    assert diff == RegistryDiff(changed=['web'])
+    assert registry.get('web').source == 'env'
+
+    # Удаление из конфигурации возвращает обнаруженную запись тем же объектом
+    diff = registry.set_source('env', [])
+    assert diff == RegistryDiff(changed=['web'])
+    assert registry.get('web') is discovered
+    assert [entry.name for entry in registry.source_entries('docker')] == ['web']
+
+
+def test_set_source_assigns_source():
+    registry = ServiceRegistry()
+    registry.set_source('file', [ServiceEntry('api', 'http', 'http://localhost:8080/*')])
+    entry = registry.get('api')
+    assert entry.source == 'file'
+    assert entry.target == 'http://localhost:8080'
+    assert registry.find_target('http', 'http://localhost:8080') is entry
+
+
+def test_parse_services_env_gives_duplicate_names_unique_keys():
+    entries = parse_services_env("web:docker:a,web:docker:b,web#2:docker:c")
+    # Имена раздаются по порядку: явное web#2, занятое раньше, тоже получает суффикс
+    assert [entry.name for entry in entries] == ['web', 'web#2', 'web#2#2']
+    assert [entry.target for entry in entries] == ['a', 'b', 'c']
+    registry = ServiceRegistry()
+    assert len(registry.set_source('env', entries).added) == 3
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Тесты кэша /status: TTL, объединение одновременных запросов и частичные результаты
+"""
+
+import asyncio
+
+from status_cache import StatusCache
+
+
+class Fetcher:
+    """Цикл проверок из двух частичных результатов, завершаемый по release"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+
+    async def __call__(self, on_result):
+        self.calls += 1
+        self.started.set()
+        on_result(0, 'web')
+        await self.release.wait()
+        on_result(1, 'db')
+        return [f"web#{self.calls}", f"db#{self.calls}"]
+
+
+def test_concurrent_fresh_requests_share_one_fetch():
+    async def scenario():
+        fetch = Fetcher()
+        cache = StatusCache(fetch, ttl=30)
+        first_partial, second_partial = [], []
+        first = asyncio.create_task(cache.get(fresh=True, on_result=lambda i, r: first_partial.append(i)))
+        await fetch.started.wait()
+        second = asyncio.create_task(cache.get(fresh=True, on_result=lambda i, r: second_partial.append(i)))
+        await asyncio.sleep(0)
+        fetch.release.set()
+        results = await asyncio.gather(first, second)
+
+        assert fetch.calls == 1
+        assert [value for value, age in results] == [['web#1', 'db#1']] * 2
+        # Присоединившийся запрос получает и уже готовые частичные результаты
+        assert first_partial == [0, 1]
+        assert second_partial == [0, 1]
+
+    asyncio.run(scenario())
+
+
+def test_ttl_and_fresh_after_cycle():
+    async def scenario():
+        fetch = Fetcher()
+        fetch.release.set()
+        cache = StatusCache(fetch, ttl=30)
+        value, age = await cache.get()
+        assert value == ['web#1', 'db#1']
+        # Пока результат моложе ttl, fetch не вызывается
+        value, age = await cache.get()
+        assert fetch.calls == 1 and age < 1
+        # fresh без идущего цикла запускает новый
+        value, age = await cache.get(fresh=True)
+        assert fetch.calls == 2 and value == ['web#2', 'db#2']
+
+        expired = StatusCache(fetch, ttl=30)
+        expired.put(['old'], age=60)
+        value, age = await expired.get()
+        assert value == ['web#3', 'db#3']
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_cycle():
+    async def scenario():
+        fetch = Fetcher()
+        cache = StatusCache(fetch, ttl=30)
+        first = asyncio.create_task(cache.get())
+        await fetch.started.wait()
+        second = asyncio.create_task(cache.get())
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+        value, age = await second
+        assert value == ['web#1', 'db#1']
+        assert fetch.calls == 1
+        assert first.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища результатов: агрегаты 1 мин / 1 ч и выбор таблицы для запросов доступности
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+import status_store
+from service_monitor import ServiceStatus
+from status_store import StatusStore
+
+STEP = 600
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Пачки сбрасываются сразу, без ожидания FLUSH_INTERVAL
+    monkeypatch.setattr(status_store, 'FLUSH_INTERVAL', 0.05)
+    store = StatusStore(str(tmp_path / 'status.db'))
+    store.start()
+    yield store
+    store.stop()
+
+
+def fill(store: StatusStore):
+    """Три дня проверок раз в 10 минут с часовым падением сутки назад; возвращает (начало, падение)"""
+    base = int(time.time()) // 3600 * 3600 - 3 * 86400
+    outage = base + 2 * 86400 + 7200
+    for ts in range(base, base + 3 * 86400, STEP):
+        if outage <= ts < outage + 3600:
+            status = ServiceStatus('web', 'unhealthy', None, 'HTTP 502', datetime.now())
+        else:
+            status = ServiceStatus('web', 'healthy', 0.1, None, datetime.now())
+        store.record('web', status, timestamp=ts)
+    assert store.flush()
+    return base, outage
+
+
+def test_short_period_uses_raw_samples(store):
+    base, outage = fill(store)
+    result = store.uptime('web', outage - 1800, outage + 1800)
+    assert result['source'] == 'samples'
+    assert result['samples'] == 6
+    assert result['availability'] == 0.5
+    assert result['avg_response_time'] == pytest.approx(0.1)
+
+
+def test_minute_rollup_across_bucket_boundary(store):
+    base, outage = fill(store)
+    # Начало периода внутри минутной корзины: корзина учитывается целиком
+    since = outage - 6 * 3600 + 30
+    result = store.uptime('web', since, outage + 3600)
+    assert result['source'] == 'rollup_1m'
+    assert result['samples'] == 42
+    assert result['availability'] == pytest.approx(36 / 42)
+    assert result['max_response_time'] == pytest.approx(0.1)
+
+
+def test_hour_rollup_across_bucket_boundary(store):
+    base, outage = fill(store)
+    assert store.uptime('web', base, base + 3 * 86400) == {
+        'samples': 432,
+        'availability': pytest.approx(426 / 432),
+        'avg_response_time': pytest.approx(0.1),
+        'max_response_time': pytest.approx(0.1),
+        'source': 'rollup_1h',
+    }
+    # Период начинается в середине часа падения: часовая корзина входит целиком
+    since = outage + 1800
+    result = store.uptime('web', since, since + 2 * 86400 + 3600)
+    assert result['source'] == 'rollup_1h'
+    assert result['samples'] == 132
+    assert result['availability'] == pytest.approx(126 / 132)
+
+
+def test_last_state_and_unknown_service(store):
+    base, outage = fill(store)
+    ts, status, response_time, error, uptime = store.last_states()['web']
+    assert ts == base + 3 * 86400 - STEP
+    assert status == 'healthy'
+    assert store.uptime('missing', base) is None
+    assert store.uptime('web', base - 3600, base - 1) == {'samples': 0, 'source': 'samples'}
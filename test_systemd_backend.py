@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Тесты пакетного запроса состояния systemd юнитов с подмененным systemctl
+"""
+
+import subprocess
+
+import pytest
+
+import systemd_backend
+from systemd_backend import SystemdUnits, _parse_show_output
+
+
+def block(unit: str, active: str = 'active', sub: str = 'running', load: str = 'loaded',
+          monotonic: str = '5000000') -> str:
+    return (f"Id={unit}\nLoadState={load}\nActiveState={active}\nSubState={sub}\n"
+            f"ActiveEnterTimestampMonotonic={monotonic}\n")
+
+
+class FakeSystemctl:
+    """Замена subprocess.run: ответ по списку юнитов в вызове"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def __call__(self, args, **kwargs):
+        units = args[args.index('--') + 1:]
+        self.calls.append(units)
+        stdout, returncode, stderr = self.respond(units)
+        return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+
+@pytest.fixture
+def systemctl(monkeypatch):
+    def install(respond):
+        fake = FakeSystemctl(respond)
+        monkeypatch.setattr(systemd_backend.subprocess, 'run', fake)
+        return fake
+    return install
+
+
+def test_parse_show_output_blocks():
+    output = block('nginx.service') + "\n" + "Id=a=b.service\nLoadState=not-found\n\n\n"
+    blocks = _parse_show_output(output)
+    assert len(blocks) == 2
+    assert blocks[0]['ActiveState'] == 'active'
+    # Значение может содержать '=', пустые строки подряд не дают пустых блоков
+    assert blocks[1] == {'Id': 'a=b.service', 'LoadState': 'not-found'}
+
+
+def test_batched_query_matches_blocks_by_position(systemctl):
+    fake = systemctl(lambda units: ("\n".join([
+        block('nginx.service'),
+        # Алиас: Id отличается от запрошенного имени
+        block('postgresql@16-main.service', active='failed', sub='failed', monotonic='0'),
+    ]), 0, ''))
+    units = SystemdUnits.take(['nginx', 'systemd:postgresql', 'nginx.service'])
+
+    assert fake.calls == [['nginx.service', 'postgresql.service']]
+    nginx = units.get('nginx')
+    assert (nginx.load_state, nginx.active_state, nginx.sub_state) == ('loaded', 'active', 'running')
+    assert nginx.active_enter_monotonic == 5000000
+    postgres = units.get('postgresql')
+    assert postgres.active_state == 'failed'
+    assert postgres.uptime is None
+
+
+def test_block_count_mismatch_falls_back_to_per_unit_queries(systemctl):
+    def respond(units):
+        if len(units) > 1:
+            # Некорректное имя юнита: systemctl выводит только часть блоков
+            return block('nginx.service'), 1, 'Invalid unit name "bad name.service"'
+        if units == ['bad name.service']:
+            return '', 1, 'Invalid unit name "bad name.service"'
+        return block(units[0], monotonic='junk'), 0, ''
+
+    fake = systemctl(respond)
+    units = SystemdUnits.take(['nginx', 'bad name', 'redis'])
+
+    assert fake.calls == [['nginx.service', 'bad name.service', 'redis.service'],
+                          ['nginx.service'], ['bad name.service'], ['redis.service']]
+    assert units.get('nginx').active_state == 'active'
+    assert units.get('redis').active_state == 'active'
+    assert units.get('redis').active_enter_monotonic == 0
+    bad = units.get('bad name')
+    assert (bad.load_state, bad.active_state) == ('unknown', 'unknown')
+
+
+def test_systemctl_unavailable_raises(systemctl):
+    systemctl(lambda units: ('', 1, 'System has not been booted with systemd'))
+    with pytest.raises(RuntimeError, match='not been booted'):
+        SystemdUnits.take(['nginx'])
+
+
+def test_no_units_does_not_call_systemctl(systemctl):
+    fake = systemctl(lambda units: ('', 0, ''))
+    assert SystemdUnits.take([]).states == {}
+    assert fake.calls == []